@@ -4,8 +4,13 @@ import { ArrowLeft, RotateCcw, Trash2, TrendingUp } from 'lucide-react';
 import Layout from '../components/Layout';
 import { getDueFlashcards, reviewFlashcard, deleteFlashcard, getFlashcardStats } from '@learning-coach/shared/api';
 
+// 每次从待复习队列取的张数，复习到最后一张时再取下一页
+const PAGE_SIZE = 20;
+
 const Review = () => {
   const [flashcards, setFlashcards] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [dueCount, setDueCount] = useState(0);
   const [currentIndex, setCurrentIndex] = useState(0);
   const [flipped, setFlipped] = useState(false);
   const [loading, setLoading] = useState(true);
@@ -31,8 +36,10 @@ const Review = () => {
   const loadDueFlashcards = async () => {
     setLoading(true);
     try {
-      const data = await getDueFlashcards();
+      const data = await getDueFlashcards(PAGE_SIZE);
       setFlashcards(data.flashcards || []);
+      setNextCursor(data.next_cursor || null);
+      setDueCount(data.count || 0);
       if (data.flashcards && data.flashcards.length > 0) {
         setStartTime(Date.now());
       }
@@ -43,6 +50,15 @@ const Review = () => {
     }
   };
 
+  const loadMoreFlashcards = async () => {
+    if (!nextCursor) return [];
+    const data = await getDueFlashcards(PAGE_SIZE, nextCursor);
+    const more = data.flashcards || [];
+    setNextCursor(data.next_cursor || null);
+    setFlashcards((cards) => [...cards, ...more]);
+    return more;
+  };
+
   const handleFlip = () => {
     if (!flipped) {
       setFlipped(true);
@@ -56,8 +72,9 @@ const Review = () => {
     try {
       await reviewFlashcard(flashcards[currentIndex].id, quality, timeSpent);
 
-      // 移到下一张
-      if (currentIndex < flashcards.length - 1) {
+      // 移到下一张（当前页复习完时取下一页）
+      const more = currentIndex < flashcards.length - 1 ? [] : await loadMoreFlashcards();
+      if (currentIndex < flashcards.length - 1 || more.length > 0) {
         setCurrentIndex(currentIndex + 1);
         setFlipped(false);
         setStartTime(Date.now());
@@ -75,7 +92,8 @@ const Review = () => {
   };
 
   const handleSkip = async () => {
-    if (currentIndex < flashcards.length - 1) {
+    const more = currentIndex < flashcards.length - 1 ? [] : await loadMoreFlashcards();
+    if (currentIndex < flashcards.length - 1 || more.length > 0) {
       setCurrentIndex(currentIndex + 1);
       setFlipped(false);
     }
@@ -90,6 +108,7 @@ const Review = () => {
       // 移除当前卡片
       const remaining = flashcards.filter((_, i) => i !== currentIndex);
       setFlashcards(remaining);
+      setDueCount((count) => Math.max(0, count - 1));
 
       if (currentIndex >= remaining.length) {
         setCurrentIndex(Math.max(0, remaining.length - 1));
@@ -194,7 +213,8 @@ const Review = () => {
   }
 
   const currentCard = flashcards[currentIndex];
-  const progress = ((currentIndex + 1) / flashcards.length) * 100;
+  const total = Math.max(dueCount, flashcards.length);
+  const progress = ((currentIndex + 1) / total) * 100;
 
   return (
     <Layout>
@@ -203,7 +223,7 @@ const Review = () => {
           <div>
             <h1 className="text-2xl font-semibold text-moss-green-800">闪卡复习</h1>
             <p className="text-moss-green-600 mt-1">
-              {currentIndex + 1} / {flashcards.length} · 还需 {flashcards.length - currentIndex - 1} 张
+              {currentIndex + 1} / {total} · 还需 {total - currentIndex - 1} 张
             </p>
           </div>
           <button
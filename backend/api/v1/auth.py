@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from database import get_db
-from models import User
-from auth import create_access_token, get_current_user
-import hashlib
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models import User, UserStatistics
+from auth import CurrentUser, create_access_token, get_current_user
+import passwords
 
 router = APIRouter()
 
@@ -21,26 +22,28 @@ class LoginRequest(BaseModel):
 
 
 @router.post("/register")
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     """用户注册"""
     # Check if user exists
-    existing_user = db.query(User).filter(User.email == request.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == request.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="邮箱已被注册")
 
     # Create new user
-    password_hash = hashlib.sha256(request.password.encode()).hexdigest()
+    password_hash = await passwords.hash_password(request.password)
     new_user = User(
+        id=User.generate_id(),
         email=request.email,
         password_hash=password_hash,
         display_name=request.display_name
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    db.add(UserStatistics(user_id=new_user.id))
+    await db.commit()
+    await db.refresh(new_user)
 
     # Generate token
-    token = create_access_token(new_user.id)
+    token = create_access_token({"sub": new_user.id})
 
     return {
         "access_token": token,
@@ -54,17 +57,22 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login")
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """用户登录"""
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await db.scalar(select(User).where(User.email == request.email))
     if not user:
         raise HTTPException(status_code=401, detail="邮箱或密码错误")
 
-    password_hash = hashlib.sha256(request.password.encode()).hexdigest()
-    if user.password_hash != password_hash:
+    valid, new_hash = await passwords.verify_password(user.password_hash, request.password)
+    if not valid:
         raise HTTPException(status_code=401, detail="邮箱或密码错误")
 
-    token = create_access_token(user.id)
+    if new_hash:
+        # 旧版 SHA-256 哈希或成本参数变化，登录成功时升级
+        user.password_hash = new_hash
+        await db.commit()
+
+    token = create_access_token({"sub": user.id})
 
     return {
         "access_token": token,
@@ -78,7 +86,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/me")
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: CurrentUser = Depends(get_current_user)):
     """获取当前用户信息"""
     return {
         "id": current_user.id,
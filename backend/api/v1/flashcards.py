@@ -1,15 +1,37 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from typing import Optional
-from database import get_db
-from models import FlashCard, FlashCardReview, User, LearningSession
-from auth import get_current_user
-from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.orm import load_only
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from typing import List, Optional
+from database import get_async_db
+from pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, invalidate_count, paginate
+from schemas import FLASHCARD_SUMMARY_COLUMNS, DueFlashCards, FlashCardPage
+import due_queue
+import forecast
+import rollups
+import scheduling
+import flashcard_io
+from flashcard_io import ImportFormatError, ImportReport
+from models import FlashCard, FlashCardReview, LearningSession, UserScheduler
+from auth import CurrentUser, get_current_user
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import asyncio
+import os
 import uuid
 
 router = APIRouter()
 
+# 批量提交复习时单批最多条数
+FLASHCARD_REVIEW_BATCH_MAX = int(os.getenv("FLASHCARD_REVIEW_BATCH_MAX", "500"))
+
+# 待复习闪卡每次默认返回的张数
+DUE_PAGE_SIZE = int(os.getenv("DUE_PAGE_SIZE", "20"))
+
 
 class FlashCardRequest(BaseModel):
     front: str
@@ -22,11 +44,28 @@ class ReviewRequest(BaseModel):
     time_spent: int = 0  # 秒
 
 
+class BatchReviewItem(BaseModel):
+    card_id: str
+    quality: int  # 0-5
+    time_spent: int = 0  # 秒
+    reviewed_at: Optional[datetime] = None  # 客户端复习时间（UTC），默认为服务器收到的时间
+    client_review_id: Optional[str] = None  # 客户端生成的复习 id，重放离线队列时用于去重
+
+
+class BatchReviewRequest(BaseModel):
+    reviews: List[BatchReviewItem]
+
+
+class SchedulerRequest(BaseModel):
+    algorithm: Optional[str] = None            # 'sm2' 或 'fsrs'
+    desired_retention: Optional[float] = None  # FSRS 目标回忆概率
+
+
 @router.post("/flashcards")
 async def create_flashcard(
     request: FlashCardRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """创建新闪卡"""
     flashcard = FlashCard(
@@ -39,26 +78,27 @@ async def create_flashcard(
     db.add(flashcard)
 
     # 更新用户统计
-    stats = current_user.statistics
-    if stats:
-        stats.total_flashcards += 1
+    await rollups.on_card_created(db, flashcard)
 
-    db.commit()
-    db.refresh(flashcard)
+    await db.commit()
+    await db.refresh(flashcard)
+    invalidate_count(("flashcards", current_user.id))
+    due_queue.card_scheduled(current_user.id, flashcard.id, flashcard.next_review_date)
+    forecast.invalidate(current_user.id)
     return flashcard
 
 
 @router.post("/flashcards/from-session")
 async def create_flashcard_from_session(
     session_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """从学习会话自动生成闪卡"""
-    session = db.query(LearningSession).filter(
+    session = await db.scalar(select(LearningSession).where(
         LearningSession.id == session_id,
         LearningSession.user_id == current_user.id
-    ).first()
+    ))
 
     if not session:
         raise HTTPException(status_code=404, detail="学习会话不存在")
@@ -75,68 +115,396 @@ async def create_flashcard_from_session(
     db.add(flashcard)
 
     # 更新用户统计
-    stats = current_user.statistics
-    if stats:
-        stats.total_flashcards += 1
+    await rollups.on_card_created(db, flashcard)
 
-    db.commit()
-    db.refresh(flashcard)
+    await db.commit()
+    await db.refresh(flashcard)
+    invalidate_count(("flashcards", current_user.id))
+    due_queue.card_scheduled(current_user.id, flashcard.id, flashcard.next_review_date)
+    forecast.invalidate(current_user.id)
     return flashcard
 
 
-@router.get("/flashcards/due")
+@router.get("/flashcards/due", response_model=DueFlashCards, response_model_exclude_unset=True)
 async def get_due_flashcards(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    limit: int = DUE_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """获取今日待复习的闪卡"""
-    flashcards = db.query(FlashCard).filter(
-        FlashCard.user_id == current_user.id,
-        FlashCard.next_review_date <= datetime.utcnow()
-    ).order_by(FlashCard.next_review_date).all()
+    """
+    获取待复习的闪卡（按到期时间排序，每次 limit 张）
 
-    return {
-        "flashcards": flashcards,
-        "count": len(flashcards)
-    }
+    count 为全部到期数；复习过的卡片不再到期，因此边复习边取下一页时传上一页的 next_cursor，
+    跳过的卡片不会重复出现。
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+
+    queue = await due_queue.get_queue(db, current_user.id)
+    now = datetime.utcnow()
+    keys = queue.due(now, limit + 1, after)
+    next_cursor = encode_cursor(*keys[limit - 1]) if len(keys) > limit else None
+    keys = keys[:limit]
+
+    flashcards = []
+    if keys:
+        by_id = {card.id: card for card in (await db.scalars(
+            due_queue.page_query(current_user.id, [card_id for _, card_id in keys])
+        )).all()}
+        # 其他进程已删除的卡片在索引刷新前可能仍在队列中，跳过
+        flashcards = [by_id[card_id] for _, card_id in keys if card_id in by_id]
+
+    return DueFlashCards(flashcards=flashcards, count=queue.due_count(now), limit=limit, next_cursor=next_cursor)
+
+
+def flashcards_query(user_id: str) -> Select:
+    """闪卡列表的查询（分页条件由 paginate 添加）"""
+    return select(FlashCard).options(load_only(*FLASHCARD_SUMMARY_COLUMNS)).where(FlashCard.user_id == user_id)
 
 
-@router.get("/flashcards")
+@router.get("/flashcards", response_model=FlashCardPage, response_model_exclude_unset=True)
 async def get_all_flashcards(
     page: int = 1,
     limit: int = 20,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """获取所有闪卡（分页）"""
-    total = db.query(FlashCard).filter(
-        FlashCard.user_id == current_user.id
-    ).count()
+    """获取所有闪卡（游标分页，兼容 page 参数）"""
+    flashcards, meta = await paginate(
+        db,
+        flashcards_query(current_user.id),
+        FlashCard.created_at,
+        FlashCard.id,
+        count_key=("flashcards", current_user.id),
+        cursor=cursor,
+        page=page,
+        limit=limit,
+        include_total=include_total
+    )
 
-    flashcards = db.query(FlashCard).filter(
-        FlashCard.user_id == current_user.id
-    ).order_by(FlashCard.created_at.desc()).offset((page - 1) * limit).limit(limit).all()
+    return FlashCardPage(flashcards=flashcards, **meta)
+
+
+@router.post("/flashcards/import")
+async def import_flashcards(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Form(None, alias="format"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """批量导入闪卡（CSV / JSONL / Anki TSV），在一个事务中分批插入，无效行跳过并报告"""
+    try:
+        fmt = flashcard_io.detect_format(file.filename, file_format)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    report = ImportReport()
+    now = datetime.utcnow()
+    # 读取和解析是同步的，每批在线程中完成，不阻塞事件循环
+    pending = flashcard_io.batches(flashcard_io.parse_cards(file.file, fmt, report))
+    try:
+        while (batch := await asyncio.to_thread(next, pending, None)) is not None:
+            await db.execute(insert(FlashCard), [
+                {
+                    "id": FlashCard.generate_id(),
+                    "user_id": current_user.id,
+                    "front": front,
+                    "back": back,
+                    "next_review_date": now,
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for front, back in batch
+            ])
+            report.imported += len(batch)
+    except ImportFormatError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if report.imported:
+        # 统计只更新一次
+        await rollups.bump_user_stats(db, current_user.id, total_flashcards=report.imported)
+        await db.commit()
+        invalidate_count(("flashcards", current_user.id))
+        due_queue.invalidate(current_user.id)
+        forecast.invalidate(current_user.id)
 
     return {
-        "flashcards": flashcards,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "pages": (total + limit - 1) // limit
+        "imported": report.imported,
+        "skipped": report.skipped,
+        "errors": report.errors
     }
 
 
+@router.get("/flashcards/export")
+async def export_flashcards(
+    format: str = "jsonl",
+    include_reviews: bool = True,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """流式导出闪卡：jsonl（含复习记录）、csv 或 Anki 可导入的 tsv"""
+    if format not in flashcard_io.FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式，可选：{', '.join(flashcard_io.FORMATS)}")
+
+    media_types = {"jsonl": "application/x-ndjson", "csv": "text/csv", "tsv": "text/tab-separated-values"}
+    return StreamingResponse(
+        flashcard_io.export_lines(current_user.id, format, include_reviews),
+        media_type=f"{media_types[format]}; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="flashcards.{format}"'}
+    )
+
+
+@router.post("/flashcards/reviews/batch")
+async def review_flashcards_batch(
+    request: BatchReviewRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    批量提交复习结果，在一个事务中按复习时间顺序应用
+
+    同一张卡片可以出现多次（离线期间复习了多遍）；带 client_review_id 的复习已提交过时跳过，
+    因此离线队列可以安全地整体重放。不存在的卡片（例如已删除）跳过并在 missing 中列出。
+    """
+    if not request.reviews:
+        raise HTTPException(status_code=400, detail="未提供复习记录")
+    if len(request.reviews) > FLASHCARD_REVIEW_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"单批最多 {FLASHCARD_REVIEW_BATCH_MAX} 条复习记录")
+    for i, item in enumerate(request.reviews):
+        if not 0 <= item.quality <= 5:
+            raise HTTPException(status_code=400, detail=f"第 {i + 1} 条：评分必须在 0-5 之间")
+
+    now = datetime.utcnow()
+
+    def review_time(item: BatchReviewItem) -> datetime:
+        # 统一为 naive UTC，且不晚于服务器时间
+        reviewed_at = item.reviewed_at
+        if reviewed_at is None:
+            return now
+        if reviewed_at.tzinfo is not None:
+            reviewed_at = reviewed_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return min(reviewed_at, now)
+
+    # 已提交过的 client_review_id
+    client_ids = {item.client_review_id for item in request.reviews if item.client_review_id}
+    submitted = set()
+    if client_ids:
+        submitted = set((await db.execute(
+            select(FlashCardReview.card_id, FlashCardReview.client_review_id).join(FlashCard).where(
+                FlashCard.user_id == current_user.id,
+                FlashCardReview.client_review_id.in_(client_ids)
+            )
+        )).all())
+
+    pending, duplicates = [], []
+    for item in request.reviews:
+        key = (item.card_id, item.client_review_id)
+        if item.client_review_id and key in submitted:
+            duplicates.append(item.client_review_id)
+            continue
+        submitted.add(key)
+        pending.append((review_time(item), item))
+    pending.sort(key=lambda entry: entry[0])
+
+    config = await scheduling.load_config(db, current_user.id)
+    cards, applied = await scheduling.apply_reviews(
+        db, current_user.id, [(item.card_id, item.quality, reviewed_at) for reviewed_at, item in pending], config,
+        now=now
+    )
+    # 早于卡片上次复习的离线复习按调整后的时间记录，复习记录、统计与排期一致
+    applied_reviews = [(reviewed_at, pending[i][1]) for i, reviewed_at in applied]
+
+    if applied_reviews:
+        await db.execute(insert(FlashCardReview), [
+            {
+                "id": FlashCardReview.generate_id(),
+                "card_id": item.card_id,
+                "quality": item.quality,
+                "time_spent": item.time_spent,
+                "reviewed_at": reviewed_at,
+                "client_review_id": item.client_review_id
+            }
+            for reviewed_at, item in applied_reviews
+        ])
+        await rollups.on_reviews_applied(
+            db, current_user.id, [(reviewed_at, item.quality) for reviewed_at, item in applied_reviews], cards
+        )
+        try:
+            await db.commit()
+        except IntegrityError:
+            # 同一批复习被并发重放
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="复习记录已提交，请重试")
+        due_queue.cards_scheduled(current_user.id, [(card["id"], card["next_review_date"]) for card in cards])
+        forecast.invalidate(current_user.id)
+
+    applied_ids = {item.card_id for _, item in applied_reviews}
+    return {
+        "applied": len(applied_reviews),
+        "duplicates": duplicates,
+        "missing": list(dict.fromkeys(
+            item.card_id for _, item in pending if item.card_id not in applied_ids
+        )),
+        "cards": [
+            {
+                "id": card["id"],
+                "ease_factor": card["ease_factor"],
+                "interval": card["interval"],
+                "repetitions": card["repetitions"],
+                "next_review_date": card["next_review_date"]
+            }
+            for card in cards
+        ]
+    }
+
+
+@router.get("/flashcards/scheduler")
+async def get_scheduler(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """获取复习调度配置（算法、目标回忆概率、FSRS 参数及拟合状态）"""
+    return scheduling.scheduler_record(await db.get(UserScheduler, current_user.id))
+
+
+@router.put("/flashcards/scheduler")
+async def update_scheduler(
+    request: SchedulerRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """切换调度算法或调整 FSRS 目标回忆概率；首次切换到 FSRS 时在后台拟合参数"""
+    if request.algorithm is not None and request.algorithm not in scheduling.ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"不支持的调度算法，可选：{', '.join(scheduling.ALGORITHMS)}")
+    if request.desired_retention is not None and not (
+        scheduling.MIN_DESIRED_RETENTION <= request.desired_retention <= scheduling.MAX_DESIRED_RETENTION
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"目标回忆概率必须在 {scheduling.MIN_DESIRED_RETENTION}-{scheduling.MAX_DESIRED_RETENTION} 之间"
+        )
+
+    settings = await scheduling.get_or_create_settings(db, current_user.id)
+    if request.algorithm is not None:
+        settings.algorithm = request.algorithm
+    if request.desired_retention is not None:
+        settings.desired_retention = request.desired_retention
+    await db.commit()
+    scheduling.invalidate_config(current_user.id)
+
+    record = scheduling.scheduler_record(settings)
+    if settings.algorithm == "fsrs" and settings.fitted_at is None and scheduling.start_fit(current_user.id):
+        record["fit_status"] = "fitting"
+    return record
+
+
+@router.post("/flashcards/scheduler/fit", status_code=202)
+async def fit_scheduler(current_user: CurrentUser = Depends(get_current_user)):
+    """在后台根据复习记录重新拟合 FSRS 参数，进度通过 GET /flashcards/scheduler 查看"""
+    started = scheduling.start_fit(current_user.id)
+    return {"fit_status": "fitting", "started": started}
+
+
+@router.get("/flashcards/retention")
+async def get_retention(
+    days: int = 0,
+    include_cards: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """预测 days 天后整组闪卡的回忆概率（FSRS 记忆模型，与调度算法无关）"""
+    if not 0 <= days <= 3650:
+        raise HTTPException(status_code=400, detail="days 必须在 0-3650 之间")
+
+    at = datetime.utcnow() + timedelta(days=days)
+    card_ids, recall, new_cards = await scheduling.predict_recall(db, current_user.id, at)
+    counts, edges = np.histogram(recall, bins=10, range=(0, 1))
+    result = {
+        "at": at,
+        "cards": len(card_ids),
+        "new_cards": new_cards,
+        "average_recall": float(recall.mean()) if card_ids else None,
+        "expected_forgotten": float((1 - recall).sum()),
+        "distribution": [
+            {"min": round(float(low), 1), "max": round(float(high), 1), "count": int(count)}
+            for low, high, count in zip(edges[:-1], edges[1:], counts)
+        ]
+    }
+    if include_cards:
+        result["predictions"] = [
+            {"id": card_id, "recall": value} for card_id, value in zip(card_ids, recall.tolist())
+        ]
+    return result
+
+
+@router.get("/flashcards/forecast")
+async def get_review_forecast(
+    days: int = 7,
+    recall: Optional[float] = None,
+    simulations: int = forecast.FORECAST_DEFAULT_SIMULATIONS,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    预测之后 days 天（含今天）每天的复习量
+
+    recall 为假设的回忆概率（SM-2 默认 0.9，FSRS 默认按模型预测）；每天给出多次模拟的平均值和 10% / 90% 分位数。
+    结果缓存到下一次复习或增删闪卡。
+    """
+    if not 1 <= days <= forecast.FORECAST_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"days 必须在 1-{forecast.FORECAST_MAX_DAYS} 之间")
+    if recall is not None and not 0 < recall <= 1:
+        raise HTTPException(status_code=400, detail="recall 必须在 0-1 之间")
+    if not 1 <= simulations <= forecast.FORECAST_MAX_SIMULATIONS:
+        raise HTTPException(status_code=400, detail=f"simulations 必须在 1-{forecast.FORECAST_MAX_SIMULATIONS} 之间")
+
+    config = await scheduling.load_config(db, current_user.id)
+    today = datetime.utcnow().date()
+    # 调度配置（含拟合参数）不同的结果分开缓存
+    key = (today, days, recall, simulations, config)
+    entries = forecast.entries_for(current_user.id)
+    result = entries.get(key)
+    if result is None:
+        cards = await forecast.load_cards(db, current_user.id, today)
+        counts = await asyncio.to_thread(
+            forecast.simulate, cards, days, simulations, recall, config, forecast.seed_for(current_user.id)
+        )
+        result = {
+            "start": today,
+            "days": days,
+            "algorithm": config.algorithm,
+            "recall": recall,
+            "simulations": simulations,
+            "total": round(float(counts.sum(axis=1).mean()), 1),
+            "forecast": forecast.summarize(counts, today)
+        }
+        entries[key] = result
+    return result
+
+
+@router.get("/flashcards/stats")
+async def get_flashcard_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """获取闪卡复习统计（读取汇总表）"""
+    return await rollups.read_flashcard_stats(db, current_user.id)
+
+
 @router.get("/flashcards/{card_id}")
 async def get_flashcard(
     card_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """获取单张闪卡详情"""
-    card = db.query(FlashCard).filter(
+    card = await db.scalar(select(FlashCard).where(
         FlashCard.id == card_id,
         FlashCard.user_id == current_user.id
-    ).first()
+    ))
 
     if not card:
         raise HTTPException(status_code=404, detail="闪卡不存在")
@@ -148,14 +516,14 @@ async def get_flashcard(
 async def review_flashcard(
     card_id: str,
     request: ReviewRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """提交复习结果"""
-    card = db.query(FlashCard).filter(
+    card = await db.scalar(select(FlashCard).where(
         FlashCard.id == card_id,
         FlashCard.user_id == current_user.id
-    ).first()
+    ))
 
     if not card:
         raise HTTPException(status_code=404, detail="闪卡不存在")
@@ -173,11 +541,15 @@ async def review_flashcard(
     )
     db.add(review)
 
-    # 更新闪卡状态（SM-2 算法）
-    card.calculate_next_review(request.quality)
+    # 更新闪卡状态（SM-2 或用户选用的 FSRS）
+    old_interval = card.interval
+    scheduling.review_card(card, request.quality, await scheduling.load_config(db, current_user.id))
+    await rollups.on_card_reviewed(db, card, request.quality, old_interval)
 
-    db.commit()
-    db.refresh(card)
+    await db.commit()
+    await db.refresh(card)
+    due_queue.card_scheduled(current_user.id, card.id, card.next_review_date)
+    forecast.invalidate(current_user.id)
 
     return {
         "card": card,
@@ -190,87 +562,28 @@ async def review_flashcard(
 @router.delete("/flashcards/{card_id}")
 async def delete_flashcard(
     card_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """删除闪卡"""
-    card = db.query(FlashCard).filter(
+    card = await db.scalar(select(FlashCard).where(
         FlashCard.id == card_id,
         FlashCard.user_id == current_user.id
-    ).first()
+    ))
 
     if not card:
         raise HTTPException(status_code=404, detail="闪卡不存在")
 
-    db.delete(card)
-
-    # 更新用户统计
-    stats = current_user.statistics
-    if stats:
-        stats.total_flashcards = max(0, stats.total_flashcards - 1)
+    await rollups.on_card_deleted(db, card)
+    await db.delete(card)
 
-    db.commit()
+    await db.commit()
+    invalidate_count(("flashcards", current_user.id))
+    due_queue.card_removed(current_user.id, card_id)
+    forecast.invalidate(current_user.id)
     return {"deleted": True}
 
 
-@router.get("/flashcards/stats")
-async def get_flashcard_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """获取闪卡复习统计"""
-    from datetime import timedelta
-
-    now = datetime.utcnow()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-    # 今日复习数
-    reviews_today = db.query(FlashCardReview).join(FlashCard).filter(
-        FlashCard.user_id == current_user.id,
-        FlashCardReview.reviewed_at >= today_start
-    ).count()
-
-    # 今日待复习
-    due_today = db.query(FlashCard).filter(
-        FlashCard.user_id == current_user.id,
-        FlashCard.next_review_date <= now
-    ).count()
-
-    # 本周复习数
-    week_start = now - timedelta(days=7)
-    reviews_week = db.query(FlashCardReview).join(FlashCard).filter(
-        FlashCard.user_id == current_user.id,
-        FlashCardReview.reviewed_at >= week_start
-    ).count()
-
-    # 总闪卡数
-    total_cards = db.query(FlashCard).filter(
-        FlashCard.user_id == current_user.id
-    ).count()
-
-    # 已掌握的卡片（间隔 > 30 天）
-    mastered_cards = db.query(FlashCard).filter(
-        FlashCard.user_id == current_user.id,
-        FlashCard.interval > 30
-    ).count()
-
-    # 平均质量评分
-    avg_quality = db.query(FlashCardReview.quality).join(FlashCard).filter(
-        FlashCard.user_id == current_user.id
-    ).all()
-    avg_quality = sum(avg_quality) / len(avg_quality) if avg_quality else 0
-
-    return {
-        "total_cards": total_cards,
-        "due_today": due_today,
-        "reviews_today": reviews_today,
-        "reviews_week": reviews_week,
-        "mastered_cards": mastered_cards,
-        "mastery_rate": round(mastered_cards / total_cards * 100, 1) if total_cards > 0 else 0,
-        "avg_quality": round(avg_quality, 1)
-    }
-
-
 def get_review_feedback(quality: int) -> str:
     """根据评分返回反馈信息"""
     feedback = {
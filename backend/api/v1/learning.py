@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from typing import Optional
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from typing import List, Optional
 from pydantic import BaseModel
-import requests
-from bs4 import BeautifulSoup
-from llm_providers import get_llm_client
+from streaming import sse_response
+import coach
+from auth import CurrentUser, get_current_user
+from rate_limit import charge_evaluations
+from url_fetcher import extract_text_from_url
 
 router = APIRouter()
 
@@ -12,26 +15,8 @@ class ContentRequest(BaseModel):
     type: str  # 'text' or 'url'
     content: str
     provider: Optional[str] = None  # AI 服务商
-
-
-def extract_text_from_url(url: str) -> str:
-    """Extract text content from a URL, with special handling for WeChat articles."""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Specific logic for WeChat Official Account articles
-        content_div = soup.find(id="js_content")
-        if content_div:
-            return content_div.get_text(strip=True)
-
-        return soup.get_text(strip=True)[:10000]
-    except Exception as e:
-        print(f"Error fetching URL: {e}")
-        raise HTTPException(status_code=400, detail=f"Failed to fetch URL: {str(e)}")
+    stream: bool = False  # 以 SSE 流式返回
+    no_cache: bool = False  # 跳过问题缓存，强制重新生成
 
 
 @router.post("/generate-question")
@@ -39,37 +24,21 @@ async def generate_question(request: ContentRequest):
     """Generate a Socratic question based on the input content."""
     text = request.content
     if request.type == 'url':
-        text = extract_text_from_url(request.content)
+        text = await extract_text_from_url(request.content)
 
     if not text:
         raise HTTPException(status_code=400, detail="Could not extract text from content")
 
-    # Limit text length
-    if len(text) > 15000:
-        text = text[:15000]
+    text = coach.prepare_content(text)
+    use_cache = not request.no_cache
 
-    # Get LLM client based on provider
-    client, model = get_llm_client(request.provider)
-
-    system_prompt = (
-        "你是一个'费曼教练'。你的目标是通过教学来帮助用户学习。"
-        "用户会提供一段文本。"
-        "1. 绝对不要直接总结这段文本。"
-        "2. 识别核心概念或逻辑。"
-        "3. 生成一个具有挑战性的苏格拉底式问题，要求用户用大白话解释核心概念（例如：'请把这个核心逻辑，讲给一个 5 岁的孩子听'）。"
-        "仅输出问题文本，不要包含其他对话填充词。必须使用中文回答。"
-    )
+    if request.stream:
+        return sse_response(coach.stream_question_for_document(text, request.provider, use_cache))
 
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text}
-            ]
-        )
-        question = response.choices[0].message.content
-        return {"question": question, "original_content": text}
+        return await coach.question_for_document(text, request.provider, use_cache)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="AI 服务响应超时")
     except Exception as e:
         print(f"LLM Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -80,7 +49,8 @@ async def evaluate_answer(
     file: Optional[UploadFile] = File(None),
     answer_text: Optional[str] = Form(None),
     original_content: str = Form(...),
-    provider: Optional[str] = Form(None)
+    provider: Optional[str] = Form(None),
+    stream: bool = Form(False)
 ):
     """Evaluate the user's answer and provide feedback with a score."""
     user_answer = answer_text
@@ -88,39 +58,69 @@ async def evaluate_answer(
     if not user_answer:
         raise HTTPException(status_code=400, detail="未提供回答")
 
-    # Get LLM client based on provider
-    client, model = get_llm_client(provider)
-
-    system_prompt = (
-        "你是一个'费曼教练'。请对比用户的解释与原文。"
-        "1. 识别误解或遗漏的关键点。"
-        "2. 提供建设性的反馈。"
-        "3. 给出一个 0-100 的'掌握度评分'。"
-        "以 JSON 格式返回结果，包含键：'feedback' (string), 'score' (number), 'transcription' (string - 用户的回答)。确保 feedback 使用中文。"
-    )
-
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Original Text: {original_content}\n\nUser Answer: {user_answer}"}
-            ],
-            response_format={"type": "json_object"}
-        )
-
-        result_json = response.choices[0].message.content
-        result = json.loads(result_json)
-
+    def with_transcription(result: dict) -> dict:
         # Add the user's answer to the result
         result["transcription"] = user_answer
-
         return result
+
+    if stream:
+        return sse_response(
+            coach.stream_evaluation(original_content, user_answer, provider),
+            on_done=with_transcription
+        )
+
+    try:
+        result = await coach.evaluate_answer(original_content, user_answer, provider)
+        return with_transcription(result)
     except Exception as e:
         print(f"LLM Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class BatchAnswer(BaseModel):
+    id: Optional[str] = None  # 客户端自定义标识，原样返回
+    answer_text: str
+
+
+class BatchEvaluateRequest(BaseModel):
+    original_content: str
+    answers: List[BatchAnswer]
+    provider: Optional[str] = None
+    concurrency: Optional[int] = None  # 同时评估的数量，受服务端上限约束
+
+
+@router.post("/evaluate-answers/batch")
+async def evaluate_answers_batch(
+    request: BatchEvaluateRequest,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """批量评估同一原文下的多个回答，以 SSE 按完成顺序逐条返回（需登录，每条回答计入用户的评估额度）"""
+    if not request.answers:
+        raise HTTPException(status_code=400, detail="未提供回答")
+    if len(request.answers) > coach.LLM_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多评估 {coach.LLM_BATCH_MAX_ITEMS} 个回答"
+        )
+    charge_evaluations(current_user.id, len(request.answers))
+
+    async def events():
+        async for event, payload in coach.evaluate_batch(
+            request.original_content,
+            [answer.answer_text for answer in request.answers],
+            request.provider,
+            request.concurrency
+        ):
+            if event != "done":
+                answer = request.answers[payload["index"]]
+                payload["id"] = answer.id
+                if "result" in payload:
+                    payload["result"]["transcription"] = answer.answer_text
+            yield event, payload
+
+    return sse_response(events())
+
+
 @router.get("/providers")
 async def get_providers():
     """获取可用的 AI 模型服务商列表"""
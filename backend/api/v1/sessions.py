@@ -1,10 +1,15 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 from typing import Optional
-from database import get_db
-from models import LearningSession, User
-from auth import get_current_user, get_optional_user
+from database import get_async_db
+from pagination import invalidate_count, paginate
+from schemas import SESSION_SUMMARY_COLUMNS, SessionPage
+from models import LearningSession
+from auth import CurrentUser, get_current_user, get_optional_user
 from datetime import datetime
 import uuid
 
@@ -23,8 +28,8 @@ class SessionRequest(BaseModel):
 @router.post("/")
 async def create_session(
     request: SessionRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_optional_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[CurrentUser] = Depends(get_optional_user)
 ):
     """保存学习会话"""
     session = LearningSession(
@@ -39,47 +44,56 @@ async def create_session(
         created_at=datetime.utcnow()
     )
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
+    if current_user:
+        invalidate_count(("sessions", current_user.id))
     return session
 
 
-@router.get("/")
+def sessions_query(user_id: str) -> Select:
+    """学习历史列表的查询（分页条件由 paginate 添加）"""
+    return select(LearningSession).options(load_only(*SESSION_SUMMARY_COLUMNS)).where(
+        LearningSession.user_id == user_id
+    )
+
+
+@router.get("/", response_model=SessionPage, response_model_exclude_unset=True)
 async def get_sessions(
     page: int = 1,
     limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """获取用户的学习历史（分页）"""
-    total = db.query(LearningSession).filter(
-        LearningSession.user_id == current_user.id
-    ).count()
-
-    sessions = db.query(LearningSession).filter(
-        LearningSession.user_id == current_user.id
-    ).order_by(LearningSession.created_at.desc()).offset((page - 1) * limit).limit(limit).all()
+    """获取用户的学习历史（游标分页，兼容 page 参数；只返回摘要字段）"""
+    sessions, meta = await paginate(
+        db,
+        sessions_query(current_user.id),
+        LearningSession.created_at,
+        LearningSession.id,
+        count_key=("sessions", current_user.id),
+        cursor=cursor,
+        page=page,
+        limit=limit,
+        include_total=include_total
+    )
 
-    return {
-        "sessions": sessions,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "pages": (total + limit - 1) // limit
-    }
+    return SessionPage(sessions=sessions, **meta)
 
 
 @router.get("/{session_id}")
 async def get_session(
     session_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """获取单个会话详情"""
-    session = db.query(LearningSession).filter(
+    session = await db.scalar(select(LearningSession).where(
         LearningSession.id == session_id,
         LearningSession.user_id == current_user.id
-    ).first()
+    ))
 
     if not session:
         raise HTTPException(status_code=404, detail="会话不存在")
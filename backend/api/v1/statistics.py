@@ -1,29 +1,30 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from database import get_db
-from models import LearningSession, UserStatistics, User
-from auth import get_current_user
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from typing import Optional
+from datetime import datetime, timedelta
+from database import get_async_db
+from models import LearningSession, UserStatistics
+from auth import CurrentUser, get_current_user
 
 router = APIRouter()
 
 
 @router.get("/overview")
 async def get_statistics(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """获取用户学习统计概览"""
     # Get or update user statistics
-    stats = db.query(UserStatistics).filter(
-        UserStatistics.user_id == current_user.id
-    ).first()
+    stats = await db.get(UserStatistics, current_user.id)
 
     if not stats:
         # Calculate initial statistics
-        sessions = db.query(LearningSession).filter(
+        sessions = (await db.scalars(select(LearningSession).where(
             LearningSession.user_id == current_user.id
-        ).all()
+        ))).all()
 
         total_sessions = len(sessions)
         avg_score = sum(s.score for s in sessions) / total_sessions if total_sessions > 0 else 0
@@ -36,8 +37,8 @@ async def get_statistics(
             best_score=best_score
         )
         db.add(stats)
-        db.commit()
-        db.refresh(stats)
+        await db.commit()
+        await db.refresh(stats)
 
     return {
         "total_sessions": stats.total_sessions,
@@ -46,39 +47,44 @@ async def get_statistics(
     }
 
 
+def _day_bucket(dialect: str, column):
+    """把时间列转成 'YYYY-MM-DD' 字符串，用于按天分组"""
+    if dialect == "postgresql":
+        return func.to_char(column, "YYYY-MM-DD")
+    return func.date(column)
+
+
+def chart_query(dialect: str, user_id: str, since: Optional[datetime] = None) -> Select:
+    """学习趋势的查询：按天统计次数和平均分，since 为空表示全部时间"""
+    day = _day_bucket(dialect, LearningSession.created_at).label("day")
+    stmt = select(
+        day,
+        func.count().label("count"),
+        func.avg(LearningSession.score).label("avg_score")
+    ).where(LearningSession.user_id == user_id)
+
+    if since is not None:
+        stmt = stmt.where(LearningSession.created_at >= since)
+
+    # 只读 (user_id, created_at, score)，由覆盖索引完成
+    return stmt.group_by(day).order_by(day)
+
+
 @router.get("/chart")
 async def get_chart_data(
     days: int = 30,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """获取图表数据 - 学习趋势"""
-    from datetime import datetime, timedelta
-
-    start_date = datetime.utcnow() - timedelta(days=days)
-
-    sessions = db.query(LearningSession).filter(
-        LearningSession.user_id == current_user.id,
-        LearningSession.created_at >= start_date
-    ).order_by(LearningSession.created_at).all()
-
-    # Group by date
-    chart_data = {}
-    for session in sessions:
-        date_key = session.created_at.strftime("%Y-%m-%d")
-        if date_key not in chart_data:
-            chart_data[date_key] = {"count": 0, "scores": []}
-        chart_data[date_key]["count"] += 1
-        chart_data[date_key]["scores"].append(session.score)
-
-    # Format for frontend
-    formatted_data = [
+    """获取图表数据 - 学习趋势（days <= 0 表示全部时间）"""
+    since = datetime.utcnow() - timedelta(days=days) if days > 0 else None
+    rows = (await db.execute(chart_query(db.bind.dialect.name, current_user.id, since))).all()
+
+    return [
         {
-            "date": date,
-            "count": data["count"],
-            "avg_score": sum(data["scores"]) / len(data["scores"]) if data["scores"] else 0
+            "date": row.day,
+            "count": row.count,
+            "avg_score": row.avg_score or 0
         }
-        for date, data in sorted(chart_data.items())
+        for row in rows
     ]
-
-    return formatted_data
@@ -1,21 +1,49 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Set
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from models import User
+from ttl_cache import TTLCache
 import os
+import threading
+import time
 
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# 已验证 token -> 用户身份的缓存；用户被修改或删除时失效
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """当前登录用户的身份信息（与数据库会话无关，可以跨请求缓存）"""
+    id: str
+    email: str
+    display_name: Optional[str]
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(id=user.id, email=user.email, display_name=user.display_name, created_at=user.created_at)
+
+
+_user_cache = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_CACHE_TTL)
+# user_id -> 该用户已缓存的 token，用于按用户失效
+_tokens_by_user = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_CACHE_TTL)
+_index_lock = threading.Lock()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -28,33 +56,80 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify JWT token and return user_id."""
+def decode_token(token: str) -> Optional[dict]:
+    """Verify JWT token and return its payload."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-        return user_id
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+
+def verify_token(token: str) -> Optional[str]:
+    """Verify JWT token and return user_id."""
+    payload = decode_token(token)
+    return payload["sub"] if payload else None
+
+
+def invalidate_user(user_id: str) -> None:
+    """清除某个用户的所有缓存 token"""
+    with _index_lock:
+        tokens: Set[str] = _tokens_by_user.pop(user_id) or set()
+    for token in tokens:
+        _user_cache.pop(token)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
+
+
+def _cache_user(token: str, payload: dict, user: CurrentUser) -> None:
+    # 不超过 token 本身的剩余有效期
+    ttl = AUTH_CACHE_TTL
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl <= 0:
+        return
+    _user_cache.set(token, user, ttl=ttl)
+    with _index_lock:
+        tokens = _tokens_by_user.get(user.id) or set()
+        tokens.add(token)
+        _tokens_by_user.set(user.id, tokens)
+
+
+async def _load_user(token: str, payload: dict, db: AsyncSession) -> Optional[CurrentUser]:
+    """按已验证的 token 查询用户并写入缓存"""
+    user = await db.get(User, payload["sub"])
+    if user is None:
+        return None
+
+    current = CurrentUser.from_user(user)
+    _cache_user(token, payload, current)
+    return current
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
     """Get current authenticated user from JWT token."""
     token = credentials.credentials
-    user_id = verify_token(token)
+    user = _user_cache.get(token)
+    if user is not None:
+        return user
 
-    if user_id is None:
+    payload = decode_token(token)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await _load_user(token, payload, db)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,17 +141,19 @@ async def get_current_user(
 
 async def get_optional_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[CurrentUser]:
     """Get current user if authenticated, otherwise return None."""
     if credentials is None:
         return None
 
     token = credentials.credentials
-    user_id = verify_token(token)
+    user = _user_cache.get(token)
+    if user is not None:
+        return user
 
-    if user_id is None:
+    payload = decode_token(token)
+    if payload is None:
         return None
 
-    user = db.query(User).filter(User.id == user_id).first()
-    return user
+    return await _load_user(token, payload, db)
@@ -0,0 +1,109 @@
+"""
+并发请求吞吐基准：在事件循环中使用同步 Session vs AsyncSession
+
+用法:
+    python benchmarks/bench_db_concurrency.py [并发数] [每个协程的请求数]
+
+在临时 SQLite 库中写入示例数据，模拟多个并发请求执行"会话列表"查询，
+同时用一个心跳协程测量事件循环被阻塞的最长时间。
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+
+from sqlalchemy import func, select  # noqa: E402
+
+from database import AsyncSessionLocal, SessionLocal, async_engine, init_db  # noqa: E402
+from models import LearningSession, User  # noqa: E402
+
+USER_ID = "bench-user"
+
+
+def seed(rows: int = 5000) -> None:
+    init_db()
+    db = SessionLocal()
+    db.add(User(id=USER_ID, email="bench@example.com", password_hash="x"))
+    now = datetime.utcnow()
+    db.add_all(
+        LearningSession(
+            id=f"s{i}", user_id=USER_ID, content_type="text",
+            original_content="原文" * 500, question="问题", user_answer="回答",
+            feedback="反馈" * 100, score=i % 100, created_at=now - timedelta(minutes=i)
+        )
+        for i in range(rows)
+    )
+    db.commit()
+    db.close()
+
+
+def list_query(page: int):
+    return select(LearningSession).where(
+        LearningSession.user_id == USER_ID
+    ).order_by(LearningSession.created_at.desc()).offset(page * 10).limit(10)
+
+
+def count_query():
+    return select(func.count()).select_from(LearningSession).where(LearningSession.user_id == USER_ID)
+
+
+async def sync_request(page: int) -> None:
+    db = SessionLocal()
+    try:
+        db.scalar(count_query())
+        db.scalars(list_query(page)).all()
+    finally:
+        db.close()
+
+
+async def async_request(page: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.scalar(count_query())
+        (await db.scalars(list_query(page))).all()
+
+
+async def run(request, concurrency: int, per_worker: int):
+    max_lag = 0.0
+    stop = False
+
+    async def heartbeat():
+        nonlocal max_lag
+        while not stop:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.001)
+
+    async def worker(n: int):
+        for i in range(per_worker):
+            await request((n * per_worker + i) % 400)
+
+    ticker = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop = True
+    await ticker
+    return concurrency * per_worker / elapsed, max_lag
+
+
+async def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_worker = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seed()
+
+    for name, request in (("sync Session", sync_request), ("AsyncSession", async_request)):
+        throughput, max_lag = await run(request, concurrency, per_worker)
+        print(f"{name:<14} {throughput:>8.1f} req/s   max event-loop stall {max_lag * 1000:>7.1f} ms")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
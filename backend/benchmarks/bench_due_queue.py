@@ -0,0 +1,96 @@
+"""
+待复习队列基准：一次取出全部到期闪卡 vs 到期队列索引取一页
+用法:
+    python benchmarks/bench_due_queue.py [闪卡数]
+
+在临时 SQLite 库中为一个用户生成闪卡（大部分已到期，模拟长时间未复习），通过 ASGI 调用
+/api/v1/flashcards/due，对比旧的全量查询与按页获取的耗时和响应大小，并检查索引给出的到期数与 SQL 一致。
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("LLM_CACHE_DB_PATH", "")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+from sqlalchemy.orm import load_only  # noqa: E402
+
+import main  # noqa: E402
+import passwords  # noqa: E402
+from auth import create_access_token  # noqa: E402
+from database import AsyncSessionLocal, SessionLocal, async_engine, init_db  # noqa: E402
+from models import FlashCard, User  # noqa: E402
+from schemas import FLASHCARD_SUMMARY_COLUMNS, DueFlashCards  # noqa: E402
+
+USER_ID = "bench-user"
+
+
+def seed(cards: int) -> None:
+    db = SessionLocal()
+    db.add(User(id=USER_ID, email="bench@example.com", password_hash=passwords.hash_password_sync("x")))
+    now = datetime.utcnow()
+    db.execute(insert(FlashCard), [
+        {
+            "id": FlashCard.generate_id(),
+            "user_id": USER_ID,
+            "front": f"问题 {i} " + "内容" * 100,
+            "back": f"答案 {i} " + "解释" * 200,
+            "next_review_date": now - timedelta(minutes=i) if i % 10 else now + timedelta(days=i % 30 + 1),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(cards)
+    ])
+    db.commit()
+    db.close()
+
+
+async def full_query() -> int:
+    """改动前的实现：查询并序列化全部到期闪卡"""
+    async with AsyncSessionLocal() as db:
+        flashcards = (await db.scalars(select(FlashCard).options(load_only(*FLASHCARD_SUMMARY_COLUMNS)).where(
+            FlashCard.user_id == USER_ID,
+            FlashCard.next_review_date <= datetime.utcnow()
+        ).order_by(FlashCard.next_review_date))).all()
+        return len(DueFlashCards(flashcards=flashcards, count=len(flashcards), limit=len(flashcards))
+                   .model_dump_json())
+
+
+async def run() -> int:
+    token = create_access_token({"sub": USER_ID})
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        started = time.perf_counter()
+        size = await full_query()
+        print(f"全量查询      {(time.perf_counter() - started) * 1000:8.1f} ms  {size / 1024:8.1f} KiB")
+
+        for label in ("首次（加载索引）", "之后每页"):
+            started = time.perf_counter()
+            response = await client.get("/api/v1/flashcards/due", params={"limit": 20})
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"队列取一页 {label:<8} {elapsed:8.1f} ms  {len(response.content) / 1024:8.1f} KiB")
+        count = response.json()["count"]
+
+    async with AsyncSessionLocal() as db:
+        expected = await db.scalar(select(func.count()).select_from(FlashCard).where(
+            FlashCard.user_id == USER_ID, FlashCard.next_review_date <= datetime.utcnow()
+        ))
+    await async_engine.dispose()
+
+    print(f"到期数：索引 {count}，SQL {expected}")
+    return 0 if count == expected else 1
+
+
+if __name__ == "__main__":
+    init_db()
+    seed(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,91 @@
+"""
+FSRS 参数拟合基准
+用法:
+    python benchmarks/bench_fsrs_fit.py [复习条数]
+
+用一组已知参数模拟复习历史（每张卡片的复习次数为长尾分布，按 FSRS 间隔加随机偏差复习，
+按回忆概率抽样是否记住），然后：
+  1. 检查分桶回放 fsrs.replay 与逐次调用 fsrs.step（复习接口使用的路径）得到的记忆状态一致；
+  2. 从默认参数开始拟合，输出耗时以及默认参数、拟合参数、真实参数的对数损失；
+  3. 输出整组卡片回忆概率预测的耗时。
+状态不一致，或拟合结果不优于默认参数时以非零状态退出。
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import fsrs  # noqa: E402
+
+TRUE_PARAMETERS = fsrs.DEFAULT_PARAMETERS.copy()
+TRUE_PARAMETERS[[0, 1, 2, 3, 8, 11]] = [1.0, 3.0, 8.0, 25.0, 1.2, 1.5]
+
+
+def simulate(reviews: int, seed: int = 7):
+    """返回按 (卡片, 时间) 排序的 (card_index, review_day, grade) 和逐次 step 得到的最终 (S, D)"""
+    rng = np.random.default_rng(seed)
+    w = fsrs.as_matrix(TRUE_PARAMETERS)
+    lengths = np.minimum(rng.geometric(1 / 8, size=reviews // 8) + 1, 400)
+    cards = lengths.size
+    s, d, day = np.full(cards, np.nan), np.full(cards, np.nan), np.zeros(cards)
+    logged = []
+    for j in range(int(lengths.max())):
+        active = lengths > j
+        if j == 0:
+            elapsed = np.zeros(cards)
+            grade = rng.choice([1, 2, 3, 4], size=cards, p=[0.3, 0.1, 0.5, 0.1])
+        else:
+            elapsed = fsrs.next_interval(s, 0.9) * rng.uniform(0.5, 2.0, size=cards)
+            remembered = rng.random(cards) < fsrs.retrievability(elapsed, s)
+            grade = np.where(remembered, rng.choice([2, 3, 4], size=cards, p=[0.15, 0.7, 0.15]), 1)
+        new_s, new_d = fsrs.step(w, s[None], d[None], elapsed, grade)
+        s = np.where(active, new_s[0], s)
+        d = np.where(active, new_d[0], d)
+        day = np.where(active, day + elapsed, day)
+        index = np.flatnonzero(active)
+        logged.append((index, day[index], grade[index]))
+
+    card_index = np.concatenate([entry[0] for entry in logged])
+    review_day = np.concatenate([entry[1] for entry in logged])
+    grade = np.concatenate([entry[2] for entry in logged])
+    order = np.lexsort((review_day, card_index))
+    return card_index[order], review_day[order], grade[order], s, d
+
+
+def main() -> int:
+    reviews = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    card_index, review_day, grade, s_true, d_true = simulate(reviews)
+
+    started = time.perf_counter()
+    histories = fsrs.build_histories(card_index, review_day, grade)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"{histories.reviews} 条复习，{histories.cards} 张卡，{len(histories.buckets)} 个桶，构造 {build_ms:.0f} ms")
+
+    stability, difficulty = fsrs.replay(TRUE_PARAMETERS, histories)
+    if not (np.allclose(stability, s_true) and np.allclose(difficulty, d_true)):
+        print("分桶回放与逐次 step 的记忆状态不一致")
+        return 1
+
+    started = time.perf_counter()
+    result = fsrs.fit(histories)
+    fit_s = time.perf_counter() - started
+    true_loss = float(fsrs.log_loss(TRUE_PARAMETERS, histories)[0])
+    print(f"拟合 {fit_s:.2f} s（{fsrs.FSRS_FIT_ITERATIONS} 次迭代，每次约 {fsrs.FSRS_FIT_BATCH_REVIEWS} 条）")
+    print(f"对数损失：默认参数 {result.default_loss:.4f}，拟合 {result.loss:.4f}，真实参数 {true_loss:.4f}")
+
+    started = time.perf_counter()
+    recall = fsrs.retrievability(np.full(stability.size, 7.0), stability)
+    predict_ms = (time.perf_counter() - started) * 1000
+    print(f"{stability.size} 张卡 7 天后的回忆概率：平均 {recall.mean():.3f}，计算 {predict_ms:.1f} ms")
+
+    if not result.fitted:
+        print("拟合结果不优于默认参数")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+HTML 正文抽取基准：BeautifulSoup 整树解析 vs 增量抽取器
+
+用法:
+    python benchmarks/bench_html_extract.py [保存的页面目录]
+
+目录中的 *.html / *.htm 文件作为语料；不指定目录时使用合成页面。
+增量抽取器会跳过 nav 等标签，因此含导航的页面两者输出不完全相同。
+"""
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from html_extractor import extract_text  # noqa: E402
+from url_fetcher import MAX_ARTICLE_CHARS, MAX_EXTRACT_CHARS  # noqa: E402
+
+
+def bs4_path(content: bytes) -> str:
+    """旧实现：整树解析后再截断"""
+    soup = BeautifulSoup(content, 'html.parser')
+    content_div = soup.find(id="js_content")
+    if content_div:
+        return content_div.get_text(strip=True)[:MAX_ARTICLE_CHARS]
+    return soup.get_text(strip=True)[:MAX_EXTRACT_CHARS]
+
+
+def streaming_path(content: bytes) -> str:
+    return extract_text(
+        content,
+        budget=MAX_EXTRACT_CHARS,
+        target_id="js_content",
+        target_budget=MAX_ARTICLE_CHARS,
+    )
+
+
+def synthetic_corpus():
+    paragraph = "<p>费曼学习法要求用最简单的语言解释一个概念。" * 5 + "</p>"
+    nav = "<nav>" + "<a href='#'>链接</a>" * 200 + "</nav>"
+    script = "<script>" + "var x = 1;" * 5000 + "</script>"
+    yield "wechat", (
+        "<html><head>" + script + "</head><body>" + nav
+        + "<div id='js_content'>" + paragraph * 400 + "</div>"
+        + "<div>" + paragraph * 2000 + "</div></body></html>"
+    ).encode()
+    yield "long-page", (
+        "<html><body>" + nav + paragraph * 5000 + script + "</body></html>"
+    ).encode()
+
+
+def load_corpus(directory: str):
+    for path in sorted(glob.glob(os.path.join(directory, "*.htm*"))):
+        with open(path, "rb") as f:
+            yield os.path.basename(path), f.read()
+
+
+def measure(fn, content: bytes, repeat: int = 5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(content)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    fn(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    corpus = load_corpus(sys.argv[1]) if len(sys.argv) > 1 else synthetic_corpus()
+    print(f"{'page':<24}{'size':>10}{'bs4 ms':>10}{'stream ms':>11}{'bs4 MB':>9}{'stream MB':>11}  same")
+    for name, content in corpus:
+        old, old_time, old_peak = measure(bs4_path, content)
+        new, new_time, new_peak = measure(streaming_path, content)
+        print(
+            f"{name[:23]:<24}{len(content) // 1024:>8}KB"
+            f"{old_time * 1000:>10.1f}{new_time * 1000:>11.1f}"
+            f"{old_peak / 2**20:>9.1f}{new_peak / 2**20:>11.1f}  {old == new}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+列表接口序列化基准：完整 ORM 对象 + jsonable_encoder vs load_only + 响应模型
+
+用法:
+    python benchmarks/bench_list_serialization.py [每页条数] [重复次数]
+
+在临时 SQLite 库中写入带长原文的学习会话，分别用两种方式查询一页并序列化为 JSON，
+输出响应体大小以及查询、序列化各自的平均耗时。
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.orm import load_only  # noqa: E402
+
+from database import SessionLocal, init_db  # noqa: E402
+from models import LearningSession, User  # noqa: E402
+from schemas import SESSION_SUMMARY_COLUMNS, SessionPage  # noqa: E402
+
+USER_ID = "bench-user"
+CONTENT = "费曼学习法要求用自己的话把概念讲清楚。" * 500  # 约 10k 字
+FEEDBACK = "你的解释抓住了核心，但遗漏了前提条件。" * 50
+
+
+def seed(rows: int = 1000) -> None:
+    db = SessionLocal()
+    db.add(User(id=USER_ID, email="bench@example.com", password_hash="x"))
+    now = datetime.utcnow()
+    for i in range(rows):
+        db.add(LearningSession(
+            id=f"s{i:06d}", user_id=USER_ID, content_type="text",
+            original_content=CONTENT, question=f"问题 {i}", user_answer=CONTENT[:2000],
+            feedback=FEEDBACK, score=i % 100, created_at=now - timedelta(minutes=i)
+        ))
+    db.commit()
+    db.close()
+
+
+def page_stmt(limit: int, lean: bool):
+    stmt = select(LearningSession).where(LearningSession.user_id == USER_ID)
+    if lean:
+        stmt = stmt.options(load_only(*SESSION_SUMMARY_COLUMNS))
+    return stmt.order_by(LearningSession.created_at.desc(), LearningSession.id.desc()).limit(limit)
+
+
+def run(limit: int, repeat: int, lean: bool):
+    query_time = encode_time = 0.0
+    body = b""
+    for _ in range(repeat):
+        db = SessionLocal()
+        started = time.perf_counter()
+        rows = db.scalars(page_stmt(limit, lean)).all()
+        query_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        if lean:
+            body = SessionPage(sessions=rows, limit=limit).model_dump_json().encode()
+        else:
+            payload = {"sessions": rows, "limit": limit}
+            body = json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode()
+        encode_time += time.perf_counter() - started
+        db.close()
+    return len(body), query_time / repeat * 1000, encode_time / repeat * 1000
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    init_db()
+    seed()
+
+    print(f"每页 {limit} 条，重复 {repeat} 次")
+    for name, lean in (("ORM + jsonable_encoder", False), ("load_only + 响应模型", True)):
+        size, query_ms, encode_ms = run(limit, repeat, lean)
+        print(f"{name:<24} 响应 {size / 1024:8.1f} KiB   查询 {query_ms:6.2f} ms   序列化 {encode_ms:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+并发登录基准：在事件循环中直接计算 argon2 vs 放到线程池中计算
+
+用法:
+    python benchmarks/bench_login.py [并发数] [每个协程的登录次数]
+
+在临时 SQLite 库中创建一个用户，通过 ASGI 直接调用 /api/v1/auth/login，
+输出吞吐、p50/p99 延迟，以及心跳协程测得的事件循环最长阻塞时间。
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("LLM_CACHE_DB_PATH", "")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+import passwords  # noqa: E402
+from database import SessionLocal, async_engine, init_db  # noqa: E402
+from models import User  # noqa: E402
+
+EMAIL = "bench@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+def seed() -> None:
+    db = SessionLocal()
+    db.add(User(id="bench-user", email=EMAIL, password_hash=passwords.hash_password_sync(PASSWORD)))
+    db.commit()
+    db.close()
+
+
+async def _verify_inline(password_hash: str, password: str):
+    return passwords.verify_password_sync(password_hash, password)
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def run(concurrency: int, per_worker: int):
+    transport = httpx.ASGITransport(app=main.app)
+    latencies = []
+    max_stall = 0.0
+    running = True
+
+    async def heartbeat():
+        nonlocal max_stall
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            max_stall = max(max_stall, time.perf_counter() - started - 0.005)
+
+    async def worker(client):
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            response = await client.post("/api/v1/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        beat = asyncio.create_task(heartbeat())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        running = False
+        await beat
+
+    # 连接池绑定在当前事件循环上，每轮结束时关闭
+    await async_engine.dispose()
+
+    return len(latencies) / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99), max_stall
+
+
+def main_bench():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    per_worker = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    init_db()
+    seed()
+
+    print(f"并发 {concurrency}，每个协程 {per_worker} 次登录，线程池 {passwords.PASSWORD_HASH_WORKERS} 个线程")
+    executor_verify = passwords.verify_password
+    for name, verify in (("事件循环内计算", _verify_inline), ("线程池计算", executor_verify)):
+        passwords.verify_password = verify
+        rps, p50, p99, stall = asyncio.run(run(concurrency, per_worker))
+        print(f"{name:<10} {rps:7.1f} 次/秒   p50 {p50 * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms   "
+              f"事件循环最长阻塞 {stall * 1000:7.1f} ms")
+    passwords.verify_password = executor_verify
+
+
+if __name__ == "__main__":
+    main_bench()
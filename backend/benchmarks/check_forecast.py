@@ -0,0 +1,94 @@
+"""
+复习量预测的一致性检查和速度对比
+用法:
+    python benchmarks/check_forecast.py [卡片数] [天数] [模拟次数]
+
+随机生成卡片状态（新卡、已过期、未来到期），在 recall = 1 / 0 时（结果确定）要求 forecast.simulate
+的每日复习数与逐张调用 FlashCard.calculate_next_review 逐日模拟完全一致；不一致时以非零状态退出。
+最后对比随机回忆概率下向量化模拟与逐张 Python 模拟的耗时。
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import forecast  # noqa: E402
+from models import FlashCard  # noqa: E402
+from scheduling import SchedulerConfig  # noqa: E402
+
+
+def random_cards(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    cards = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            cards.append((2.5, 0, 0, rng.randint(-5, 0)))
+        else:
+            interval = rng.randint(1, 200)
+            cards.append((rng.uniform(1.3, 3.0), interval, rng.randint(1, 10), rng.randint(-30, interval)))
+    return cards
+
+
+def as_arrays(cards):
+    return {
+        "ease_factor": np.array([c[0] for c in cards], dtype=np.float64),
+        "interval": np.array([c[1] for c in cards], dtype=np.int64),
+        "repetitions": np.array([c[2] for c in cards], dtype=np.int64),
+        "due_day": np.array([c[3] for c in cards], dtype=np.int64),
+        "stability": np.full(len(cards), np.nan),
+        "difficulty": np.full(len(cards), np.nan),
+    }
+
+
+def scalar_forecast(cards, days: int, recall: float, rng: random.Random):
+    """逐张用 calculate_next_review 模拟，返回每日复习数"""
+    start = datetime(2024, 1, 1)
+    counts = [0] * days
+    for ease, interval, reps, due_day in cards:
+        card = FlashCard(ease_factor=ease, interval=interval, repetitions=reps)
+        day = max(due_day, 0)
+        while day < days:
+            counts[day] += 1
+            quality = forecast.PASS_QUALITY if rng.random() < recall else forecast.FAIL_QUALITY
+            card.calculate_next_review(quality, now=start + timedelta(days=day))
+            day += max(card.interval, 1)
+    return counts
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    simulations = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    cards = random_cards(count)
+    arrays = as_arrays(cards)
+    config = SchedulerConfig()
+
+    for recall in (1.0, 0.0):
+        expected = scalar_forecast(cards, days, recall, random.Random(0))
+        actual = forecast.simulate(arrays, days, 3, recall, config)
+        if not all(row.tolist() == expected for row in actual):
+            print(f"recall={recall} 不一致：逐张 {expected[:10]}，向量化 {actual[0][:10].tolist()}")
+            return 1
+    print(f"{count} 张卡 {days} 天，recall = 1 / 0 时每日复习数完全一致")
+
+    started = time.perf_counter()
+    rng = random.Random(1)
+    for _ in range(simulations):
+        scalar_forecast(cards, days, 0.9, rng)
+    scalar_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    counts = forecast.simulate(arrays, days, simulations, 0.9, config, seed=1)
+    vector_s = time.perf_counter() - started
+    print(f"recall = 0.9，{simulations} 次模拟：逐张 Python {scalar_s:.2f} s，向量化 {vector_s * 1000:.0f} ms，"
+          f"{days} 天合计平均 {counts.sum(axis=1).mean():.0f} 次复习")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+JsonFieldStreamer 的分块解码检查
+用法:
+    python benchmarks/check_json_field_streamer.py
+
+把含转义字符（包括以代理对转义的非 BMP 字符）的 JSON 在每个可能的位置切成两块输入，
+要求拼接出的字段值与 json.loads 的结果一致且可以编码为 UTF-8；任一不一致时打印样例并以非零状态退出。
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from streaming import JsonFieldStreamer  # noqa: E402
+
+CASES = [
+    '{"score": 8, "feedback": "很好\\n继续\\t\\"加油\\" \\u4e2d"}',
+    '{"feedback": "表情 \\ud83d\\ude00 和 \\ud83e\\udde0 结束", "score": 9}',
+    '{"feedback": "\\ud83d\\ude00\\ud83d\\ude01"}',
+    '{"feedback": "孤立 \\ud83d 与 \\ude00 项"}',
+]
+
+
+def decode(text: str, cuts: tuple) -> str:
+    streamer = JsonFieldStreamer("feedback")
+    parts = []
+    start = 0
+    for cut in cuts + (len(text),):
+        parts.append(streamer.feed(text[start:cut]))
+        start = cut
+    return "".join(parts)
+
+
+def check() -> int:
+    failures = 0
+    for text in CASES:
+        expected = json.loads(text)["feedback"]
+        if any(0xD800 <= ord(c) <= 0xDFFF for c in expected):
+            # 孤立代理项替换为 U+FFFD
+            expected = "".join("�" if 0xD800 <= ord(c) <= 0xDFFF else c for c in expected)
+        for a in range(len(text) + 1):
+            for b in range(a, len(text) + 1):
+                got = decode(text, (a, b))
+                try:
+                    got.encode("utf-8")
+                except UnicodeEncodeError as e:
+                    got = f"<{e}>"
+                if got != expected:
+                    failures += 1
+                    if failures <= 5:
+                        print(f"不一致：{text!r} 切分于 {a},{b}\n  期望 {expected!r}\n  实际 {got!r}")
+    if failures:
+        print(f"共 {failures} 处不一致")
+        return 1
+    print(f"{len(CASES)} 个样例在所有两处切分下解码一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(check())
@@ -0,0 +1,58 @@
+"""
+HTTP / 数据库指标的路由标签检查
+用法:
+    python benchmarks/check_metrics_labels.py
+
+在临时 SQLite 库上通过 ASGI 请求几个嵌套在 /api/v1 下的接口（含路径参数和末尾斜杠），
+要求 /metrics 中的 route 标签是完整的路由模板；缺少任一标签时打印实际标签并以非零状态退出。
+"""
+import asyncio
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'check.db')}"
+os.environ.setdefault("LLM_CACHE_DB_PATH", "")
+os.environ["METRICS_ENABLED"] = "true"
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from database import init_db  # noqa: E402
+
+EXPECTED = [
+    ("POST", "/api/v1/auth/login"),
+    ("GET", "/api/v1/sessions/"),
+    ("GET", "/api/v1/flashcards"),
+    ("GET", "/api/v1/flashcards/{card_id}"),
+    ("GET", "/api/health"),
+]
+
+
+async def run() -> int:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        await client.post("/api/v1/auth/login", json={"email": "nobody@example.com", "password": "x"})
+        await client.get("/api/v1/sessions/")
+        await client.get("/api/v1/flashcards")
+        await client.get("/api/v1/flashcards/0f1e2d3c")
+        await client.get("/api/health")
+        text = (await client.get("/metrics")).text
+
+    labels = set(re.findall(r'http_request_duration_seconds_count\{method="(\w+)",route="([^"]*)"', text))
+    missing = [item for item in EXPECTED if item not in labels]
+    if missing:
+        print(f"缺少路由标签：{missing}")
+        print(f"实际标签：{sorted(labels)}")
+        return 1
+    print(f"路由标签正确：{', '.join(route for _, route in EXPECTED)}")
+    return 0
+
+
+if __name__ == "__main__":
+    init_db()
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,141 @@
+"""
+批量 SM-2 重新调度与 FlashCard.calculate_next_review 的一致性检查和速度对比
+
+用法:
+    python benchmarks/check_sm2_equivalence.py [卡片数] [轮数]
+
+在临时 SQLite 库中随机生成卡片状态（含新卡、ease_factor 接近下限、长间隔等边界情况），
+逐轮随机评分：一份卡片逐张调用 calculate_next_review，另一份在库中用 scheduling.reschedule 批量写回，
+每轮都要求库中读回的 ease_factor / interval / repetitions / next_review_date 与逐张结果完全相等；
+任一不一致时打印样例并以非零状态退出。最后对比整组计算一轮的耗时。
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'sm2.db')}"
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+
+from database import AsyncSessionLocal, async_engine, init_db  # noqa: E402
+from models import FlashCard, User  # noqa: E402
+from scheduling import reschedule  # noqa: E402
+
+USER_ID = "sm2-check"
+MAX_INTERVAL = 36500
+
+
+def random_card(rng: random.Random) -> FlashCard:
+    kind = rng.random()
+    if kind < 0.2:
+        ease, interval, reps = 2.5, 0, 0
+    elif kind < 0.4:
+        ease, interval, reps = rng.uniform(1.3, 1.45), rng.randint(1, 30), rng.randint(1, 5)
+    elif kind < 0.5:
+        ease, interval, reps = rng.choice([1.3, 2.5, 2.6, 1.7000000000000002]), rng.randint(0, 3), rng.randint(0, 2)
+    else:
+        ease, interval, reps = rng.uniform(1.3, 4.0), rng.randint(1, 3650), rng.randint(2, 50)
+    return FlashCard(ease_factor=ease, interval=interval, repetitions=reps)
+
+
+async def store(db, ids, deck, now: datetime) -> None:
+    """用 deck 的状态替换库中用户的全部卡片"""
+    await db.execute(delete(FlashCard).where(FlashCard.user_id == USER_ID))
+    await db.execute(insert(FlashCard), [
+        {"id": card_id, "user_id": USER_ID, "front": "f", "back": "b", "ease_factor": c.ease_factor,
+         "interval": c.interval, "repetitions": c.repetitions, "next_review_date": now}
+        for card_id, c in zip(ids, deck)
+    ])
+    await db.commit()
+
+
+async def stored_rows(db, ids) -> list:
+    rows = {
+        row.id: (row.ease_factor, row.interval, row.repetitions, row.next_review_date)
+        for row in await db.execute(
+            select(FlashCard.id, FlashCard.ease_factor, FlashCard.interval,
+                   FlashCard.repetitions, FlashCard.next_review_date)
+            .where(FlashCard.user_id == USER_ID)
+        )
+    }
+    return [rows.get(card_id) for card_id in ids]
+
+
+async def check(cards: int, rounds: int, seed: int = 20240601) -> int:
+    rng = random.Random(seed)
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    ids = [f"card-{i}" for i in range(cards)]
+    scalar = [random_card(rng) for _ in range(cards)]
+
+    async with AsyncSessionLocal() as db:
+        await store(db, ids, scalar, now)
+        for round_no in range(rounds):
+            qualities = [rng.randint(0, 5) for _ in range(cards)]
+            for card, quality in zip(scalar, qualities):
+                card.calculate_next_review(quality, now=now)
+            await reschedule(db, USER_ID, ids, qualities, now=now)
+            await db.commit()
+
+            for i, (card, row) in enumerate(zip(scalar, await stored_rows(db, ids))):
+                expected = (card.ease_factor, card.interval, card.repetitions, card.next_review_date)
+                if expected != row:
+                    print(f"第 {round_no} 轮第 {i} 张不一致：逐张 {expected}，批量写回 {row}")
+                    return 1
+
+            # 间隔过长的卡片换成新的随机状态，避免日期溢出
+            if any(card.interval > MAX_INTERVAL for card in scalar):
+                for i, card in enumerate(scalar):
+                    if card.interval > MAX_INTERVAL:
+                        scalar[i] = random_card(rng)
+                await store(db, ids, scalar, now)
+
+    print(f"{cards} 张卡 × {rounds} 轮：库中写回的结果与逐张计算完全一致")
+    return 0
+
+
+async def bench(cards: int) -> None:
+    rng = random.Random(1)
+    ids = [f"card-{i}" for i in range(cards)]
+    deck = [random_card(rng) for _ in range(cards)]
+    qualities = [rng.randint(0, 5) for _ in range(cards)]
+    now = datetime.utcnow()
+
+    async with AsyncSessionLocal() as db:
+        await store(db, ids, deck, now)
+
+        started = time.perf_counter()
+        for card, quality in zip(deck, qualities):
+            card.calculate_next_review(quality, now=now)
+        scalar_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        await reschedule(db, USER_ID, ids, qualities, now=now)
+        await db.commit()
+        batch_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{cards} 张卡一轮：逐张 ORM 计算（不含写库）{scalar_ms:.1f} ms，"
+          f"reschedule 读取、计算并批量写回 {batch_ms:.1f} ms")
+
+
+async def main(cards: int, rounds: int) -> int:
+    async with AsyncSessionLocal() as db:
+        db.add(User(id=USER_ID, email=f"{USER_ID}@example.com", password_hash="x"))
+        await db.commit()
+    status = await check(cards, rounds)
+    await bench(cards * 5)
+    await async_engine.dispose()
+    return status
+
+
+if __name__ == "__main__":
+    init_db()
+    cards = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    sys.exit(asyncio.run(main(cards, rounds)))
@@ -0,0 +1,68 @@
+"""
+长文本切分
+按估算的 token 数把文本切成若干块，尽量在段落 / 句子边界处断开
+"""
+import os
+import re
+from typing import List
+
+# 单篇文档最多处理的字符数
+MAX_DOCUMENT_CHARS = int(os.getenv("MAX_DOCUMENT_CHARS", "100000"))
+# 不超过该 token 数的文本直接生成问题，超过则先分块摘要
+LLM_INPUT_TOKEN_BUDGET = int(os.getenv("LLM_INPUT_TOKEN_BUDGET", "12000"))
+# 每块的 token 上限
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "4000"))
+
+_CJK = re.compile(r"[　-〿㐀-䶿一-鿿豈-﫿＀-￯]")
+# 在句末标点或换行之后断句
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;\n])|(?<=\.\s)")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符约 1 token/字，其他约 4 字符/token"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    """没有句子边界可用时按长度硬切"""
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + max_tokens)
+        # 以纯 CJK 估算的长度起步，遇到非 CJK 文本时继续扩展
+        while end < len(text) and estimate_tokens(text[start:end]) < max_tokens:
+            end = min(len(text), end + max_tokens)
+        while end - start > 1 and estimate_tokens(text[start:end]) > max_tokens:
+            end -= max(1, (end - start) // 10)
+        pieces.append(text[start:end])
+        start = end
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int = LLM_CHUNK_TOKENS) -> List[str]:
+    """把文本切成每块不超过 max_tokens 的若干块"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for sentence in _SENTENCE_END.split(text):
+        if not sentence:
+            continue
+        tokens = estimate_tokens(sentence)
+        if tokens > max_tokens:
+            pieces = _hard_split(sentence, max_tokens)
+        else:
+            pieces = [sentence]
+
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append("".join(current))
+    return chunks
@@ -0,0 +1,301 @@
+"""
+费曼教练核心逻辑
+生成苏格拉底式问题、评估用户回答，供 legacy 接口与 v1 接口共用
+"""
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import llm_cache
+from chunking import (
+    LLM_CHUNK_TOKENS, LLM_INPUT_TOKEN_BUDGET, MAX_DOCUMENT_CHARS,
+    estimate_tokens, split_into_chunks,
+)
+from llm_cache import LLMCache, question_cache, summary_cache
+from llm_providers import AI_PROVIDERS
+from llm_router import router
+from singleflight import SingleFlight
+from streaming import JsonFieldStreamer
+
+# 分块摘要的并发数，以及归约的最大轮数
+LLM_SUMMARY_CONCURRENCY = int(os.getenv("LLM_SUMMARY_CONCURRENCY", "4"))
+MAX_REDUCE_ROUNDS = 3
+
+# 等待合并中的相同请求的最长时间（秒）
+LLM_COALESCE_TIMEOUT = float(os.getenv("LLM_COALESCE_TIMEOUT", "90"))
+
+# 批量评估：单批最多条数、默认与最大并发数
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "100"))
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+LLM_BATCH_MAX_CONCURRENCY = int(os.getenv("LLM_BATCH_MAX_CONCURRENCY", "16"))
+
+# 进行中的问题生成请求，相同服务商 + 提示词 + 内容只调用一次上游
+_question_flight = SingleFlight()
+
+QUESTION_SYSTEM_PROMPT = (
+    "你是一个'费曼教练'。你的目标是通过教学来帮助用户学习。"
+    "用户会提供一段文本。"
+    "1. 绝对不要直接总结这段文本。"
+    "2. 识别核心概念或逻辑。"
+    "3. 生成一个具有挑战性的苏格拉底式问题，要求用户用大白话解释核心概念（例如：'请把这个核心逻辑，讲给一个 5 岁的孩子听'）。"
+    "仅输出问题文本，不要包含其他对话填充词。必须使用中文回答。"
+)
+
+EVALUATION_SYSTEM_PROMPT = (
+    "你是一个'费曼教练'。请对比用户的解释与原文。"
+    "1. 识别误解或遗漏的关键点。"
+    "2. 提供建设性的反馈。"
+    "3. 给出一个 0-100 的'掌握度评分'。"
+    "以 JSON 格式返回结果，包含键：'feedback' (string), 'score' (number), 'transcription' (string - 用户的回答)。确保 feedback 使用中文。"
+)
+
+
+SUMMARY_SYSTEM_PROMPT = (
+    "你会收到一篇长文档中的一个片段。"
+    "请提炼其中的核心概念、关键论点和因果逻辑，保留重要术语和数据。"
+    "不要添加原文没有的信息，不超过 400 字，使用中文输出。"
+)
+
+
+def prepare_content(text: str) -> str:
+    """限制输入文本长度"""
+    if len(text) > MAX_DOCUMENT_CHARS:
+        text = text[:MAX_DOCUMENT_CHARS]
+    return text
+
+
+def _question_messages(text: str) -> list:
+    return [
+        {"role": "system", "content": QUESTION_SYSTEM_PROMPT},
+        {"role": "user", "content": text}
+    ]
+
+
+def _evaluation_messages(original_content: str, user_answer: str) -> list:
+    return [
+        {"role": "system", "content": EVALUATION_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Original Text: {original_content}\n\nUser Answer: {user_answer}"}
+    ]
+
+
+def _cache_key(system_prompt: str, text: str, provider_id: str) -> str:
+    model = AI_PROVIDERS[provider_id]["model"]
+    return llm_cache.make_key(provider_id, model, system_prompt, text)
+
+
+async def _cached(cache: LLMCache, system_prompt: str, text: str, provider: Optional[str]) -> Optional[str]:
+    """查找缓存；未指定服务商时任一候选服务商生成过的结果都可复用"""
+    if not llm_cache.LLM_CACHE_ENABLED:
+        return None
+    keys = [_cache_key(system_prompt, text, pid) for pid in router.candidates(provider)]
+    return await cache.get_any(keys)
+
+
+def _store(cache: LLMCache, system_prompt: str, text: str, provider_id: str, value: str) -> None:
+    if llm_cache.LLM_CACHE_ENABLED and value:
+        cache.set(_cache_key(system_prompt, text, provider_id), value)
+
+
+async def _summarize_chunk(chunk: str, provider: Optional[str], use_cache: bool) -> str:
+    if use_cache:
+        cached = await _cached(summary_cache, SUMMARY_SYSTEM_PROMPT, chunk, provider)
+        if cached is not None:
+            return cached
+
+    response, provider_id = await router.chat_completion(
+        [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": chunk}
+        ],
+        provider
+    )
+    summary = response.choices[0].message.content or ""
+    _store(summary_cache, SUMMARY_SYSTEM_PROMPT, chunk, provider_id, summary)
+    return summary
+
+
+async def condense(text: str, provider: Optional[str] = None, use_cache: bool = True) -> str:
+    """
+    把超出 LLM_INPUT_TOKEN_BUDGET 的长文本归约到预算以内
+
+    按 LLM_CHUNK_TOKENS 分块并发摘要（map），拼接摘要（reduce），
+    仍超出预算时再对摘要重复一轮。每块的摘要单独缓存，重复处理同一文档时只需调用变化的块。
+    """
+    semaphore = asyncio.Semaphore(LLM_SUMMARY_CONCURRENCY)
+
+    async def summarize(chunk: str) -> str:
+        async with semaphore:
+            return await _summarize_chunk(chunk, provider, use_cache)
+
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if estimate_tokens(text) <= LLM_INPUT_TOKEN_BUDGET:
+            return text
+        chunks = split_into_chunks(text, LLM_CHUNK_TOKENS)
+        summaries = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+        text = "\n\n".join(summary.strip() for summary in summaries if summary)
+
+    return text
+
+
+async def generate_question(
+    text: str, provider: Optional[str] = None, use_cache: bool = True
+) -> str:
+    """
+    根据文本生成一个苏格拉底式问题
+
+    use_cache=False 时跳过缓存读取，强制重新生成（结果仍会写回缓存）。
+    相同内容的并发请求合并为一次上游调用，等待超过 LLM_COALESCE_TIMEOUT
+    抛出 asyncio.TimeoutError。
+    """
+    if use_cache:
+        cached = await _cached(question_cache, QUESTION_SYSTEM_PROMPT, text, provider)
+        if cached is not None:
+            return cached
+
+    async def generate():
+        response, provider_id = await router.chat_completion(_question_messages(text), provider)
+        question = response.choices[0].message.content
+        _store(question_cache, QUESTION_SYSTEM_PROMPT, text, provider_id, question)
+        return question
+
+    flight_key = llm_cache.make_key(
+        provider or "auto",
+        AI_PROVIDERS[provider]["model"] if provider in AI_PROVIDERS else "",
+        QUESTION_SYSTEM_PROMPT,
+        text
+    )
+    return await _question_flight.do(flight_key, generate, timeout=LLM_COALESCE_TIMEOUT)
+
+
+async def stream_question(
+    text: str, provider: Optional[str] = None, use_cache: bool = True
+) -> AsyncIterator[Tuple[str, Any]]:
+    """流式生成问题，依次产出 ("delta", 文本片段)，最后产出 ("done", 完整问题)"""
+    if use_cache:
+        cached = await _cached(question_cache, QUESTION_SYSTEM_PROMPT, text, provider)
+        if cached is not None:
+            yield "delta", cached
+            yield "done", cached
+            return
+
+    stream, provider_id = await router.open_stream(_question_messages(text), provider)
+
+    parts = []
+    async for chunk in stream:
+        delta = _chunk_text(chunk)
+        if delta:
+            parts.append(delta)
+            yield "delta", delta
+
+    question = "".join(parts)
+    _store(question_cache, QUESTION_SYSTEM_PROMPT, text, provider_id, question)
+    yield "done", question
+
+
+async def question_for_document(
+    text: str, provider: Optional[str] = None, use_cache: bool = True
+) -> Dict:
+    """长文本先归约再生成问题；original_content 为实际用于提问的文本"""
+    source = await condense(text, provider, use_cache)
+    question = await generate_question(source, provider, use_cache)
+    return {"question": question, "original_content": source}
+
+
+async def stream_question_for_document(
+    text: str, provider: Optional[str] = None, use_cache: bool = True
+) -> AsyncIterator[Tuple[str, Any]]:
+    """question_for_document 的流式版本，"done" 的 payload 与其返回值相同"""
+    source = await condense(text, provider, use_cache)
+    async for event, payload in stream_question(source, provider, use_cache):
+        if event == "done":
+            payload = {"question": payload, "original_content": source}
+        yield event, payload
+
+
+def _parse_evaluation(result_json: str, user_answer: str) -> Dict:
+    result = json.loads(result_json)
+    if 'transcription' not in result:
+        result['transcription'] = user_answer
+    return result
+
+
+async def evaluate_answer(
+    original_content: str, user_answer: str, provider: Optional[str] = None
+) -> Dict:
+    """对比原文评估用户回答，返回 feedback / score / transcription"""
+    response, _ = await router.chat_completion(
+        _evaluation_messages(original_content, user_answer),
+        provider,
+        response_format={"type": "json_object"}
+    )
+    return _parse_evaluation(response.choices[0].message.content, user_answer)
+
+
+async def stream_evaluation(
+    original_content: str, user_answer: str, provider: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """流式评估，边生成边产出 feedback 片段 ("delta", 文本)，最后产出 ("done", 完整结果)"""
+    stream, _ = await router.open_stream(
+        _evaluation_messages(original_content, user_answer),
+        provider,
+        response_format={"type": "json_object"}
+    )
+
+    feedback = JsonFieldStreamer("feedback")
+    async for chunk in stream:
+        delta = _chunk_text(chunk)
+        if delta:
+            text = feedback.feed(delta)
+            if text:
+                yield "delta", text
+
+    yield "done", _parse_evaluation(feedback.text, user_answer)
+
+
+async def evaluate_batch(
+    original_content: str,
+    answers: List[str],
+    provider: Optional[str] = None,
+    concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    并发评估同一原文下的多个回答，按完成顺序产出结果
+
+    每完成一条产出 ("result", {"index", "result"}) 或 ("item_error", {"index", "detail"})，
+    最后产出 ("done", 汇总)。同时进行的 LLM 调用数不超过 concurrency。
+    """
+    limit = min(concurrency or LLM_BATCH_CONCURRENCY, LLM_BATCH_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def evaluate(index: int, answer: str):
+        async with semaphore:
+            try:
+                return index, await evaluate_answer(original_content, answer, provider), None
+            except Exception as e:
+                return index, None, e
+
+    tasks = [asyncio.ensure_future(evaluate(i, answer)) for i, answer in enumerate(answers)]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, result, error = await next_done
+            if error is None:
+                yield "result", {"index": index, "result": result}
+            else:
+                failed += 1
+                print(f"Evaluation Error (batch item {index}): {error}")
+                yield "item_error", {"index": index, "detail": str(error)}
+    finally:
+        # 客户端断开时取消尚未完成的评估
+        for task in tasks:
+            task.cancel()
+
+    yield "done", {"total": len(answers), "succeeded": len(answers) - failed, "failed": failed}
+
+
+def _chunk_text(chunk) -> str:
+    """取出流式响应块中的文本增量"""
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
@@ -1,19 +1,105 @@
-from sqlalchemy import create_engine
+from typing import AsyncIterator, Dict, Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
+import asyncio
+import logging
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./learning_coach.db")
 
-# Create engine
+
+def _async_database_url(url: str) -> str:
+    """把同步驱动的 URL 换成对应的异步驱动（aiosqlite / asyncpg）"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_SQLITE_MEMORY = IS_SQLITE and (":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") == "sqlite:")
+
+# SQLite 性能配置：production 启用 WAL 等设置，default 保持 SQLite 默认行为
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+SQLITE_PROFILES: Dict[str, Dict[str, object]] = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",          # 读写互不阻塞
+        "synchronous": "NORMAL",        # WAL 下只在 checkpoint 时 fsync
+        "busy_timeout": 5000,           # 遇到写锁时等待而不是立即报 "database is locked"
+        "cache_size": -64000,           # 约 64MB 页缓存（负数单位为 KiB）
+        "mmap_size": 268435456,         # 256MB 内存映射读
+        "temp_store": "MEMORY",
+    },
+}
+
+# 连接池配置
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite 定期维护（wal_checkpoint + optimize）的间隔秒数，0 表示关闭
+SQLITE_MAINTENANCE_INTERVAL = float(os.getenv("SQLITE_MAINTENANCE_INTERVAL", "3600"))
+
+
+def _pool_options() -> Dict[str, object]:
+    if IS_SQLITE_MEMORY:
+        # 内存库使用 SQLAlchemy 默认的单连接池
+        return {}
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if not IS_SQLITE:
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = DB_POOL_RECYCLE
+    return options
+
+
+def _sqlite_pragmas() -> Dict[str, object]:
+    pragmas = dict(SQLITE_PROFILES.get(SQLITE_PROFILE, {}))
+    if IS_SQLITE_MEMORY:
+        pragmas.pop("journal_mode", None)
+        pragmas.pop("mmap_size", None)
+    return pragmas
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """每个新连接上应用性能配置"""
+    cursor = dbapi_connection.cursor()
+    for name, value in _sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+# Create engine (used for schema management and scripts)
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **_pool_options()
 )
 
+# Async engine used by the API routes
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options())
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步会话；提交后不过期，避免访问属性时触发隐式 IO
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -27,7 +113,51 @@ def get_db() -> Session:
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency function to get an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def run_sqlite_maintenance() -> None:
+    """把 WAL 合并回主库并截断，然后让 SQLite 更新查询规划统计"""
+    async with async_engine.connect() as conn:
+        if _sqlite_pragmas().get("journal_mode") == "WAL":
+            await conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        await conn.execute(text("PRAGMA optimize"))
+
+
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+async def _maintenance_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_sqlite_maintenance()
+        except Exception as e:
+            logging.warning(f"SQLite maintenance failed: {e}")
+
+
+def start_db_maintenance() -> None:
+    """启动 SQLite 定期维护任务（应用启动时调用）"""
+    global _maintenance_task
+    if IS_SQLITE and not IS_SQLITE_MEMORY and SQLITE_MAINTENANCE_INTERVAL > 0 and _maintenance_task is None:
+        _maintenance_task = asyncio.create_task(_maintenance_loop(SQLITE_MAINTENANCE_INTERVAL))
+
+
+async def stop_db_maintenance() -> None:
+    """停止维护任务并关闭连接池（应用关闭时调用）"""
+    global _maintenance_task
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        _maintenance_task = None
+    await async_engine.dispose()
+
+
 def init_db():
     """Initialize database tables."""
-    from models import User, LearningSession, UserStatistics, FlashCard, FlashCardReview
+    from models import User, LearningSession, UserStatistics, FlashCard, FlashCardReview, UserDailyStats, UserScheduler
+    from migrations import run_migrations
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
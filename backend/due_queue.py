@@ -0,0 +1,131 @@
+"""
+按用户的到期队列
+每个用户一份按 (next_review_date, id) 排序的进程内索引，首次访问时从数据库加载 (id, next_review_date)，
+之后在复习、创建、删除闪卡的事务提交后增量更新。到期数由计数器维护：时间向前推进时只越过
+新到期的项，增删卡片时按位置加减，摊还 O(1)；取“接下来 N 张”只切片，不扫描整个积压。
+
+索引超过 DUE_QUEUE_TTL 秒后重新加载：多进程部署时其他进程的写入最迟在 TTL 后可见；
+批量导入等大范围写入直接让索引失效。
+"""
+import os
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy.sql import Select
+
+from models import FlashCard
+from schemas import FLASHCARD_SUMMARY_COLUMNS
+from ttl_cache import TTLCache
+
+# 缓存索引的用户数上限、索引有效期（秒）
+DUE_QUEUE_MAX_USERS = int(os.getenv("DUE_QUEUE_MAX_USERS", "10000"))
+DUE_QUEUE_TTL = float(os.getenv("DUE_QUEUE_TTL", "300"))
+
+
+class DueQueue:
+    """一个用户全部闪卡按 (next_review_date, id) 排序的列表"""
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[datetime]]]):
+        self._dates: Dict[str, datetime] = {card_id: when for card_id, when in entries if when is not None}
+        self._keys: List[Tuple[datetime, str]] = sorted((when, card_id) for card_id, when in self._dates.items())
+        # _keys 中不晚于 _as_of 的项数，即 _as_of 时刻的到期数
+        self._as_of = datetime.min
+        self._due = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def schedule(self, card_id: str, next_review_date: Optional[datetime]) -> None:
+        self.remove(card_id)
+        if next_review_date is not None:
+            self._dates[card_id] = next_review_date
+            insort(self._keys, (next_review_date, card_id))
+            if next_review_date <= self._as_of:
+                self._due += 1
+
+    def remove(self, card_id: str) -> None:
+        when = self._dates.pop(card_id, None)
+        if when is not None:
+            index = bisect_left(self._keys, (when, card_id))
+            del self._keys[index]
+            if when <= self._as_of:
+                self._due -= 1
+
+    def due_count(self, now: datetime) -> int:
+        """next_review_date 不晚于 now 的卡片数；now 早于之前查询过的时间（例如时钟回拨）时二分查找"""
+        if now < self._as_of:
+            return bisect_right(self._keys, (now, chr(0x10FFFF)))
+        while self._due < len(self._keys) and self._keys[self._due][0] <= now:
+            self._due += 1
+        self._as_of = now
+        return self._due
+
+    def due(
+        self, now: datetime, limit: int, after: Optional[Tuple[datetime, str]] = None
+    ) -> List[Tuple[datetime, str]]:
+        """到期的前 limit 张，after 为上一页最后一张的 (next_review_date, id)"""
+        start = bisect_right(self._keys, after) if after else 0
+        end = min(self.due_count(now), start + limit)
+        return self._keys[start:end]
+
+
+_queues = TTLCache(maxsize=DUE_QUEUE_MAX_USERS, ttl=DUE_QUEUE_TTL)
+# 每个用户的写入次数：加载期间有写入提交时不缓存加载结果，避免缓存住提交前的快照
+_generations = TTLCache(maxsize=DUE_QUEUE_MAX_USERS, ttl=DUE_QUEUE_TTL)
+
+
+def _bump(user_id: str) -> None:
+    _generations.set(user_id, _generations.get(user_id, 0) + 1)
+
+
+def index_query(user_id: str) -> Select:
+    """加载索引的查询：用户全部闪卡的 (id, next_review_date)"""
+    return select(FlashCard.id, FlashCard.next_review_date).where(FlashCard.user_id == user_id)
+
+
+def page_query(user_id: str, card_ids: Sequence[str]) -> Select:
+    """按索引给出的一页 id 读取闪卡摘要"""
+    return select(FlashCard).options(load_only(*FLASHCARD_SUMMARY_COLUMNS)).where(
+        FlashCard.user_id == user_id,
+        FlashCard.id.in_(card_ids)
+    )
+
+
+async def get_queue(db: AsyncSession, user_id: str) -> DueQueue:
+    queue = _queues.get(user_id)
+    if queue is None:
+        generation = _generations.get(user_id, 0)
+        rows = await db.execute(index_query(user_id))
+        queue = DueQueue(rows.tuples())
+        if _generations.get(user_id, 0) == generation:
+            _queues.set(user_id, queue)
+    return queue
+
+
+def cards_scheduled(user_id: str, cards: Iterable[Tuple[str, Optional[datetime]]]) -> None:
+    """闪卡创建或复习后（事务已提交）更新索引"""
+    _bump(user_id)
+    queue = _queues.get(user_id)
+    if queue is not None:
+        for card_id, next_review_date in cards:
+            queue.schedule(card_id, next_review_date)
+
+
+def card_scheduled(user_id: str, card_id: str, next_review_date: Optional[datetime]) -> None:
+    cards_scheduled(user_id, [(card_id, next_review_date)])
+
+
+def card_removed(user_id: str, card_id: str) -> None:
+    _bump(user_id)
+    queue = _queues.get(user_id)
+    if queue is not None:
+        queue.remove(card_id)
+
+
+def invalidate(user_id: str) -> None:
+    _bump(user_id)
+    _queues.pop(user_id)
@@ -0,0 +1,225 @@
+"""
+闪卡批量导入 / 导出
+导入支持 CSV（表头含 front、back，或前两列）、JSONL（每行 {"front", "back"}）和
+Anki 导出的 TSV（正面\t背面，# 开头的行为元数据）；逐行解析，不把整个文件读进内存。
+导出用服务端游标分批读取，按行生成 JSONL / CSV / TSV，由调用方以流式响应输出。
+"""
+import csv
+import io
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import FlashCard, FlashCardReview
+
+# 单次导入最多行数、每批插入行数、单面最大字符数
+FLASHCARD_IMPORT_MAX_ROWS = int(os.getenv("FLASHCARD_IMPORT_MAX_ROWS", "50000"))
+FLASHCARD_IMPORT_BATCH_SIZE = int(os.getenv("FLASHCARD_IMPORT_BATCH_SIZE", "1000"))
+FLASHCARD_MAX_FIELD_CHARS = int(os.getenv("FLASHCARD_MAX_FIELD_CHARS", "10000"))
+
+# 导出时每次从数据库取的行数
+FLASHCARD_EXPORT_BATCH_SIZE = int(os.getenv("FLASHCARD_EXPORT_BATCH_SIZE", "500"))
+
+# 导入结果中最多列出的错误行数
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ("csv", "jsonl", "tsv")
+
+EXPORT_COLUMNS = ["id", "front", "back", "ease_factor", "interval", "repetitions", "next_review_date", "created_at"]
+
+
+class ImportFormatError(ValueError):
+    """文件无法按指定格式解析"""
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    skipped: int = 0
+    errors: List[Dict] = field(default_factory=list)
+
+    def add_error(self, line: int, message: str) -> None:
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+
+def detect_format(filename: Optional[str], declared: Optional[str] = None) -> str:
+    """优先使用显式指定的格式，否则按扩展名判断（.txt 视为 Anki TSV）"""
+    fmt = (declared or "").lower()
+    if not fmt and filename:
+        ext = os.path.splitext(filename)[1].lower().lstrip(".")
+        fmt = {"txt": "tsv", "ndjson": "jsonl"}.get(ext, ext)
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"不支持的导入格式，可选：{', '.join(FORMATS)}")
+    return fmt
+
+
+def _csv_rows(text: IO[str], delimiter: str) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+    reader = csv.reader(text, delimiter=delimiter)
+    columns = None
+    for row in reader:
+        line = reader.line_num
+        if not row or (delimiter == "\t" and row[0].startswith("#")):
+            continue
+        if columns is None:
+            columns = (0, 1)
+            header = [cell.strip().lower() for cell in row]
+            if "front" in header and "back" in header:
+                columns = (header.index("front"), header.index("back"))
+                continue
+        front_col, back_col = columns
+        yield (
+            line,
+            row[front_col] if len(row) > front_col else None,
+            row[back_col] if len(row) > back_col else None,
+        )
+
+
+def _jsonl_rows(text: IO[str]) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            yield line, None, None
+            continue
+        if not isinstance(item, dict):
+            yield line, None, None
+            continue
+        yield line, item.get("front"), item.get("back")
+
+
+def parse_cards(raw: IO[bytes], fmt: str, report: ImportReport) -> Iterator[Tuple[str, str]]:
+    """逐行解析并校验，产出 (front, back)；无效行计入 report"""
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    if fmt == "jsonl":
+        rows = _jsonl_rows(text)
+    else:
+        rows = _csv_rows(text, "\t" if fmt == "tsv" else ",")
+
+    seen = 0
+    try:
+        for line, front, back in rows:
+            seen += 1
+            if seen > FLASHCARD_IMPORT_MAX_ROWS:
+                raise ImportFormatError(f"单次最多导入 {FLASHCARD_IMPORT_MAX_ROWS} 张闪卡")
+            if not isinstance(front, str) or not isinstance(back, str):
+                report.add_error(line, "缺少 front 或 back")
+                continue
+            front, back = front.strip(), back.strip()
+            if not front or not back:
+                report.add_error(line, "front 和 back 不能为空")
+                continue
+            if len(front) > FLASHCARD_MAX_FIELD_CHARS or len(back) > FLASHCARD_MAX_FIELD_CHARS:
+                report.add_error(line, f"内容超过 {FLASHCARD_MAX_FIELD_CHARS} 字")
+                continue
+            yield front, back
+    except UnicodeDecodeError:
+        raise ImportFormatError("文件必须是 UTF-8 编码")
+    except csv.Error as e:
+        raise ImportFormatError(f"CSV 解析失败：{e}")
+    finally:
+        text.detach()
+
+
+def batches(items: Iterator, size: int = FLASHCARD_IMPORT_BATCH_SIZE) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def card_record(card) -> Dict:
+    return {
+        "id": card.id,
+        "front": card.front,
+        "back": card.back,
+        "ease_factor": card.ease_factor,
+        "interval": card.interval,
+        "repetitions": card.repetitions,
+        "next_review_date": _isoformat(card.next_review_date),
+        "created_at": _isoformat(card.created_at),
+    }
+
+
+def review_record(review) -> Dict:
+    return {
+        "quality": review.quality,
+        "time_spent": review.time_spent,
+        "reviewed_at": _isoformat(review.reviewed_at),
+    }
+
+
+def jsonl_line(record: Dict) -> str:
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def table_line(values: List, delimiter: str) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=delimiter, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+
+_CARD_COLUMNS = [getattr(FlashCard, name) for name in EXPORT_COLUMNS]
+_REVIEW_COLUMNS = [FlashCardReview.quality, FlashCardReview.time_spent, FlashCardReview.reviewed_at]
+
+
+async def export_lines(user_id: str, fmt: str, include_reviews: bool = True) -> AsyncIterator[str]:
+    """
+    逐行导出用户的闪卡
+
+    jsonl 每行一张闪卡，include_reviews 时附带 reviews 复习记录；csv 为 EXPORT_COLUMNS 各列；
+    tsv 为 Anki 可导入的 正面\t背面。内存中最多保留一批数据库行和一张闪卡的复习记录。
+    使用独立的数据库会话，流式响应期间不依赖请求的依赖项生命周期。
+    """
+    order = (FlashCard.created_at, FlashCard.id)
+    async with AsyncSessionLocal() as db:
+        if fmt == "jsonl" and include_reviews:
+            stmt = select(*_CARD_COLUMNS, *_REVIEW_COLUMNS).outerjoin(
+                FlashCardReview, FlashCardReview.card_id == FlashCard.id
+            ).where(FlashCard.user_id == user_id).order_by(*order, FlashCardReview.reviewed_at)
+        else:
+            stmt = select(*_CARD_COLUMNS).where(FlashCard.user_id == user_id).order_by(*order)
+
+        result = await db.stream(stmt.execution_options(yield_per=FLASHCARD_EXPORT_BATCH_SIZE))
+
+        if fmt == "csv":
+            yield table_line(EXPORT_COLUMNS, ",")
+            async for row in result:
+                record = card_record(row)
+                yield table_line([record[name] for name in EXPORT_COLUMNS], ",")
+        elif fmt == "tsv":
+            # 字段是纯文本，按 html:false 导入时 Anki 不会把 < & 等字符当作标记
+            yield "#separator:tab\n#html:false\n"
+            async for row in result:
+                yield table_line([row.front, row.back], "\t")
+        elif not include_reviews:
+            async for row in result:
+                yield jsonl_line(card_record(row))
+        else:
+            current = None
+            async for row in result:
+                if current is None or current["id"] != row.id:
+                    if current is not None:
+                        yield jsonl_line(current)
+                    current = card_record(row)
+                    current["reviews"] = []
+                if row.reviewed_at is not None:
+                    current["reviews"].append(review_record(row))
+            if current is not None:
+                yield jsonl_line(current)
@@ -0,0 +1,156 @@
+"""
+复习量预测
+从每张闪卡当前的 interval / ease_factor / repetitions / next_review_date（FSRS 用户另加记忆状态）出发，
+按天模拟之后 N 天的复习：当天到期的卡片按假设的回忆概率随机记住（评分 4）或忘记（评分 1），
+再用与复习接口相同的调度公式排出下一次复习。卡片 × 模拟次数展开成一维数组，每天只处理当天到期的部分。
+
+随机数以用户 id 为种子，同一状态下结果可复现；结果按用户缓存，复习、增删闪卡、修改调度配置后失效。
+"""
+import os
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import fsrs
+from models import FlashCard
+from scheduling import SchedulerConfig, sm2
+from ttl_cache import TTLCache
+
+# 默认假设的回忆概率、模拟次数上限、最多预测天数
+FORECAST_DEFAULT_RECALL = float(os.getenv("FORECAST_DEFAULT_RECALL", "0.9"))
+FORECAST_DEFAULT_SIMULATIONS = int(os.getenv("FORECAST_DEFAULT_SIMULATIONS", "20"))
+FORECAST_MAX_SIMULATIONS = int(os.getenv("FORECAST_MAX_SIMULATIONS", "200"))
+FORECAST_MAX_DAYS = int(os.getenv("FORECAST_MAX_DAYS", "365"))
+
+# 预测结果缓存有效期（秒）
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", "600"))
+
+# 模拟时记住 / 忘记对应的评分
+PASS_QUALITY = 4
+FAIL_QUALITY = 1
+
+_forecasts = TTLCache(maxsize=10000, ttl=FORECAST_CACHE_TTL)
+
+
+def invalidate(user_id: str) -> None:
+    _forecasts.pop(user_id)
+
+
+def simulate(
+    cards: Dict[str, np.ndarray],
+    days: int,
+    simulations: int,
+    recall: Optional[float],
+    config: SchedulerConfig,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    返回形状为 (simulations, days) 的每日复习数
+
+    cards 为等长数组：ease_factor、interval、repetitions、due_day（相对今天的到期天数，已过期为 0 或负数）、
+    stability、difficulty（无记忆状态为 NaN）。recall 为空时 FSRS 用户按模型预测的回忆概率抽样，
+    SM-2 用户使用 FORECAST_DEFAULT_RECALL。
+    """
+    n = cards["interval"].size
+    counts = np.zeros((simulations, days), dtype=np.int64)
+    if n == 0:
+        return counts
+
+    use_fsrs = config.algorithm == "fsrs"
+    if recall is None and not use_fsrs:
+        recall = FORECAST_DEFAULT_RECALL
+    rng = np.random.default_rng(seed)
+    w = config.weights
+
+    ease = np.tile(cards["ease_factor"], simulations)
+    interval = np.tile(cards["interval"], simulations)
+    reps = np.tile(cards["repetitions"], simulations)
+    due_day = np.tile(np.maximum(cards["due_day"], 0), simulations)
+    last_day = np.tile(cards["due_day"] - cards["interval"], simulations).astype(np.float64)
+    # 没有记忆状态的已复习卡片以当前间隔为稳定性，与复习接口一致
+    legacy = np.isnan(cards["stability"]) & (cards["interval"] > 0)
+    stability = np.tile(np.where(legacy, cards["interval"], cards["stability"]), simulations)
+    difficulty = np.tile(np.where(legacy, w[0, 4], cards["difficulty"]), simulations)
+    simulation_of = np.repeat(np.arange(simulations), n)
+
+    for day in range(days):
+        due = np.flatnonzero(due_day <= day)
+        if due.size == 0:
+            continue
+        counts[:, day] = np.bincount(simulation_of[due], minlength=simulations)
+
+        if recall is None:
+            s = stability[due]
+            p = np.where(np.isnan(s), 1.0, fsrs.retrievability(day - last_day[due], np.nan_to_num(s, nan=1.0)))
+        else:
+            p = recall
+        quality = np.where(rng.random(due.size) < p, PASS_QUALITY, FAIL_QUALITY)
+
+        result = sm2(ease[due], interval[due], reps[due], quality)
+        new_interval = result.interval
+        if use_fsrs:
+            s, d = fsrs.step(w, stability[due][None], difficulty[due][None], day - last_day[due], fsrs.grades(quality))
+            stability[due], difficulty[due] = s[0], d[0]
+            new_interval = fsrs.next_interval(s[0], config.desired_retention)
+
+        ease[due], interval[due], reps[due] = result.ease_factor, new_interval, result.repetitions
+        last_day[due] = day
+        due_day[due] = day + np.maximum(new_interval, 1)
+
+    return counts
+
+
+async def load_cards(db: AsyncSession, user_id: str, today: date) -> Dict[str, np.ndarray]:
+    rows = (await db.execute(
+        select(
+            FlashCard.ease_factor, FlashCard.interval, FlashCard.repetitions,
+            FlashCard.next_review_date, FlashCard.stability, FlashCard.difficulty
+        ).where(FlashCard.user_id == user_id)
+    )).all()
+    start = np.datetime64(today, "D")
+    next_review = np.array(
+        [row.next_review_date or datetime.utcnow() for row in rows], dtype="datetime64[s]"
+    )
+    return {
+        "ease_factor": np.array([2.5 if row.ease_factor is None else row.ease_factor for row in rows], dtype=np.float64),
+        "interval": np.array([row.interval or 0 for row in rows], dtype=np.int64),
+        "repetitions": np.array([row.repetitions or 0 for row in rows], dtype=np.int64),
+        "due_day": (next_review.astype("datetime64[D]") - start).astype(np.int64),
+        "stability": np.array([np.nan if row.stability is None else row.stability for row in rows], dtype=np.float64),
+        "difficulty": np.array([np.nan if row.difficulty is None else row.difficulty for row in rows], dtype=np.float64),
+    }
+
+
+def summarize(counts: np.ndarray, today: date) -> list:
+    mean = counts.mean(axis=0)
+    low, high = np.percentile(counts, [10, 90], axis=0)
+    return [
+        {
+            "date": (today + timedelta(days=day)).isoformat(),
+            "due": round(float(mean[day]), 1),
+            "p10": int(low[day]),
+            "p90": int(high[day]),
+        }
+        for day in range(counts.shape[1])
+    ]
+
+
+def entries_for(user_id: str) -> Dict[tuple, Dict]:
+    """
+    用户的预测结果缓存 {参数: 结果}
+
+    计算前取得、计算后写入同一个字典：计算期间缓存被 invalidate 时写入的是已丢弃的字典，不会缓存旧状态的结果。
+    """
+    entries = _forecasts.get(user_id)
+    if entries is None:
+        entries = {}
+        _forecasts.set(user_id, entries)
+    return entries
+
+
+def seed_for(user_id: str) -> int:
+    return zlib.crc32(user_id.encode())
@@ -0,0 +1,291 @@
+"""
+FSRS 调度模型（FSRS-4.5 公式）
+记忆状态为稳定性 S（天，可提取性降到 90% 所需的时间）和难度 D（1-10）。
+所有函数都对数组整体计算，参数矩阵形状为 (P, 17)，可以同时计算 P 组参数：
+逐张复习、整组回放复习历史、拟合参数（有限差分一次算完 18 组）和预测整组卡片的回忆概率共用同一套实现。
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 遗忘曲线 R(t, S) = (1 + FACTOR * t / S) ^ DECAY，t = S 时 R = 0.9
+DECAY = -0.5
+FACTOR = 19 / 81
+
+MIN_STABILITY = 0.01
+MAX_INTERVAL = 36500
+
+EPOCH = datetime(1970, 1, 1)
+
+# FSRS-4.5 默认参数及拟合时的取值范围
+DEFAULT_PARAMETERS = np.array([
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+])
+PARAMETER_LOWER = np.array([0.1, 0.1, 0.1, 0.1, 1, 0.1, 0.1, 0, 0, 0.1, 0.01, 0.5, 0.01, 0.01, 0.01, 0, 1])
+PARAMETER_UPPER = np.array([100, 100, 100, 100, 10, 5, 5, 0.5, 3, 0.8, 2.5, 5, 0.2, 0.9, 2, 1, 6])
+
+# 拟合：迭代次数、每次迭代抽样的复习条数、至少需要的可预测复习条数（每张卡片首次复习之后的复习）
+FSRS_FIT_ITERATIONS = int(os.getenv("FSRS_FIT_ITERATIONS", "250"))
+FSRS_FIT_BATCH_REVIEWS = int(os.getenv("FSRS_FIT_BATCH_REVIEWS", "8192"))
+FSRS_MIN_FIT_REVIEWS = int(os.getenv("FSRS_MIN_FIT_REVIEWS", "200"))
+
+LEARNING_RATE = 0.02
+FINITE_DIFFERENCE_STEP = 1e-4
+EPSILON = 1e-6
+
+
+def grades(quality) -> np.ndarray:
+    """把 0-5 评分映射为 FSRS 的 1-4 档：0-2 忘记，3 困难，4 良好，5 简单"""
+    q = np.asarray(quality, dtype=np.int64)
+    return np.clip(q - 1, 1, 4)
+
+
+def as_matrix(parameters: Optional[Sequence[float]]) -> np.ndarray:
+    """单组参数转换为 (1, 17) 矩阵，空值使用默认参数"""
+    w = DEFAULT_PARAMETERS if parameters is None else np.asarray(parameters, dtype=np.float64)
+    return np.atleast_2d(w)
+
+
+def retrievability(elapsed_days, stability) -> np.ndarray:
+    """间隔 elapsed_days 天后的回忆概率"""
+    return np.power(1 + FACTOR * np.maximum(elapsed_days, 0) / stability, DECAY)
+
+
+def next_interval(stability, desired_retention: float) -> np.ndarray:
+    """回忆概率降到 desired_retention 时的间隔天数"""
+    days = stability / FACTOR * (desired_retention ** (1 / DECAY) - 1)
+    return np.clip(np.round(days), 1, MAX_INTERVAL).astype(np.int64)
+
+
+def initial_stability(w: np.ndarray, grade: np.ndarray) -> np.ndarray:
+    return w[:, :4][:, grade - 1]
+
+
+def initial_difficulty(w: np.ndarray, grade: np.ndarray) -> np.ndarray:
+    return np.clip(w[:, 4:5] - (grade - 3) * w[:, 5:6], 1, 10)
+
+
+def next_difficulty(w: np.ndarray, difficulty: np.ndarray, grade: np.ndarray) -> np.ndarray:
+    d = difficulty - w[:, 6:7] * (grade - 3)
+    # 向初始难度回归
+    return np.clip(w[:, 7:8] * w[:, 4:5] + (1 - w[:, 7:8]) * d, 1, 10)
+
+
+def next_stability(
+    w: np.ndarray, stability: np.ndarray, difficulty: np.ndarray, recall: np.ndarray, grade: np.ndarray
+) -> np.ndarray:
+    hard_penalty = np.where(grade == 2, w[:, 15:16], 1)
+    easy_bonus = np.where(grade == 4, w[:, 16:17], 1)
+    remembered = stability * (
+        1 + np.exp(w[:, 8:9]) * (11 - difficulty) * np.power(stability, -w[:, 9:10])
+        * np.expm1(w[:, 10:11] * (1 - recall)) * hard_penalty * easy_bonus
+    )
+    forgotten = np.minimum(
+        w[:, 11:12] * np.power(difficulty, -w[:, 12:13]) * (np.power(stability + 1, w[:, 13:14]) - 1)
+        * np.exp(w[:, 14:15] * (1 - recall)),
+        stability
+    )
+    return np.maximum(np.where(grade == 1, forgotten, remembered), MIN_STABILITY)
+
+
+def step(
+    w: np.ndarray, stability: np.ndarray, difficulty: np.ndarray, elapsed_days: np.ndarray, grade: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """一次复习后的 (S, D)；stability 为 NaN 的卡片按首次复习处理"""
+    new = np.isnan(stability)
+    s = np.where(new, 1.0, stability)
+    d = np.where(new, 5.0, difficulty)
+    recall = retrievability(elapsed_days, s)
+    return (
+        np.where(new, initial_stability(w, grade), next_stability(w, s, d, recall, grade)),
+        np.where(new, initial_difficulty(w, grade), next_difficulty(w, d, grade)),
+    )
+
+
+@dataclass
+class Histories:
+    """
+    按卡片分组的复习历史
+
+    卡片按复习次数分桶（长度 2^k），每桶内按次数降序排列并补齐成 (卡片数, 最大次数) 矩阵，
+    第 j 列只需计算前 active[j] 行，补齐部分不参与计算。
+    """
+    buckets: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]  # (卡片下标, 间隔天数, 评分档, 每列有效行数)
+    cards: int
+    reviews: int
+
+    @property
+    def targets(self) -> int:
+        """可用于拟合的复习条数（每张卡片首次复习之后的复习）"""
+        return self.reviews - self.cards
+
+
+def build_histories(card_index: np.ndarray, review_day: np.ndarray, grade: np.ndarray) -> Histories:
+    """
+    card_index 为 0..C-1 的卡片编号，review_day 为复习时间（天，浮点），
+    三个数组按 (卡片, 复习时间) 排序
+    """
+    card_index = np.asarray(card_index, dtype=np.int64)
+    review_day = np.asarray(review_day, dtype=np.float64)
+    grade = np.asarray(grade, dtype=np.int64)
+    if card_index.size == 0:
+        return Histories(buckets=[], cards=0, reviews=0)
+
+    cards = int(card_index[-1]) + 1
+    lengths = np.bincount(card_index, minlength=cards)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    position = np.arange(card_index.size) - starts[card_index]
+    elapsed = np.diff(review_day, prepend=review_day[0])
+    elapsed[position == 0] = 0
+
+    bucket_of = np.ceil(np.log2(np.maximum(lengths, 1))).astype(np.int64)
+    buckets = []
+    for b in np.unique(bucket_of[lengths > 0]):
+        members = np.flatnonzero(bucket_of == b)
+        members = members[np.argsort(-lengths[members], kind="stable")]
+        width = int(lengths[members[0]])
+        row_of = np.full(cards, -1, dtype=np.int64)
+        row_of[members] = np.arange(members.size)
+
+        picked = row_of[card_index] >= 0
+        rows, cols = row_of[card_index[picked]], position[picked]
+        elapsed_m = np.zeros((members.size, width))
+        grade_m = np.ones((members.size, width), dtype=np.int64)
+        elapsed_m[rows, cols] = elapsed[picked]
+        grade_m[rows, cols] = grade[picked]
+        # 长度降序，第 j 列有效的是前 active[j] 行
+        active = (lengths[members][:, None] > np.arange(width)).sum(axis=0)
+        buckets.append((members, elapsed_m, grade_m, active))
+
+    return Histories(buckets=buckets, cards=cards, reviews=int(card_index.size))
+
+
+def collect_histories(rows: Iterable[Tuple[str, datetime, int]]) -> Tuple[List[str], Histories]:
+    """
+    由按 (card_id, reviewed_at) 排序的复习记录 (card_id, reviewed_at, quality) 构造历史，
+    返回 (按卡片编号排列的 card_id, 历史)
+    """
+    card_ids: List[str] = []
+    card_index, review_day, quality = [], [], []
+    for card_id, reviewed_at, q in rows:
+        if reviewed_at is None:
+            continue
+        if not card_ids or card_ids[-1] != card_id:
+            card_ids.append(card_id)
+        card_index.append(len(card_ids) - 1)
+        review_day.append((reviewed_at - EPOCH).total_seconds() / 86400)
+        quality.append(q)
+    return card_ids, build_histories(np.array(card_index), np.array(review_day), grades(quality))
+
+
+def _replay_bucket(w: np.ndarray, bucket, rows: Optional[np.ndarray] = None, with_loss: bool = True):
+    """回放一个桶，返回 (S, D, 对数损失之和, 预测条数)，S、D 形状为 (P, 行数)"""
+    members, elapsed, grade, active = bucket
+    if rows is not None:
+        elapsed, grade = elapsed[rows], grade[rows]
+        active = np.searchsorted(rows, active)
+
+    first = grade[:, 0]
+    s = initial_stability(w, first)
+    d = initial_difficulty(w, first)
+    loss = np.zeros(w.shape[0])
+    count = 0
+    for j in range(1, grade.shape[1]):
+        k = int(active[j])
+        if k == 0:
+            break
+        g = grade[:k, j]
+        sk, dk = s[:, :k], d[:, :k]
+        recall = retrievability(elapsed[:k, j], sk)
+        if with_loss:
+            p = np.clip(recall, EPSILON, 1 - EPSILON)
+            loss -= np.where(g > 1, np.log(p), np.log1p(-p)).sum(axis=1)
+            count += k
+        s[:, :k] = next_stability(w, sk, dk, recall, g)
+        d[:, :k] = next_difficulty(w, dk, g)
+    return s, d, loss, count
+
+
+def log_loss(w: np.ndarray, histories: Histories) -> np.ndarray:
+    """每组参数在全部历史上的平均对数损失，形状 (P,)"""
+    w = np.atleast_2d(w)
+    total, count = np.zeros(w.shape[0]), 0
+    for bucket in histories.buckets:
+        _, _, loss, n = _replay_bucket(w, bucket)
+        total += loss
+        count += n
+    return total / max(count, 1)
+
+
+def replay(parameters: Optional[Sequence[float]], histories: Histories) -> Tuple[np.ndarray, np.ndarray]:
+    """按参数回放全部历史，返回每张卡片（按卡片编号）最后一次复习后的 (S, D)"""
+    w = as_matrix(parameters)
+    stability = np.full(histories.cards, np.nan)
+    difficulty = np.full(histories.cards, np.nan)
+    for bucket in histories.buckets:
+        s, d, _, _ = _replay_bucket(w, bucket, with_loss=False)
+        stability[bucket[0]] = s[0]
+        difficulty[bucket[0]] = d[0]
+    return stability, difficulty
+
+
+@dataclass
+class FitResult:
+    parameters: List[float]
+    loss: float
+    default_loss: float
+    reviews: int
+    fitted: bool  # False 表示数据不足或拟合结果不优于默认参数，使用默认参数
+
+
+def fit(histories: Histories, iterations: int = FSRS_FIT_ITERATIONS, seed: int = 0) -> FitResult:
+    """
+    用 Adam 在复习历史上最小化回忆预测的对数损失
+
+    参数归一化到 [0, 1] 区间优化；梯度用前向差分，基准点和 17 个扰动点堆成 (18, 17) 参数矩阵，
+    每次迭代对抽样的一批卡片只回放一遍。
+    """
+    default_loss = float(log_loss(DEFAULT_PARAMETERS, histories)[0])
+    if histories.targets < FSRS_MIN_FIT_REVIEWS:
+        return FitResult(DEFAULT_PARAMETERS.tolist(), default_loss, default_loss, histories.reviews, False)
+
+    span = PARAMETER_UPPER - PARAMETER_LOWER
+    x = (DEFAULT_PARAMETERS - PARAMETER_LOWER) / span
+    probes = np.vstack([np.zeros(x.size), np.eye(x.size) * FINITE_DIFFERENCE_STEP])
+    m, v = np.zeros_like(x), np.zeros_like(x)
+    beta1, beta2 = 0.9, 0.999
+    rng = np.random.default_rng(seed)
+    fraction = min(1.0, FSRS_FIT_BATCH_REVIEWS / max(histories.reviews, 1))
+
+    for t in range(1, iterations + 1):
+        w = PARAMETER_LOWER + (x + probes) * span
+        total, count = np.zeros(w.shape[0]), 0
+        for bucket in histories.buckets:
+            rows = None
+            if fraction < 1:
+                rows = np.flatnonzero(rng.random(bucket[0].size) < fraction)
+                if rows.size == 0:
+                    continue
+            _, _, loss, n = _replay_bucket(w, bucket, rows)
+            total += loss
+            count += n
+        if count == 0:
+            continue
+        total /= count
+        grad = (total[1:] - total[0]) / FINITE_DIFFERENCE_STEP
+
+        m = beta1 * m + (1 - beta1) * grad
+        v = beta2 * v + (1 - beta2) * grad * grad
+        update = LEARNING_RATE * (m / (1 - beta1 ** t)) / (np.sqrt(v / (1 - beta2 ** t)) + 1e-8)
+        # 留出扰动步长的余量，保证扰动点也在取值范围内
+        x = np.clip(x - update, 0, 1 - FINITE_DIFFERENCE_STEP)
+
+    parameters = PARAMETER_LOWER + x * span
+    loss = float(log_loss(parameters, histories)[0])
+    if loss >= default_loss:
+        return FitResult(DEFAULT_PARAMETERS.tolist(), default_loss, default_loss, histories.reviews, False)
+    return FitResult(parameters.tolist(), loss, default_loss, histories.reviews, True)
@@ -0,0 +1,177 @@
+"""
+增量 HTML 正文抽取
+边接收字节边解析，跳过 script/style/nav 等非正文标签，
+微信公众号文章只取 #js_content，达到字数预算后立即停止
+"""
+import codecs
+from html.parser import HTMLParser
+from typing import List, Optional
+
+# 内容不计入正文的标签
+SKIP_TAGS = {"script", "style", "noscript", "template", "nav", "iframe", "svg"}
+
+# 每次交给 HTMLParser 的最大字符数，便于在预算用完后尽早停止
+FEED_SLICE_CHARS = 16 * 1024
+
+# 没有结束标签的元素
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+
+class HtmlTextExtractor(HTMLParser):
+    """
+    与 BeautifulSoup get_text(strip=True) 等价的增量文本抽取器
+
+    Args:
+        budget: 整页文本的字数上限
+        target_id: 优先抽取的元素 id（微信文章正文为 js_content）
+        target_budget: 目标元素文本的字数上限
+        wait_for_target: 整页文本已满时是否继续寻找目标元素
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        target_id: Optional[str] = "js_content",
+        target_budget: Optional[int] = None,
+        wait_for_target: bool = False
+    ):
+        super().__init__(convert_charrefs=True)
+        self.budget = budget
+        self.target_id = target_id
+        self.target_budget = target_budget if target_budget is not None else budget
+        self.wait_for_target = wait_for_target
+        self.done = False
+
+        self._page: List[str] = []
+        self._page_len = 0
+        self._target: List[str] = []
+        self._target_len = 0
+        self._target_tag: Optional[str] = None
+        self._target_depth = 0
+        self._target_found = False
+        self._skip_depth = 0
+        self._pending: List[str] = []
+
+    @property
+    def text(self) -> str:
+        if self._target_found:
+            return "".join(self._target)[:self.target_budget]
+        return "".join(self._page)[:self.budget]
+
+    def feed(self, data: str) -> None:
+        for start in range(0, len(data), FEED_SLICE_CHARS):
+            if self.done:
+                break
+            super().feed(data[start:start + FEED_SLICE_CHARS])
+
+    def close(self) -> None:
+        if not self.done:
+            super().close()
+        self._flush()
+
+    # --- HTMLParser 回调 ---
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if self.done:
+            return
+
+        if tag in SKIP_TAGS and tag not in VOID_TAGS:
+            self._skip_depth += 1
+            return
+
+        if self._target_tag is not None:
+            if tag == self._target_tag:
+                self._target_depth += 1
+        elif not self._target_found and self.target_id and tag not in VOID_TAGS:
+            if any(name == "id" and value == self.target_id for name, value in attrs):
+                self._target_found = True
+                self._target_tag = tag
+                self._target_depth = 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if self.done:
+            return
+
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+
+        if self._target_tag is not None and tag == self._target_tag:
+            self._target_depth -= 1
+            if self._target_depth == 0:
+                # 目标元素已结束，后面的内容都不需要了
+                self._target_tag = None
+                self.done = True
+
+    def handle_data(self, data):
+        if not self.done and self._skip_depth == 0:
+            self._pending.append(data)
+
+    # --- 内部方法 ---
+
+    def _flush(self) -> None:
+        """相邻的文本片段合并为一个字符串后再 strip，与 BeautifulSoup 的 NavigableString 对齐"""
+        if not self._pending:
+            return
+        text = "".join(self._pending).strip()
+        self._pending.clear()
+        if not text or self.done:
+            return
+
+        if self._target_tag is not None:
+            self._target.append(text)
+            self._target_len += len(text)
+            if self._target_len >= self.target_budget:
+                self.done = True
+        elif not self._target_found and self._page_len < self.budget:
+            self._page.append(text)
+            self._page_len += len(text)
+            if self._page_len >= self.budget and not self.wait_for_target:
+                self.done = True
+
+
+class StreamingHtmlExtractor:
+    """接收原始字节流，增量解码后交给 HtmlTextExtractor"""
+
+    def __init__(self, encoding: Optional[str] = None, **kwargs):
+        try:
+            decoder_cls = codecs.getincrementaldecoder(encoding or "utf-8")
+        except LookupError:
+            decoder_cls = codecs.getincrementaldecoder("utf-8")
+        self._decoder = decoder_cls(errors="replace")
+        self._parser = HtmlTextExtractor(**kwargs)
+
+    @property
+    def done(self) -> bool:
+        return self._parser.done
+
+    @property
+    def text(self) -> str:
+        return self._parser.text
+
+    def feed(self, chunk: bytes) -> bool:
+        """喂入一块字节，返回是否已可以停止读取"""
+        self._parser.feed(self._decoder.decode(chunk))
+        return self._parser.done
+
+    def close(self) -> str:
+        self._parser.feed(self._decoder.decode(b"", final=True))
+        self._parser.close()
+        return self._parser.text
+
+
+def extract_text(
+    content: bytes, encoding: Optional[str] = None, **kwargs
+) -> str:
+    """一次性抽取整段 HTML 的正文"""
+    extractor = StreamingHtmlExtractor(encoding, **kwargs)
+    extractor.feed(content)
+    return extractor.close()
@@ -0,0 +1,151 @@
+"""
+LLM 结果缓存
+按 (服务商, 模型, 系统提示词哈希, 规范化内容哈希) 寻址：
+内存 LRU + TTL 作为第一层，SQLite 作为可跨重启保留的第二层。
+SQLite 的读写都在每个缓存专用的单线程执行器中进行，不阻塞事件循环；写入不等待完成，按提交顺序执行。
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ttl_cache import TTLCache
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(60 * 60 * 24)))  # 1 天
+LLM_CACHE_DISK_TTL = float(os.getenv("LLM_CACHE_DISK_TTL", str(60 * 60 * 24 * 7)))  # 7 天
+# 留空则只使用内存缓存
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH", "./llm_cache.db")
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_content(text: str) -> str:
+    """合并空白字符，使仅排版不同的同一篇文章命中同一条缓存"""
+    return " ".join(text.split())
+
+
+def make_key(provider_id: str, model: str, system_prompt: str, content: str) -> str:
+    """生成缓存键"""
+    return _sha256("\n".join([
+        provider_id,
+        model,
+        _sha256(system_prompt),
+        _sha256(normalize_content(content)),
+    ]))
+
+
+class LLMCache:
+    """两级 LLM 结果缓存"""
+
+    _PRUNE_EVERY = 256
+
+    def __init__(
+        self,
+        maxsize: int = LLM_CACHE_MAX_ENTRIES,
+        ttl: float = LLM_CACHE_TTL,
+        db_path: Optional[str] = LLM_CACHE_DB_PATH,
+        disk_ttl: float = LLM_CACHE_DISK_TTL,
+        table: str = "llm_cache"
+    ):
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._disk_ttl = disk_ttl
+        self._table = table
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            # 连接只在执行器的线程中使用（建表在启动时完成）
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=table)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _disk_get(self, keys: List[str]) -> Optional[tuple]:
+        """在执行器线程中按 keys 的顺序返回第一个未过期的 (key, value)"""
+        placeholders = ", ".join("?" * len(keys))
+        rows = dict(self._db.execute(
+            f"SELECT key, value FROM {self._table} WHERE key IN ({placeholders}) AND expires_at > ?",
+            (*keys, time.time())
+        ).fetchall())
+        for key in keys:
+            if key in rows:
+                return key, rows[key]
+        return None
+
+    def _disk_set(self, key: str, value: str) -> None:
+        now = time.time()
+        try:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + self._disk_ttl)
+            )
+            self._writes += 1
+            if self._writes % self._PRUNE_EVERY == 0:
+                self._db.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            print(f"LLM cache write Error: {e}")
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.get_any([key])
+
+    async def get_any(self, keys: List[str]) -> Optional[str]:
+        """依次查找多个键，返回第一个命中的值（内存层全部未命中时只查一次磁盘，整体只计一次未命中）"""
+        for key in keys:
+            value = self._memory.get(key)
+            if value is not None:
+                self.memory_hits += 1
+                return value
+
+        if self._db is not None and keys:
+            loop = asyncio.get_running_loop()
+            found = await loop.run_in_executor(self._executor, self._disk_get, keys)
+            if found is not None:
+                key, value = found
+                self.disk_hits += 1
+                self._memory.set(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """写入内存层，磁盘写入提交到执行器后立即返回"""
+        self._memory.set(key, value)
+        if self._executor is not None:
+            self._executor.submit(self._disk_set, key, value)
+
+    def stats(self) -> Dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0,
+            "memory_entries": len(self._memory),
+        }
+
+
+# 问题生成结果缓存
+question_cache = LLMCache(db_path=LLM_CACHE_DB_PATH if LLM_CACHE_ENABLED else None)
+
+# 长文本分块摘要缓存
+summary_cache = LLMCache(
+    db_path=LLM_CACHE_DB_PATH if LLM_CACHE_ENABLED else None,
+    table="llm_summary_cache"
+)
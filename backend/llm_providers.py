@@ -2,10 +2,18 @@
 AI 模型服务商配置
 支持多个免费 AI API
 """
-from typing import Dict, List
-from openai import OpenAI
+from typing import Dict, List, Optional, Tuple
+from openai import AsyncOpenAI
+import httpx
 import os
 
+# 连接池配置（每个服务商一个长连接池）
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+
 # AI 服务商配置
 AI_PROVIDERS: Dict[str, Dict] = {
     "deepseek": {
@@ -61,9 +69,12 @@ def get_available_providers() -> List[Dict]:
     return available
 
 
-def get_llm_client(provider_id: str = None) -> OpenAI:
-    """获取指定服务商的 LLM 客户端"""
-    # 如果没有指定 provider，使用第一个可用的
+# provider_id -> ((api_key, base_url), client)，进程内复用
+_clients: Dict[str, Tuple[Tuple[str, str], AsyncOpenAI]] = {}
+
+
+def resolve_provider_id(provider_id: Optional[str] = None) -> str:
+    """解析服务商 ID，未指定时使用第一个可用的"""
     if provider_id is None:
         available = get_available_providers()
         if not available:
@@ -73,10 +84,50 @@ def get_llm_client(provider_id: str = None) -> OpenAI:
     if provider_id not in AI_PROVIDERS:
         raise ValueError(f"未知的 AI 服务商: {provider_id}")
 
+    return provider_id
+
+
+def get_base_url(provider_id: str) -> str:
+    """服务商 API 地址，可用 <PROVIDER>_BASE_URL 覆盖（如指向本地兼容 OpenAI 的桩服务）"""
+    return os.getenv(f"{provider_id.upper()}_BASE_URL", AI_PROVIDERS[provider_id]["base_url"])
+
+
+def _create_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    """创建带 keep-alive 连接池的异步客户端"""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+    )
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+
+def get_llm_client(provider_id: str = None) -> Tuple[AsyncOpenAI, str]:
+    """获取指定服务商的 LLM 客户端（进程内共享的 AsyncOpenAI 实例）"""
+    provider_id = resolve_provider_id(provider_id)
+
     config = AI_PROVIDERS[provider_id]
     api_key = os.getenv(config["api_key_env"])
 
     if not api_key:
         raise ValueError(f"请先配置 {config['name']} 的 API Key: {config['api_key_env']}")
 
-    return OpenAI(api_key=api_key, base_url=config["base_url"]), config["model"]
+    settings = (api_key, get_base_url(provider_id))
+    cached = _clients.get(provider_id)
+    if cached is None or cached[0] != settings:
+        # API Key 或地址变更时重建客户端，旧连接池交给 GC
+        cached = (settings, _create_client(*settings))
+        _clients[provider_id] = cached
+
+    return cached[1], config["model"]
+
+
+async def close_llm_clients() -> None:
+    """关闭所有 LLM 客户端的连接池（应用关闭时调用）"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for _, client in clients:
+        await client.close()
@@ -0,0 +1,270 @@
+"""
+LLM 服务商路由
+按各服务商的 EWMA 延迟与错误率挑选最健康的一个，
+超时 / 5xx / 限流时自动切换到下一个，可选在延迟超过分位数后发出对冲请求
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import openai
+
+from llm_providers import get_available_providers, get_llm_client, resolve_provider_id
+from metrics import LLM_ERRORS, LLM_IN_FLIGHT, LLM_LATENCY, record_llm_usage
+
+# 单次请求超时（秒），超时即切换服务商
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "30"))
+# EWMA 平滑系数，越大越看重最近的请求
+LLM_ROUTER_EWMA_ALPHA = float(os.getenv("LLM_ROUTER_EWMA_ALPHA", "0.2"))
+# 错误率对评分的惩罚倍数
+LLM_ROUTER_ERROR_PENALTY = float(os.getenv("LLM_ROUTER_ERROR_PENALTY", "5"))
+# 连续失败多少次后暂停使用该服务商，以及暂停秒数
+LLM_ROUTER_FAILURE_THRESHOLD = int(os.getenv("LLM_ROUTER_FAILURE_THRESHOLD", "3"))
+LLM_ROUTER_COOLDOWN = float(os.getenv("LLM_ROUTER_COOLDOWN", "30"))
+
+# 对冲请求：主请求耗时超过其历史延迟的该分位数后，向下一个服务商再发一份
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+# 样本不足时使用的对冲等待时间
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "5"))
+
+# 未有样本时假定的延迟（秒）
+_PRIOR_LATENCY = 1.0
+_MIN_PERCENTILE_SAMPLES = 20
+
+_FAILOVER_STATUS_CODES = {401, 403, 408, 409, 429}
+
+
+def should_failover(exc: BaseException) -> bool:
+    """该错误是否属于服务商侧问题（换一个服务商可能成功）"""
+    if isinstance(exc, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500 or exc.status_code in _FAILOVER_STATUS_CODES
+    return False
+
+
+class ProviderStats:
+    """单个服务商的健康状况"""
+
+    def __init__(self, alpha: float = LLM_ROUTER_EWMA_ALPHA):
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.samples: deque = deque(maxlen=256)
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.error_rate *= 1 - self.alpha
+        if latency is None:
+            return
+        self.samples.append(latency)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+
+    def record_failure(self) -> None:
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.error_rate += self.alpha * (1 - self.error_rate)
+        if self.consecutive_failures >= LLM_ROUTER_FAILURE_THRESHOLD:
+            self.open_until = time.monotonic() + LLM_ROUTER_COOLDOWN
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def score(self) -> float:
+        """越小越好"""
+        latency = self.latency_ewma if self.latency_ewma is not None else _PRIOR_LATENCY
+        return latency * (1 + LLM_ROUTER_ERROR_PENALTY * self.error_rate)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < _MIN_PERCENTILE_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def hedge_delay(self) -> float:
+        delay = self.percentile(LLM_HEDGE_PERCENTILE)
+        if delay is None:
+            delay = LLM_HEDGE_DEFAULT_DELAY
+        return max(LLM_HEDGE_MIN_DELAY, delay)
+
+    def snapshot(self) -> Dict:
+        return {
+            "latency_ewma": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "latency_p95": self.percentile(95),
+            "error_rate": round(self.error_rate, 4),
+            "requests": self.requests,
+            "failures": self.failures,
+            "available": self.available,
+        }
+
+
+class ProviderRouter:
+    """在已配置的服务商之间路由 chat completion 请求"""
+
+    def __init__(self, timeout: float = LLM_REQUEST_TIMEOUT, hedge: bool = LLM_HEDGE_ENABLED):
+        self.timeout = timeout
+        self.hedge = hedge
+        self._stats: Dict[str, ProviderStats] = {}
+
+    def stats_for(self, provider_id: str) -> ProviderStats:
+        stats = self._stats.get(provider_id)
+        if stats is None:
+            stats = self._stats[provider_id] = ProviderStats()
+        return stats
+
+    def candidates(self, provider_id: Optional[str] = None) -> List[str]:
+        """
+        候选服务商，按健康程度排序
+
+        指定了 provider_id 时只使用该服务商；否则在所有已配置的服务商中
+        优先选择未被暂停、评分最好的，同分时保持默认服务商优先。
+        """
+        if provider_id is not None:
+            return [resolve_provider_id(provider_id)]
+
+        available = [p["id"] for p in get_available_providers()]
+        if not available:
+            raise ValueError("没有可用的 AI 服务商，请配置至少一个 API Key")
+
+        healthy = [pid for pid in available if self.stats_for(pid).available]
+        if not healthy:
+            # 全部处于暂停期时仍然尝试，避免彻底不可用
+            healthy = available
+        return sorted(healthy, key=lambda pid: self.stats_for(pid).score())
+
+    async def _attempt(self, provider_id: str, messages: list, retry: bool = True, **kwargs):
+        client, model = get_llm_client(provider_id)
+        if not retry:
+            # 还有其他服务商可切换时不在同一服务商上重试
+            client = client.with_options(max_retries=0)
+        stats = self.stats_for(provider_id)
+        stream = kwargs.get("stream", False)
+        in_flight = LLM_IN_FLIGHT.labels(provider_id)
+        in_flight.inc()
+        start = time.monotonic()
+        try:
+            response = await asyncio.wait_for(
+                client.chat.completions.create(model=model, messages=messages, **kwargs),
+                timeout=self.timeout
+            )
+        except Exception as e:
+            LLM_ERRORS.labels(provider_id, type(e).__name__).inc()
+            if should_failover(e):
+                stats.record_failure()
+            raise
+        finally:
+            in_flight.dec()
+
+        latency = time.monotonic() - start
+        if stream:
+            # 流式请求只计到建立连接的时间，不计入完整响应的延迟统计
+            stats.record_success()
+        else:
+            stats.record_success(latency)
+            LLM_LATENCY.labels(provider_id).observe(latency)
+            record_llm_usage(provider_id, response)
+        return response
+
+    async def chat_completion(
+        self, messages: list, provider_id: Optional[str] = None, **kwargs
+    ) -> Tuple[object, str]:
+        """发送请求并返回 (response, 实际使用的服务商 ID)"""
+        candidates = self.candidates(provider_id)
+        if self.hedge and len(candidates) > 1:
+            return await self._hedged(candidates, messages, **kwargs)
+
+        last_error: Optional[Exception] = None
+        for i, pid in enumerate(candidates):
+            try:
+                return await self._attempt(pid, messages, retry=i == len(candidates) - 1, **kwargs), pid
+            except Exception as e:
+                if not should_failover(e):
+                    raise
+                print(f"LLM provider {pid} failed, failing over: {e!r}")
+                last_error = e
+        raise last_error
+
+    async def _hedged(self, candidates: List[str], messages: list, **kwargs) -> Tuple[object, str]:
+        remaining = list(candidates)
+        tasks: Dict[asyncio.Task, str] = {}
+        hedged = False
+        last_error: Optional[Exception] = None
+
+        def launch():
+            pid = remaining.pop(0)
+            attempt = self._attempt(pid, messages, retry=not remaining, **kwargs)
+            tasks[asyncio.create_task(attempt)] = pid
+
+        launch()
+        try:
+            while tasks:
+                timeout = None
+                if not hedged and remaining:
+                    timeout = self.stats_for(candidates[0]).hedge_delay()
+                done, _ = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # 主请求慢于历史分位数，向下一个服务商发出对冲请求
+                    hedged = True
+                    launch()
+                    continue
+
+                for task in done:
+                    pid = tasks.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        return task.result(), pid
+                    if not should_failover(exc):
+                        raise exc
+                    print(f"LLM provider {pid} failed, failing over: {exc!r}")
+                    last_error = exc
+
+                if not tasks and remaining:
+                    launch()
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def open_stream(
+        self, messages: list, provider_id: Optional[str] = None, **kwargs
+    ) -> Tuple[object, str]:
+        """
+        打开流式响应并返回 (stream, 服务商 ID)
+
+        只在建立流之前切换服务商；已开始输出后出错直接向上抛出。
+        """
+        candidates = self.candidates(provider_id)
+        last_error: Optional[Exception] = None
+        for i, pid in enumerate(candidates):
+            try:
+                retry = i == len(candidates) - 1
+                return await self._attempt(pid, messages, retry=retry, stream=True, **kwargs), pid
+            except Exception as e:
+                if not should_failover(e):
+                    raise
+                print(f"LLM provider {pid} failed, failing over: {e!r}")
+                last_error = e
+        raise last_error
+
+    def snapshot(self) -> Dict:
+        return {pid: stats.snapshot() for pid, stats in self._stats.items()}
+
+
+router = ProviderRouter()
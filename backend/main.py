@@ -1,29 +1,35 @@
 import os
-import json
+import asyncio
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from pydantic import BaseModel
 from typing import Optional
-import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import uvicorn
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
-from database import get_db, init_db
+from database import get_async_db, init_db, async_engine, start_db_maintenance, stop_db_maintenance
 from models import User, LearningSession, UserStatistics
-from auth import create_access_token, get_current_user, get_optional_user
-from llm_providers import get_available_providers, get_llm_client
+from auth import CurrentUser, create_access_token, get_current_user, get_optional_user
+from llm_providers import get_available_providers, close_llm_clients
+from streaming import sse_response
+import coach
+import passwords
+from url_fetcher import extract_text_from_url, close_url_fetcher
+from llm_cache import question_cache
+from llm_router import router
+from metrics import instrument_app, instrument_engine
+from rate_limit import limiter
+from pagination import invalidate_count, paginate
 from api.v1 import router as v1_router
 from api.v2 import router as v2_router
 
 load_dotenv()
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
 app = FastAPI(title="Learning Coach API")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -32,6 +38,15 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    start_db_maintenance()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_llm_clients()
+    await close_url_fetcher()
+    await stop_db_maintenance()
+    passwords.shutdown_password_hasher()
 
 # CORS middleware
 app.add_middleware(
@@ -42,6 +57,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus metrics (/metrics)
+instrument_app(app)
+instrument_engine(async_engine.sync_engine)
+
 # Include versioned API routers
 app.include_router(v1_router, prefix="/api")
 app.include_router(v2_router, prefix="/api")
@@ -53,26 +72,8 @@ class ContentRequest(BaseModel):
     type: str  # 'text' or 'url'
     content: str
     provider: Optional[str] = None  # AI 服务商
-
-
-def extract_text_from_url(url: str) -> str:
-    """Extract text content from a URL, with special handling for WeChat articles."""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Specific logic for WeChat Official Account articles
-        content_div = soup.find(id="js_content")
-        if content_div:
-            return content_div.get_text(strip=True)
-
-        return soup.get_text(strip=True)[:10000]
-    except Exception as e:
-        print(f"Error fetching URL: {e}")
-        raise HTTPException(status_code=400, detail=f"Failed to fetch URL: {str(e)}")
+    stream: bool = False  # 以 SSE 流式返回
+    no_cache: bool = False  # 跳过问题缓存，强制重新生成
 
 
 @app.post("/api/generate-question")
@@ -81,37 +82,21 @@ async def generate_question(content_request: ContentRequest, request: Request):
     """Generate a Socratic question based on the input content."""
     text = content_request.content
     if content_request.type == 'url':
-        text = extract_text_from_url(content_request.content)
+        text = await extract_text_from_url(content_request.content)
 
     if not text:
         raise HTTPException(status_code=400, detail="Could not extract text from content")
 
-    # Limit text length
-    if len(text) > 15000:
-        text = text[:15000]
+    text = coach.prepare_content(text)
+    use_cache = not content_request.no_cache
 
-    # Get LLM client based on provider
-    client, model = get_llm_client(content_request.provider)
-
-    system_prompt = (
-        "你是一个'费曼教练'。你的目标是通过教学来帮助用户学习。"
-        "用户会提供一段文本。"
-        "1. 绝对不要直接总结这段文本。"
-        "2. 识别核心概念或逻辑。"
-        "3. 生成一个具有挑战性的苏格拉底式问题，要求用户用大白话解释核心概念（例如：'请把这个核心逻辑，讲给一个 5 岁的孩子听'）。"
-        "仅输出问题文本，不要包含其他对话填充词。必须使用中文回答。"
-    )
+    if content_request.stream:
+        return sse_response(coach.stream_question_for_document(text, content_request.provider, use_cache))
 
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text}
-            ]
-        )
-        question = response.choices[0].message.content
-        return {"question": question, "original_content": text}
+        return await coach.question_for_document(text, content_request.provider, use_cache)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="AI 服务响应超时")
     except Exception as e:
         print(f"LLM Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -124,7 +109,8 @@ async def evaluate_answer(
     file: Optional[UploadFile] = File(None),
     answer_text: Optional[str] = Form(None),
     original_content: str = Form(...),
-    provider: Optional[str] = Form(None)
+    provider: Optional[str] = Form(None),
+    stream: bool = Form(False)
 ):
     """Evaluate the user's answer and provide feedback with a score."""
     user_answer = answer_text
@@ -132,34 +118,11 @@ async def evaluate_answer(
     if not user_answer:
         raise HTTPException(status_code=400, detail="未提供回答")
 
-    # Get LLM client based on provider
-    client, model = get_llm_client(provider)
-
-    system_prompt = (
-        "你是一个'费曼教练'。请对比用户的解释与原文。"
-        "1. 识别误解或遗漏的关键点。"
-        "2. 提供建设性的反馈。"
-        "3. 给出一个 0-100 的'掌握度评分'。"
-        "以 JSON 格式返回结果，包含键：'feedback' (string), 'score' (number), 'transcription' (string - 用户的回答)。确保 feedback 使用中文。"
-    )
+    if stream:
+        return sse_response(coach.stream_evaluation(original_content, user_answer, provider))
 
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Original Text: {original_content}\n\nUser Answer: {user_answer}"}
-            ],
-            response_format={"type": "json_object"}
-        )
-
-        result_json = response.choices[0].message.content
-        result = json.loads(result_json)
-
-        if 'transcription' not in result:
-            result['transcription'] = user_answer
-
-        return result
+        return await coach.evaluate_answer(original_content, user_answer, provider)
     except Exception as e:
         print(f"Evaluation Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -179,10 +142,10 @@ class LoginRequest(BaseModel):
 
 
 @app.post("/api/auth/register")
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
     # Check if user exists
-    existing_user = db.query(User).filter(User.email == request.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == request.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
@@ -190,7 +153,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     user = User(
         id=User.generate_id(),
         email=request.email,
-        password_hash=User.hash_password(request.password),
+        password_hash=await passwords.hash_password(request.password),
         display_name=request.display_name or request.email.split("@")[0]
     )
     db.add(user)
@@ -199,7 +162,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     stats = UserStatistics(user_id=user.id)
     db.add(stats)
 
-    db.commit()
+    await db.commit()
 
     # Generate token
     token = create_access_token({"sub": user.id})
@@ -215,12 +178,21 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @app.post("/api/auth/login")
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Login user."""
-    user = db.query(User).filter(User.email == request.email).first()
-    if not user or not user.verify_password(request.password):
+    user = await db.scalar(select(User).where(User.email == request.email))
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    valid, new_hash = await passwords.verify_password(user.password_hash, request.password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    if new_hash:
+        # 旧版 SHA-256 哈希或成本参数变化，登录成功时升级
+        user.password_hash = new_hash
+        await db.commit()
+
     token = create_access_token({"sub": user.id})
 
     return {
@@ -234,7 +206,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
 
 
 @app.get("/api/auth/me")
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: CurrentUser = Depends(get_current_user)):
     """Get current user info."""
     return {
         "id": current_user.id,
@@ -255,7 +227,7 @@ class SaveSessionRequest(BaseModel):
 
 
 @app.post("/api/sessions")
-async def save_session(request: SaveSessionRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def save_session(request: SaveSessionRequest, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Save a learning session."""
     session = LearningSession(
         id=LearningSession.generate_id(),
@@ -270,7 +242,7 @@ async def save_session(request: SaveSessionRequest, current_user: User = Depends
     db.add(session)
 
     # Update statistics
-    stats = db.query(UserStatistics).filter(UserStatistics.user_id == current_user.id).first()
+    stats = await db.get(UserStatistics, current_user.id)
     if stats:
         stats.total_sessions += 1
         # Update average score
@@ -279,20 +251,35 @@ async def save_session(request: SaveSessionRequest, current_user: User = Depends
         if request.score > (stats.best_score or 0):
             stats.best_score = request.score
 
-    db.commit()
+    await db.commit()
+    invalidate_count(("sessions", current_user.id))
 
     return {"id": session.id, "saved": True}
 
 
 @app.get("/api/sessions")
-async def get_sessions(page: int = 1, limit: int = 10, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get user's learning sessions."""
-    offset = (page - 1) * limit
-    sessions = db.query(LearningSession).filter(
-        LearningSession.user_id == current_user.id
-    ).order_by(LearningSession.created_at.desc()).offset(offset).limit(limit).all()
-
-    total = db.query(LearningSession).filter(LearningSession.user_id == current_user.id).count()
+async def get_sessions(
+    page: int = 1,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get user's learning sessions (cursor or page based)."""
+    sessions, meta = await paginate(
+        db,
+        select(LearningSession).options(load_only(
+            LearningSession.id, LearningSession.question, LearningSession.score, LearningSession.created_at
+        )).where(LearningSession.user_id == current_user.id),
+        LearningSession.created_at,
+        LearningSession.id,
+        count_key=("sessions", current_user.id),
+        cursor=cursor,
+        page=page,
+        limit=limit,
+        include_total=include_total
+    )
 
     return {
         "sessions": [
@@ -304,19 +291,17 @@ async def get_sessions(page: int = 1, limit: int = 10, current_user: User = Depe
             }
             for s in sessions
         ],
-        "total": total,
-        "page": page,
-        "limit": limit
+        **meta
     }
 
 
 @app.get("/api/sessions/{session_id}")
-async def get_session(session_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_session(session_id: str, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get a specific session."""
-    session = db.query(LearningSession).filter(
+    session = await db.scalar(select(LearningSession).where(
         LearningSession.id == session_id,
         LearningSession.user_id == current_user.id
-    ).first()
+    ))
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -336,9 +321,9 @@ async def get_session(session_id: str, current_user: User = Depends(get_current_
 # ========== Statistics API (Legacy) ==========
 
 @app.get("/api/statistics/overview")
-async def get_statistics(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_statistics(current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get user's learning statistics."""
-    stats = db.query(UserStatistics).filter(UserStatistics.user_id == current_user.id).first()
+    stats = await db.get(UserStatistics, current_user.id)
 
     if not stats:
         return {
@@ -360,6 +345,18 @@ async def get_llm_providers():
     return {"providers": get_available_providers()}
 
 
+@app.get("/api/llm/cache/stats")
+async def get_llm_cache_stats():
+    """问题生成缓存的命中统计"""
+    return question_cache.stats()
+
+
+@app.get("/api/llm/router/stats")
+async def get_llm_router_stats():
+    """各服务商的延迟与错误率（路由依据）"""
+    return router.snapshot()
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint."""
@@ -0,0 +1,123 @@
+"""
+Prometheus 指标
+覆盖 LLM 调用、URL 抓取、HTTP 路由与 SQLAlchemy 查询，通过 /metrics 暴露
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+_LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "LLM chat completion latency",
+    ["provider"], buckets=_LLM_BUCKETS
+)
+LLM_TOKENS = Counter("llm_tokens_total", "LLM token usage", ["provider", "type"])
+LLM_ERRORS = Counter("llm_errors_total", "LLM request errors", ["provider", "error"])
+LLM_IN_FLIGHT = Gauge("llm_requests_in_flight", "LLM requests in flight", ["provider"])
+
+URL_FETCH_LATENCY = Histogram("url_fetch_duration_seconds", "URL fetch latency", ["result"])
+URL_FETCH_BYTES = Counter("url_fetch_bytes_total", "Bytes downloaded by the URL fetcher")
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency (until response headers)",
+    ["method", "route", "status"]
+)
+
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["route"])
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement latency", ["route"], buckets=_DB_BUCKETS
+)
+
+# 当前请求的 ASGI scope，供数据库查询按路由打标签
+_current_scope: ContextVar[Optional[dict]] = ContextVar("metrics_scope", default=None)
+
+
+def _route_label(scope: Optional[dict]) -> str:
+    """
+    用完整的路由模板（含 include_router 的前缀）而不是原始路径作标签，避免标签基数随 ID 增长
+
+    嵌套 include_router 时 scope["route"] 只带叶子路由自己的模板（如 /login），
+    前缀从请求路径中去掉叶子路由按路径参数还原出的部分得到。
+    """
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = scope.get("path", "")
+    try:
+        rendered = template.format(**{k: str(v) for k, v in (scope.get("path_params") or {}).items()})
+    except (KeyError, IndexError, ValueError):
+        return template
+    if rendered and path.endswith(rendered):
+        return path[:len(path) - len(rendered)] + template
+    return template
+
+
+def record_llm_usage(provider_id: str, response) -> None:
+    """记录非流式响应的 token 用量"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    LLM_TOKENS.labels(provider_id, "prompt").inc(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels(provider_id, "completion").inc(usage.completion_tokens or 0)
+
+
+def instrument_app(app: FastAPI) -> None:
+    """注册 HTTP 延迟中间件与 /metrics 接口"""
+    if not METRICS_ENABLED:
+        return
+
+    @app.middleware("http")
+    async def http_metrics(request: Request, call_next):
+        token = _current_scope.set(request.scope)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_LATENCY.labels(
+                request.method, _route_label(request.scope), str(status)
+            ).observe(time.perf_counter() - start)
+            _current_scope.reset(token)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """统计每个路由的 SQL 执行次数与耗时"""
+    if not METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        route = _route_label(_current_scope.get())
+        DB_QUERIES.labels(route).inc()
+        DB_QUERY_LATENCY.labels(route).observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # 出错的语句不会触发 after_cursor_execute，丢弃其开始时间
+        starts = context.connection.info.get("metrics_query_start") if context.connection else None
+        if starts:
+            starts.pop()
@@ -0,0 +1,184 @@
+"""
+数据库迁移
+create_all 只会建新表，不会修改已有的库；表结构/索引的变更写成按版本号递增的迁移，
+启动时在 init_db 中依次执行尚未应用的版本，已应用的版本记录在 schema_migrations 表。
+
+新增索引时同时写进 models 的 __table_args__（新库由 create_all 建好）和一个迁移（已有的库），
+迁移里用 IF NOT EXISTS，对新库是空操作。
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List
+
+from sqlalchemy import DateTime, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+import fsrs
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """注册一个迁移；版本号不可重复，已发布的迁移不要再修改"""
+    def register(fn: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version: {version}")
+        MIGRATIONS.append(Migration(version, description, fn))
+        return fn
+    return register
+
+
+def _create_index(conn: Connection, name: str, table: str, columns: str) -> None:
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+@migration(1, "composite indexes for per-user listing, due and review queries")
+def _composite_indexes(conn: Connection) -> None:
+    # 列表按 (created_at desc, id desc) 游标分页
+    _create_index(conn, "ix_learning_sessions_user_created", "learning_sessions", "user_id, created_at, id")
+    _create_index(conn, "ix_flashcards_user_created", "flashcards", "user_id, created_at, id")
+    # 待复习：user_id = ? AND next_review_date <= ?
+    _create_index(conn, "ix_flashcards_user_next_review", "flashcards", "user_id, next_review_date")
+    # 已掌握：user_id = ? AND interval > 30（interval 是 PostgreSQL 的保留字，需要加引号）
+    _create_index(conn, "ix_flashcards_user_interval", "flashcards", 'user_id, "interval"')
+    # 复习统计：按卡片取某时间之后的复习记录
+    _create_index(conn, "ix_flashcard_reviews_card_reviewed", "flashcard_reviews", "card_id, reviewed_at")
+
+
+def _add_column(conn: Connection, table: str, name: str, ddl: str) -> None:
+    """列不存在时添加（新库的列已由 create_all 建好）"""
+    if name not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+@migration(2, "flashcard statistics rollups: user_daily_stats and cumulative counters")
+def _flashcard_rollups(conn: Connection) -> None:
+    for name in ("total_reviews", "quality_sum", "mastered_cards"):
+        _add_column(conn, "user_statistics", name, "INTEGER NOT NULL DEFAULT 0")
+
+    # 用现有数据回填累计计数
+    conn.execute(text(
+        "UPDATE user_statistics SET "
+        "total_flashcards = (SELECT count(*) FROM flashcards c WHERE c.user_id = user_statistics.user_id), "
+        "mastered_cards = (SELECT count(*) FROM flashcards c "
+        'WHERE c.user_id = user_statistics.user_id AND c."interval" > 30), '
+        "total_reviews = (SELECT count(*) FROM flashcard_reviews r JOIN flashcards c ON c.id = r.card_id "
+        "WHERE c.user_id = user_statistics.user_id), "
+        "quality_sum = (SELECT coalesce(sum(r.quality), 0) FROM flashcard_reviews r JOIN flashcards c ON c.id = r.card_id "
+        "WHERE c.user_id = user_statistics.user_id)"
+    ))
+
+    # 按天回填复习数与到期数
+    conn.execute(text("DELETE FROM user_daily_stats"))
+    conn.execute(text(
+        "INSERT INTO user_daily_stats (user_id, day, review_count, quality_sum, due_count) "
+        "SELECT user_id, day, sum(review_count), sum(quality_sum), sum(due_count) FROM ("
+        "SELECT c.user_id AS user_id, date(r.reviewed_at) AS day, "
+        "1 AS review_count, r.quality AS quality_sum, 0 AS due_count "
+        "FROM flashcard_reviews r JOIN flashcards c ON c.id = r.card_id "
+        "UNION ALL "
+        "SELECT user_id, date(coalesce(next_review_date, created_at)), 0, 0, 1 FROM flashcards"
+        ") t WHERE day IS NOT NULL GROUP BY user_id, day"
+    ))
+
+
+@migration(3, "covering index for the statistics chart aggregation")
+def _chart_covering_index(conn: Connection) -> None:
+    # 替换 (user_id, created_at, id)，前缀相同，游标分页仍可使用
+    _create_index(conn, "ix_learning_sessions_user_created_score", "learning_sessions", "user_id, created_at, id, score")
+    conn.execute(text("DROP INDEX IF EXISTS ix_learning_sessions_user_created"))
+
+
+@migration(4, "client review ids for idempotent batch review submission")
+def _client_review_ids(conn: Connection) -> None:
+    _add_column(conn, "flashcard_reviews", "client_review_id", "VARCHAR(64)")
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_flashcard_reviews_card_client_id "
+        "ON flashcard_reviews (card_id, client_review_id)"
+    ))
+
+
+@migration(5, "FSRS memory state on flashcards")
+def _fsrs_state(conn: Connection) -> None:
+    _add_column(conn, "flashcards", "stability", "FLOAT")
+    _add_column(conn, "flashcards", "difficulty", "FLOAT")
+
+    # 用默认参数回放已有的复习记录，得到每张卡片当前的记忆状态
+    card_ids, histories = fsrs.collect_histories(conn.execute(text(
+        "SELECT card_id, reviewed_at, quality FROM flashcard_reviews ORDER BY card_id, reviewed_at"
+    ).columns(reviewed_at=DateTime)))
+    if not card_ids:
+        return
+    stability, difficulty = fsrs.replay(None, histories)
+    conn.execute(
+        text("UPDATE flashcards SET stability = :s, difficulty = :d WHERE id = :id"),
+        [
+            {"id": card_id, "s": s, "d": d}
+            for card_id, s, d in zip(card_ids, stability.tolist(), difficulty.tolist())
+        ]
+    )
+
+
+@migration(6, "covering due-queue index; drop indexes shadowed by composites")
+def _due_queue_covering_index(conn: Connection) -> None:
+    # 到期队列只读 (id, next_review_date)，替换 (user_id, next_review_date)
+    _create_index(conn, "ix_flashcards_user_next_review_id", "flashcards", "user_id, next_review_date, id")
+    # 单列索引是复合索引的前缀，留着会让查询计划在二者间摇摆。
+    # 已掌握数改由 user_statistics 累计，(user_id, interval) 不再有查询使用。
+    for name in (
+        "ix_flashcards_user_next_review",
+        "ix_flashcards_user_id",
+        "ix_flashcards_user_interval",
+        "ix_flashcard_reviews_card_id",
+    ):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+@migration(7, "drop single-column indexes no longer declared on the models")
+def _drop_shadowed_single_column_indexes(conn: Connection) -> None:
+    # user_id 是 (user_id, created_at, id, score) 的前缀；next_review_date / reviewed_at
+    # 只在 (user_id, ...) / (card_id, ...) 复合索引里被查询。models 已去掉这些 index=True，新库和旧库保持一致
+    for name in (
+        "ix_learning_sessions_user_id",
+        "ix_flashcards_next_review_date",
+        "ix_flashcard_reviews_reviewed_at",
+    ):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    return [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """执行所有未应用的迁移，每个迁移一个事务；返回本次应用的版本号"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR(200) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL)"
+        ))
+        done = set(applied_versions(conn))
+
+    applied = []
+    for m in sorted(MIGRATIONS, key=lambda m: m.version):
+        if m.version in done:
+            continue
+        with engine.begin() as conn:
+            m.apply(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": m.version, "d": m.description, "t": datetime.utcnow()}
+            )
+        applied.append(m.version)
+        print(f"Applied migration {m.version}: {m.description}")
+    return applied
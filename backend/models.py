@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Boolean, Date, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
+from typing import Optional
 from database import Base
-import hashlib
+import passwords
 import uuid
 
 
@@ -22,12 +23,12 @@ class User(Base):
 
     @staticmethod
     def hash_password(password: str) -> str:
-        """Simple password hashing using SHA-256 (for demo, use bcrypt in production)."""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash password with argon2 (blocking; use passwords.hash_password in async code)."""
+        return passwords.hash_password_sync(password)
 
     def verify_password(self, password: str) -> bool:
-        """Verify password against hash."""
-        return self.password_hash == self.hash_password(password)
+        """Verify password against hash (blocking; use passwords.verify_password in async code)."""
+        return passwords.verify_password_sync(self.password_hash, password)[0]
 
     @staticmethod
     def generate_id() -> str:
@@ -37,9 +38,13 @@ class User(Base):
 
 class LearningSession(Base):
     __tablename__ = "learning_sessions"
+    __table_args__ = (
+        # 游标分页用 (created_at, id)；带上 score 使图表按天聚合只读索引。也承担按用户过滤，不再单独给 user_id 建索引
+        Index("ix_learning_sessions_user_created_score", "user_id", "created_at", "id", "score"),
+    )
 
     id = Column(String, primary_key=True)
-    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
     content_type = Column(String(20))  # 'text' or 'url'
     original_content = Column(Text)
     question = Column(Text)
@@ -60,9 +65,15 @@ class LearningSession(Base):
 class FlashCard(Base):
     """闪卡模型 - 用于间隔重复学习"""
     __tablename__ = "flashcards"
+    __table_args__ = (
+        # user_id 开头的复合索引同时承担按用户过滤，不再单独给 user_id 建索引
+        Index("ix_flashcards_user_created", "user_id", "created_at", "id"),
+        # 到期队列加载 (id, next_review_date)，覆盖索引不回表
+        Index("ix_flashcards_user_next_review_id", "user_id", "next_review_date", "id"),
+    )
 
     id = Column(String, primary_key=True)
-    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
     session_id = Column(String, ForeignKey("learning_sessions.id"), nullable=True, index=True)
     front = Column(Text, nullable=False)  # 问题/提示
     back = Column(Text, nullable=False)   # 答案/核心概念
@@ -71,7 +82,11 @@ class FlashCard(Base):
     ease_factor = Column(Float, default=2.5)  # 难度系数 (1.3 - inf)
     interval = Column(Integer, default=0)       # 当前间隔天数
     repetitions = Column(Integer, default=0)    # 复习次数
-    next_review_date = Column(DateTime, default=datetime.utcnow, index=True)
+    next_review_date = Column(DateTime, default=datetime.utcnow)
+
+    # FSRS 记忆状态（见 fsrs.py），无论选用哪种调度都随复习更新；未复习过为空
+    stability = Column(Float, nullable=True)   # 稳定性（天）
+    difficulty = Column(Float, nullable=True)  # 难度 (1 - 10)
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -85,9 +100,9 @@ class FlashCard(Base):
     def generate_id() -> str:
         return str(uuid.uuid4())
 
-    def calculate_next_review(self, quality: int):
+    def calculate_next_review(self, quality: int, now: Optional[datetime] = None):
         """
-        SuperMemo SM-2 算法计算下次复习时间
+        SuperMemo SM-2 算法计算下次复习时间（批量计算见 scheduling.sm2）
 
         Args:
             quality: 0-5 用户评分
@@ -97,6 +112,7 @@ class FlashCard(Base):
                 3: 勉强回忆
                 4: 轻松回忆
                 5: 完全掌握
+            now: 复习时间，默认当前 UTC 时间
         """
         if quality < 3:
             # 回答错误，重置
@@ -117,8 +133,9 @@ class FlashCard(Base):
         self.ease_factor = max(1.3, self.ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)))
 
         # 计算下次复习日期
-        self.next_review_date = datetime.utcnow() + timedelta(days=self.interval)
-        self.updated_at = datetime.utcnow()
+        now = now or datetime.utcnow()
+        self.next_review_date = now + timedelta(days=self.interval)
+        self.updated_at = now
 
         return self
 
@@ -131,12 +148,18 @@ class FlashCard(Base):
 class FlashCardReview(Base):
     """闪卡复习记录"""
     __tablename__ = "flashcard_reviews"
+    __table_args__ = (
+        # 按卡片取复习记录（按时间排序），也承担 card_id 上的过滤
+        Index("ix_flashcard_reviews_card_reviewed", "card_id", "reviewed_at"),
+        Index("ux_flashcard_reviews_card_client_id", "card_id", "client_review_id", unique=True),
+    )
 
     id = Column(String, primary_key=True)
-    card_id = Column(String, ForeignKey("flashcards.id"), nullable=False, index=True)
+    card_id = Column(String, ForeignKey("flashcards.id"), nullable=False)
     quality = Column(Integer, nullable=False)  # 0-5: 用户评分
     time_spent = Column(Integer, default=0)     # 花费时间（秒）
-    reviewed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    reviewed_at = Column(DateTime, default=datetime.utcnow)
+    client_review_id = Column(String(64), nullable=True)  # 客户端生成的复习 id，离线重放时去重
 
     # Relationships
     card = relationship("FlashCard", back_populates="reviews")
@@ -155,7 +178,37 @@ class UserStatistics(Base):
     best_score = Column(Float)
     total_flashcards = Column(Integer, default=0)  # 总闪卡数
     cards_due_today = Column(Integer, default=0)   # 今日待复习
+    total_reviews = Column(Integer, default=0, nullable=False)   # 累计复习次数
+    quality_sum = Column(Integer, default=0, nullable=False)     # 累计复习评分之和
+    mastered_cards = Column(Integer, default=0, nullable=False)  # 已掌握（间隔 > 30 天）的闪卡数
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     user = relationship("User", back_populates="statistics")
+
+
+class UserDailyStats(Base):
+    """按用户、按天（UTC）汇总的闪卡统计，随复习和闪卡增删在同一事务中增量更新"""
+    __tablename__ = "user_daily_stats"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    review_count = Column(Integer, default=0, nullable=False)  # 当天复习次数
+    quality_sum = Column(Integer, default=0, nullable=False)   # 当天复习评分之和
+    due_count = Column(Integer, default=0, nullable=False)     # 已不再维护：今日待复习数改由 flashcards 的到期索引计数
+
+
+class UserScheduler(Base):
+    """用户选用的复习调度算法及拟合得到的 FSRS 参数；没有记录时使用 SM-2"""
+    __tablename__ = "user_schedulers"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    algorithm = Column(String(10), default="sm2", nullable=False)  # 'sm2' 或 'fsrs'
+    desired_retention = Column(Float, default=0.9, nullable=False)  # FSRS 目标回忆概率
+    parameters = Column(Text)  # 拟合的 FSRS 参数（JSON 数组），为空时使用默认参数
+    fit_status = Column(String(20), default="idle", nullable=False)  # idle / fitting / ready / failed
+    fit_loss = Column(Float)          # 拟合后的对数损失
+    fit_default_loss = Column(Float)  # 默认参数的对数损失
+    fit_review_count = Column(Integer, default=0, nullable=False)
+    fitted_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
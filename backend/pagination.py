@@ -0,0 +1,109 @@
+"""
+游标（keyset）分页
+按 (created_at, id) 倒序翻页：每页都是一次索引范围扫描，与翻到第几页无关。
+游标对客户端是不透明字符串；总数可选返回，并按用户短时缓存。
+"""
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from ttl_cache import TTLCache
+
+# 总数缓存的有效期（秒）；增删记录时会主动失效
+TOTAL_COUNT_TTL = float(os.getenv("TOTAL_COUNT_TTL", "60"))
+
+# 单页最大条数
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+_total_cache = TTLCache(maxsize=10000, ttl=TOTAL_COUNT_TTL)
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+def keyset_page(stmt: Select, created_col, id_col, cursor: Optional[str], limit: int) -> Select:
+    """给查询加上 (created_at, id) 倒序的游标条件，多取一行用于判断是否还有下一页"""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            created_col < created_at,
+            and_(created_col == created_at, id_col < row_id)
+        ))
+    return stmt.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def split_page(rows: Sequence[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """截取本页数据并生成下一页游标（没有下一页时为 None）"""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
+
+
+async def cached_count(db: AsyncSession, key: Hashable, stmt: Select) -> int:
+    """带缓存的 count(*)；stmt 为要计数的 select"""
+    total = _total_cache.get(key)
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
+        _total_cache.set(key, total)
+    return total
+
+
+def invalidate_count(key: Hashable) -> None:
+    _total_cache.pop(key)
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    created_col,
+    id_col,
+    *,
+    count_key: Hashable,
+    cursor: Optional[str] = None,
+    page: int = 1,
+    limit: int = 20,
+    include_total: bool = True
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    分页查询，返回 (本页数据, 分页信息)
+
+    传 cursor 时按游标翻页；未传 cursor 且 page > 1 时退回 offset 分页，兼容旧客户端。
+    分页信息总是包含 next_cursor，客户端可以从任意一页切换到游标翻页。
+    include_total=False 时不计算总数。
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page_stmt = keyset_page(stmt, created_col, id_col, cursor, limit)
+    if not cursor and page > 1:
+        page_stmt = page_stmt.offset((page - 1) * limit)
+
+    rows, next_cursor = split_page((await db.scalars(page_stmt)).all(), limit)
+
+    meta: Dict[str, Any] = {"limit": limit, "next_cursor": next_cursor}
+    if not cursor:
+        meta["page"] = page
+    if include_total:
+        total = await cached_count(db, count_key, stmt)
+        meta["total"] = total
+        meta["pages"] = (total + limit - 1) // limit
+    return rows, meta
@@ -0,0 +1,77 @@
+"""
+密码哈希
+使用 argon2id，计算放到有界线程池中执行，不阻塞事件循环（argon2-cffi 计算时释放 GIL）。
+旧版无盐 SHA-256 哈希仍可验证，登录成功时返回新的 argon2 哈希供调用方写回。
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+# argon2 成本参数：迭代次数、内存（KiB）、单次哈希的并行度
+PASSWORD_HASH_TIME_COST = int(os.getenv("PASSWORD_HASH_TIME_COST", "3"))
+PASSWORD_HASH_MEMORY_COST = int(os.getenv("PASSWORD_HASH_MEMORY_COST", "65536"))
+PASSWORD_HASH_PARALLELISM = int(os.getenv("PASSWORD_HASH_PARALLELISM", "1"))
+
+# 同时进行的哈希计算数上限，默认不超过 CPU 核数
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_hasher = PasswordHasher(
+    time_cost=PASSWORD_HASH_TIME_COST,
+    memory_cost=PASSWORD_HASH_MEMORY_COST,
+    parallelism=PASSWORD_HASH_PARALLELISM,
+)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+_LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_legacy_hash(password_hash: str) -> bool:
+    return bool(_LEGACY_SHA256.match(password_hash or ""))
+
+
+def hash_password_sync(password: str) -> str:
+    return _hasher.hash(password)
+
+
+def verify_password_sync(password_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+    """
+    验证密码，返回 (是否匹配, 新哈希)
+
+    匹配且哈希需要升级（旧版 SHA-256 或成本参数已调整）时新哈希不为 None。
+    """
+    if is_legacy_hash(password_hash):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        if not hmac.compare_digest(legacy, password_hash):
+            return False, None
+        return True, _hasher.hash(password)
+
+    try:
+        _hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False, None
+
+    if _hasher.check_needs_rehash(password_hash):
+        return True, _hasher.hash(password)
+    return True, None
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, hash_password_sync, password)
+
+
+async def verify_password(password_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, verify_password_sync, password_hash, password)
+
+
+def shutdown_password_hasher() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,29 @@
+"""
+限流
+按客户端 IP 的接口限流（slowapi 装饰器），以及按用户计数的评估额度：批量评估的每一条回答都算一次，
+避免一个请求绕过单条评估接口的限流扇出大量 LLM 调用。
+"""
+import os
+
+from fastapi import HTTPException
+from limits import parse
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+# 每个用户在时间窗口内可评估的回答数（limits 格式，如 200/hour）
+EVALUATION_RATE_LIMIT = os.getenv("EVALUATION_RATE_LIMIT", "200/hour")
+
+limiter = Limiter(key_func=get_remote_address)
+
+_evaluation_limit = parse(EVALUATION_RATE_LIMIT)
+
+
+def charge_evaluations(user_id: str, count: int) -> None:
+    """从用户的评估额度中扣除 count 条，额度不足时整批拒绝（429），被拒绝的批次不占用额度"""
+    strategy = limiter.limiter
+    if not (strategy.test(_evaluation_limit, "evaluations", user_id, cost=count)
+            and strategy.hit(_evaluation_limit, "evaluations", user_id, cost=count)):
+        raise HTTPException(
+            status_code=429,
+            detail=f"评估次数超过限制（{EVALUATION_RATE_LIMIT}），请稍后再试"
+        )
@@ -0,0 +1,220 @@
+"""
+闪卡统计汇总
+复习、创建、删除闪卡时在同一事务中增量更新 user_daily_stats（按天复习数）和 user_statistics（累计），
+统计接口只需读汇总表，不必扫描复习记录。计数用 SQL 自增表达式，并发请求不会互相覆盖。
+今日待复习数不做汇总，直接在 (user_id, next_review_date, id) 覆盖索引上计数，只读到期的索引项。
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from models import FlashCard, FlashCardReview, UserDailyStats, UserStatistics
+
+# 间隔超过该天数的闪卡视为已掌握
+MASTERED_INTERVAL_DAYS = 30
+
+# 本周复习数统计的天数（含今天）
+WEEK_DAYS = 7
+
+
+def _day(value: Optional[datetime]) -> date:
+    return (value or datetime.utcnow()).date()
+
+
+def _is_mastered(interval: Optional[int]) -> bool:
+    return (interval or 0) > MASTERED_INTERVAL_DAYS
+
+
+def _insert_for(db: AsyncSession):
+    dialect = db.bind.dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert
+    if dialect == "postgresql":
+        return pg_insert
+    raise NotImplementedError(f"Upsert is not supported for dialect: {dialect}")
+
+
+async def bump_daily(db: AsyncSession, user_id: str, day: date, **deltas: int) -> None:
+    """给 (user_id, day) 行的计数加上 deltas，行不存在时插入"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = UserDailyStats.__table__
+    stmt = _insert_for(db)(table).values(
+        user_id=user_id,
+        day=day,
+        **{name: deltas.get(name, 0) for name in ("review_count", "quality_sum", "due_count")}
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day],
+        set_={name: table.c[name] + stmt.excluded[name] for name in deltas}
+    )
+    await db.execute(stmt)
+
+
+async def bump_user_stats(db: AsyncSession, user_id: str, **deltas: int) -> None:
+    """user_statistics 累计计数自增；用户没有统计行时不做任何事"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    await db.execute(
+        update(UserStatistics)
+        .where(UserStatistics.user_id == user_id)
+        .values({name: getattr(UserStatistics, name) + delta for name, delta in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def on_card_created(db: AsyncSession, card: FlashCard) -> None:
+    await bump_user_stats(db, card.user_id, total_flashcards=1)
+
+
+def card_reviews_query(card_id: str) -> Select:
+    """一张闪卡的全部复习记录 (reviewed_at, quality)"""
+    return select(FlashCardReview.reviewed_at, FlashCardReview.quality).where(
+        FlashCardReview.card_id == card_id
+    ).order_by(FlashCardReview.reviewed_at)
+
+
+async def on_card_deleted(db: AsyncSession, card: FlashCard) -> None:
+    """闪卡的复习记录会随闪卡一起删除，同时从汇总中扣除"""
+    per_day: Dict[date, list] = {}
+    reviews = await db.execute(card_reviews_query(card.id))
+    for reviewed_at, quality in reviews:
+        counts = per_day.setdefault(_day(reviewed_at), [0, 0])
+        counts[0] += 1
+        counts[1] += quality
+    for day, (count, quality_sum) in per_day.items():
+        await bump_daily(db, card.user_id, day, review_count=-count, quality_sum=-quality_sum)
+
+    await bump_user_stats(
+        db, card.user_id,
+        total_flashcards=-1,
+        total_reviews=-sum(count for count, _ in per_day.values()),
+        quality_sum=-sum(quality_sum for _, quality_sum in per_day.values()),
+        mastered_cards=-int(_is_mastered(card.interval))
+    )
+
+
+async def on_card_reviewed(
+    db: AsyncSession,
+    card: FlashCard,
+    quality: int,
+    old_interval: Optional[int],
+    reviewed_at: Optional[datetime] = None
+) -> None:
+    """card 已按本次评分更新；old_interval 为更新前的间隔"""
+    await bump_daily(db, card.user_id, _day(reviewed_at), review_count=1, quality_sum=quality)
+
+    await bump_user_stats(
+        db, card.user_id,
+        total_reviews=1,
+        quality_sum=quality,
+        mastered_cards=int(_is_mastered(card.interval)) - int(_is_mastered(old_interval))
+    )
+
+
+async def on_reviews_applied(
+    db: AsyncSession,
+    user_id: str,
+    reviews: Iterable[Tuple[datetime, int]],
+    cards: Iterable[Dict]
+) -> None:
+    """
+    批量复习后一次性更新汇总
+
+    reviews 为每次复习的 (reviewed_at, quality)；cards 为 scheduling.apply_reviews 返回的写回行。
+    """
+    per_day: Dict[date, list] = {}
+    total = quality_total = 0
+    for reviewed_at, quality in reviews:
+        counts = per_day.setdefault(_day(reviewed_at), [0, 0])
+        counts[0] += 1
+        counts[1] += quality
+        total += 1
+        quality_total += quality
+    for day, (count, quality_sum) in sorted(per_day.items()):
+        await bump_daily(db, user_id, day, review_count=count, quality_sum=quality_sum)
+
+    mastered = sum(
+        int(_is_mastered(card["interval"])) - int(_is_mastered(card["old_interval"])) for card in cards
+    )
+
+    await bump_user_stats(db, user_id, total_reviews=total, quality_sum=quality_total, mastered_cards=mastered)
+
+
+def flashcard_stats_query(user_id: str, today: date) -> Select:
+    """
+    闪卡统计的查询：累计汇总行左连接最近 7 天的按天汇总，加上到期闪卡数
+
+    读取的行数与用户的历史长度无关：按天汇总只读最近 7 行，到期数只读到期卡片的索引项。
+    """
+    week_start = today - timedelta(days=WEEK_DAYS - 1)
+
+    daily = select(
+        UserDailyStats.user_id,
+        func.sum(case((UserDailyStats.day == today, UserDailyStats.review_count), else_=0)).label("reviews_today"),
+        func.sum(UserDailyStats.review_count).label("reviews_week"),
+    ).where(
+        UserDailyStats.user_id == user_id,
+        UserDailyStats.day >= week_start,
+        UserDailyStats.day <= today
+    ).group_by(UserDailyStats.user_id).subquery()
+
+    due_today = select(func.count(FlashCard.id)).where(
+        FlashCard.user_id == user_id,
+        FlashCard.next_review_date < datetime.combine(today + timedelta(days=1), time.min)
+    ).scalar_subquery()
+
+    return (
+        select(
+            UserStatistics.total_flashcards,
+            UserStatistics.mastered_cards,
+            UserStatistics.total_reviews,
+            UserStatistics.quality_sum,
+            daily.c.reviews_today,
+            daily.c.reviews_week,
+            due_today.label("due_today"),
+        )
+        .select_from(UserStatistics)
+        .outerjoin(daily, daily.c.user_id == UserStatistics.user_id)
+        .where(UserStatistics.user_id == user_id)
+    )
+
+
+async def read_flashcard_stats(db: AsyncSession, user_id: str, today: Optional[date] = None) -> Dict:
+    """
+    一次查询读出闪卡统计
+
+    due_today 为下次复习日期不晚于今天（UTC）的闪卡数，reviews_week 为含今天在内最近 7 天的复习数。
+    """
+    row = (await db.execute(flashcard_stats_query(user_id, today or datetime.utcnow().date()))).first()
+
+    if row is None:
+        return {
+            "total_cards": 0,
+            "due_today": 0,
+            "reviews_today": 0,
+            "reviews_week": 0,
+            "mastered_cards": 0,
+            "mastery_rate": 0,
+            "avg_quality": 0
+        }
+
+    total_cards = row.total_flashcards or 0
+    mastered_cards = row.mastered_cards or 0
+    total_reviews = row.total_reviews or 0
+    return {
+        "total_cards": total_cards,
+        "due_today": row.due_today or 0,
+        "reviews_today": row.reviews_today or 0,
+        "reviews_week": row.reviews_week or 0,
+        "mastered_cards": mastered_cards,
+        "mastery_rate": round(mastered_cards / total_cards * 100, 1) if total_cards > 0 else 0,
+        "avg_quality": round((row.quality_sum or 0) / total_reviews, 1) if total_reviews > 0 else 0
+    }
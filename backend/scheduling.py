@@ -0,0 +1,465 @@
+"""
+批量 SM-2 调度与按用户选择的 FSRS 调度
+对 (ease_factor, interval, repetitions, quality) 数组整体计算下一次复习，结果与
+FlashCard.calculate_next_review 逐张计算完全一致（同样的浮点运算顺序，间隔向零取整），
+再用一次按主键的批量 UPDATE 写回：重置卡组、迁移难度系数、模拟整组复习等任务用 reschedule，
+批量复习（apply_reviews）按轮次整体计算。
+
+每次复习同时更新卡片的 FSRS 记忆状态（stability / difficulty）；用户选用 FSRS 时
+下次复习间隔由记忆状态和目标回忆概率决定，SM-2 的 ease_factor / repetitions 照常更新，便于切换回去。
+FSRS 参数由后台任务从用户的复习记录拟合（fsrs.fit）。
+"""
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+import fsrs
+from database import AsyncSessionLocal
+from models import FlashCard, FlashCardReview, UserScheduler
+from ttl_cache import TTLCache
+
+# 与 FlashCard 列默认值一致，空值按新卡处理
+DEFAULT_EASE_FACTOR = 2.5
+MIN_EASE_FACTOR = 1.3
+
+# 按 id 查询时每条 IN 语句的最大参数数
+ID_CHUNK_SIZE = 900
+
+ALGORITHMS = ("sm2", "fsrs")
+
+# FSRS 默认目标回忆概率及允许的范围
+FSRS_DESIRED_RETENTION = float(os.getenv("FSRS_DESIRED_RETENTION", "0.9"))
+MIN_DESIRED_RETENTION = 0.7
+MAX_DESIRED_RETENTION = 0.97
+
+# 用户调度配置的进程内缓存有效期（秒）
+SCHEDULER_CACHE_TTL = int(os.getenv("SCHEDULER_CACHE_TTL", "60"))
+
+# 拟合时读取复习记录、写回记忆状态的批大小
+FIT_BATCH_SIZE = 5000
+
+
+@dataclass
+class SM2Batch:
+    ease_factor: np.ndarray   # float64
+    interval: np.ndarray      # int64，天
+    repetitions: np.ndarray   # int64
+
+
+def _as_array(values, dtype, default) -> np.ndarray:
+    if isinstance(values, np.ndarray):
+        return values.astype(dtype, copy=False)
+    return np.array([default if v is None else v for v in values], dtype=dtype)
+
+
+def sm2(ease_factor: Sequence, interval: Sequence, repetitions: Sequence, quality: Sequence) -> SM2Batch:
+    """对等长数组应用一次 SM-2 评分，返回新的状态"""
+    ease = _as_array(ease_factor, np.float64, DEFAULT_EASE_FACTOR)
+    ivl = _as_array(interval, np.int64, 0)
+    reps = _as_array(repetitions, np.int64, 0)
+    q = np.asarray(quality, dtype=np.int64)
+
+    passed = q >= 3
+    grown = np.trunc(ivl * ease).astype(np.int64)
+    new_interval = np.where(
+        passed,
+        np.where(reps == 0, 1, np.where(reps == 1, 6, grown)),
+        1
+    )
+    new_reps = np.where(passed, reps + 1, 0)
+
+    lapse = 5 - q
+    new_ease = np.maximum(MIN_EASE_FACTOR, ease + (0.1 - lapse * (0.08 + lapse * 0.02)))
+
+    return SM2Batch(ease_factor=new_ease, interval=new_interval, repetitions=new_reps)
+
+
+async def load_states(db: AsyncSession, user_id: str, card_ids: Sequence[str]) -> Dict[str, Any]:
+    """按 id 读取用户闪卡的调度字段，返回 {id: row}；不存在或不属于该用户的卡片不在结果中"""
+    ids = list(dict.fromkeys(card_ids))
+    states = {}
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        rows = await db.execute(
+            select(
+                FlashCard.id, FlashCard.ease_factor, FlashCard.interval,
+                FlashCard.repetitions, FlashCard.next_review_date,
+                FlashCard.stability, FlashCard.difficulty
+            ).where(FlashCard.user_id == user_id, FlashCard.id.in_(ids[start:start + ID_CHUNK_SIZE]))
+        )
+        states.update((row.id, row) for row in rows)
+    return states
+
+
+async def reschedule(
+    db: AsyncSession,
+    user_id: str,
+    card_ids: Sequence[str],
+    qualities: Optional[Sequence[int]] = None,
+    ease_factor: Union[float, Sequence[float], None] = None,
+    now: Optional[datetime] = None
+) -> List[Dict]:
+    """
+    批量重新调度用户的闪卡并写回（不提交事务）
+
+    ease_factor 为单个值或与 card_ids 等长的序列，先覆盖卡片的难度系数；qualities 与 card_ids 等长时
+    再按评分整体应用一次 SM-2，只给 ease_factor 时排期不变。只更新 SM-2 字段，FSRS 记忆状态不变。
+    card_ids 不能重复；不属于该用户的卡片会被忽略。返回写回的行（含更新前的 interval、next_review_date，
+    键为 old_interval / old_next_review_date），供调用方更新统计。
+    """
+    now = now or datetime.utcnow()
+    positions = {card_id: i for i, card_id in enumerate(card_ids)}
+    if len(positions) != len(card_ids):
+        raise ValueError("card_ids must not contain duplicates")
+
+    rows = list((await load_states(db, user_id, card_ids)).values())
+    if not rows:
+        return []
+
+    if ease_factor is None:
+        ease = [r.ease_factor for r in rows]
+    elif isinstance(ease_factor, (int, float)):
+        ease = [float(ease_factor)] * len(rows)
+    else:
+        ease = [ease_factor[positions[r.id]] for r in rows]
+
+    if qualities is None:
+        params = [
+            {"id": r.id, "ease_factor": e, "interval": r.interval, "repetitions": r.repetitions,
+             "next_review_date": r.next_review_date}
+            for r, e in zip(rows, ease)
+        ]
+    else:
+        result = sm2(
+            ease,
+            [r.interval for r in rows],
+            [r.repetitions for r in rows],
+            [qualities[positions[r.id]] for r in rows]
+        )
+        params = [
+            {"id": r.id, "ease_factor": e, "interval": interval, "repetitions": reps,
+             "next_review_date": now + timedelta(days=interval)}
+            for r, e, interval, reps in zip(
+                rows, result.ease_factor.tolist(), result.interval.tolist(), result.repetitions.tolist()
+            )
+        ]
+    for param in params:
+        param["updated_at"] = now
+    await db.execute(update(FlashCard), params)
+
+    for row, param in zip(rows, params):
+        param["old_interval"] = row.interval
+        param["old_next_review_date"] = row.next_review_date
+    return params
+
+
+def review_rounds(card_ids: Sequence[str]) -> List[List[int]]:
+    """
+    把按时间排序的复习分成若干轮：第 k 轮包含每张卡片的第 k 次复习（下标），
+    同一张卡片的多次复习按原顺序落在相邻的轮次中，每轮内可以整体向量化计算
+    """
+    rounds: List[List[int]] = []
+    seen: Dict[str, int] = {}
+    for index, card_id in enumerate(card_ids):
+        occurrence = seen.get(card_id, 0)
+        seen[card_id] = occurrence + 1
+        if occurrence == len(rounds):
+            rounds.append([])
+        rounds[occurrence].append(index)
+    return rounds
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    algorithm: str = "sm2"
+    desired_retention: float = FSRS_DESIRED_RETENTION
+    parameters: Optional[Tuple[float, ...]] = None  # 为空时使用 FSRS 默认参数
+
+    @property
+    def weights(self) -> np.ndarray:
+        return fsrs.as_matrix(self.parameters)
+
+
+_configs = TTLCache(maxsize=10000, ttl=SCHEDULER_CACHE_TTL)
+
+
+def config_from(settings: Optional[UserScheduler]) -> SchedulerConfig:
+    if settings is None:
+        return SchedulerConfig()
+    return SchedulerConfig(
+        algorithm=settings.algorithm,
+        desired_retention=settings.desired_retention,
+        parameters=tuple(json.loads(settings.parameters)) if settings.parameters else None
+    )
+
+
+async def load_config(db: AsyncSession, user_id: str) -> SchedulerConfig:
+    config = _configs.get(user_id)
+    if config is None:
+        config = config_from(await db.get(UserScheduler, user_id))
+        _configs.set(user_id, config)
+    return config
+
+
+def invalidate_config(user_id: str) -> None:
+    _configs.pop(user_id)
+
+
+def fsrs_update(
+    config: SchedulerConfig,
+    states: Sequence[Tuple[Optional[float], Optional[float], Optional[int], Optional[datetime]]],
+    reviews: Sequence[Tuple[int, datetime]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    对 (stability, difficulty, interval, next_review_date) 状态应用一次 (quality, reviewed_at) 复习，
+    返回新的 (stability, difficulty, FSRS 间隔天数)
+
+    上次复习时间取 next_review_date - interval；从未复习过的卡片按首次复习计算，
+    没有记忆状态的已复习卡片（例如迁移前的数据）以当前间隔为稳定性、默认难度为起点。
+    """
+    w = config.weights
+    stability = np.array([np.nan if s is None else s for s, _, _, _ in states], dtype=np.float64)
+    difficulty = np.array([np.nan if d is None else d for _, d, _, _ in states], dtype=np.float64)
+    interval = np.array([i or 0 for _, _, i, _ in states], dtype=np.float64)
+    legacy = np.isnan(stability) & (interval > 0)
+    stability = np.where(legacy, interval, stability)
+    difficulty = np.where(legacy, w[0, 4], difficulty)
+
+    elapsed = np.array([
+        ((reviewed_at - (next_review - timedelta(days=ivl))).total_seconds() / 86400) if next_review and ivl else 0.0
+        for (_, _, ivl, next_review), (_, reviewed_at) in zip(states, reviews)
+    ])
+    s, d = fsrs.step(w, stability[None], difficulty[None], elapsed, fsrs.grades([q for q, _ in reviews]))
+    return s[0], d[0], fsrs.next_interval(s[0], config.desired_retention)
+
+
+def review_card(card: FlashCard, quality: int, config: SchedulerConfig, now: Optional[datetime] = None) -> FlashCard:
+    """按用户的调度配置应用一次复习（SM-2 字段和 FSRS 记忆状态都更新）"""
+    now = now or datetime.utcnow()
+    stability, difficulty, interval = fsrs_update(
+        config, [(card.stability, card.difficulty, card.interval, card.next_review_date)], [(quality, now)]
+    )
+    card.calculate_next_review(quality, now=now)
+    card.stability, card.difficulty = float(stability[0]), float(difficulty[0])
+    if config.algorithm == "fsrs":
+        card.interval = int(interval[0])
+        card.next_review_date = now + timedelta(days=card.interval)
+    return card
+
+
+async def apply_reviews(
+    db: AsyncSession,
+    user_id: str,
+    reviews: Sequence[Tuple[str, int, datetime]],
+    config: Optional[SchedulerConfig] = None,
+    now: Optional[datetime] = None
+) -> Tuple[List[Dict], List[Tuple[int, datetime]]]:
+    """
+    按顺序应用一批复习 (card_id, quality, reviewed_at) 并批量写回（不提交事务）
+
+    每次复习以自己的 reviewed_at 作为计算下次复习时间的基准，与逐条调用
+    review_card(card, quality, config, now=reviewed_at) 的结果一致（SM-2 下即 calculate_next_review）。
+    早于卡片上次复习（next_review_date - interval）的离线复习按上次复习时间计算，避免间隔为负；
+    updated_at 写服务器时间 now，而不是客户端提供的复习时间。
+    返回 (每张卡片最终写回的行（含 old_interval / old_next_review_date）,
+    实际应用的复习的 (下标, 计算时使用的复习时间))；复习记录和统计应使用后者，与排期一致。
+    不存在或不属于该用户的卡片跳过。
+    """
+    config = config or SchedulerConfig()
+    now = now or datetime.utcnow()
+    states = await load_states(db, user_id, [card_id for card_id, _, _ in reviews])
+    applied = [i for i, (card_id, _, _) in enumerate(reviews) if card_id in states]
+    if not applied:
+        return [], []
+
+    effective: Dict[int, datetime] = {}
+    current = {
+        card_id: [
+            row.ease_factor, row.interval, row.repetitions, row.next_review_date,
+            row.next_review_date - timedelta(days=row.interval) if row.next_review_date and row.interval else None,
+            row.stability, row.difficulty
+        ]
+        for card_id, row in states.items()
+    }
+    for batch in review_rounds([reviews[i][0] for i in applied]):
+        indices = [applied[j] for j in batch]
+        card_ids = [reviews[i][0] for i in indices]
+        reviewed_at = [
+            max(reviews[i][2], current[c][4]) if current[c][4] else reviews[i][2]
+            for i, c in zip(indices, card_ids)
+        ]
+        effective.update(zip(indices, reviewed_at))
+        result = sm2(
+            [current[c][0] for c in card_ids],
+            [current[c][1] for c in card_ids],
+            [current[c][2] for c in card_ids],
+            [reviews[i][1] for i in indices]
+        )
+        stability, difficulty, fsrs_interval = fsrs_update(
+            config,
+            [(current[c][5], current[c][6], current[c][1], current[c][3]) for c in card_ids],
+            [(reviews[i][1], at) for i, at in zip(indices, reviewed_at)]
+        )
+        intervals = fsrs_interval if config.algorithm == "fsrs" else result.interval
+        for card_id, at, ease, interval, reps, s, d in zip(
+            card_ids, reviewed_at, result.ease_factor.tolist(), intervals.tolist(), result.repetitions.tolist(),
+            stability.tolist(), difficulty.tolist()
+        ):
+            current[card_id] = [ease, interval, reps, at + timedelta(days=interval), at, s, d]
+
+    params = []
+    for card_id in dict.fromkeys(reviews[i][0] for i in applied):
+        ease, interval, reps, next_review, _, stability, difficulty = current[card_id]
+        params.append({
+            "id": card_id,
+            "ease_factor": ease,
+            "interval": interval,
+            "repetitions": reps,
+            "next_review_date": next_review,
+            "stability": stability,
+            "difficulty": difficulty,
+            "updated_at": now
+        })
+    await db.execute(update(FlashCard), params)
+
+    for param in params:
+        row = states[param["id"]]
+        param["old_interval"] = row.interval
+        param["old_next_review_date"] = row.next_review_date
+    return params, [(i, effective[i]) for i in applied]
+
+
+async def predict_recall(
+    db: AsyncSession, user_id: str, at: Optional[datetime] = None
+) -> Tuple[List[str], np.ndarray, int]:
+    """
+    预测用户每张已复习卡片在 at 时刻（默认现在）的回忆概率
+
+    返回 (有记忆状态的卡片 id, 回忆概率数组, 没有记忆状态的卡片数（未复习过）)。
+    """
+    at = at or datetime.utcnow()
+    rows = (await db.execute(
+        select(FlashCard.id, FlashCard.stability, FlashCard.interval, FlashCard.next_review_date)
+        .where(FlashCard.user_id == user_id)
+    )).all()
+    known = [row for row in rows if row.stability is not None and row.next_review_date is not None]
+    if not known:
+        return [], np.array([]), len(rows)
+
+    stability = np.array([row.stability for row in known], dtype=np.float64)
+    next_review = np.array([row.next_review_date for row in known], dtype="datetime64[s]")
+    interval = np.array([row.interval or 0 for row in known], dtype=np.int64)
+    last_review = next_review - interval.astype("timedelta64[D]")
+    elapsed = (np.datetime64(at, "s") - last_review) / np.timedelta64(1, "D")
+    return [row.id for row in known], fsrs.retrievability(elapsed, stability), len(rows) - len(known)
+
+
+def scheduler_record(settings: Optional[UserScheduler]) -> Dict:
+    config = config_from(settings)
+    return {
+        "algorithm": config.algorithm,
+        "desired_retention": config.desired_retention,
+        "parameters": list(config.parameters or fsrs.DEFAULT_PARAMETERS.tolist()),
+        "fitted": bool(settings and settings.parameters),
+        "fit_status": settings.fit_status if settings else "idle",
+        "fit_loss": settings.fit_loss if settings else None,
+        "fit_default_loss": settings.fit_default_loss if settings else None,
+        "fit_review_count": settings.fit_review_count if settings else 0,
+        "fitted_at": settings.fitted_at if settings else None,
+    }
+
+
+async def get_or_create_settings(db: AsyncSession, user_id: str) -> UserScheduler:
+    settings = await db.get(UserScheduler, user_id)
+    if settings is None:
+        settings = UserScheduler(
+            user_id=user_id, algorithm="sm2", desired_retention=FSRS_DESIRED_RETENTION,
+            fit_status="idle", fit_review_count=0
+        )
+        db.add(settings)
+    return settings
+
+
+_fit_tasks: Dict[str, asyncio.Task] = {}
+
+
+def start_fit(user_id: str) -> bool:
+    """在后台拟合用户的 FSRS 参数；该用户已有拟合任务在运行时返回 False"""
+    task = _fit_tasks.get(user_id)
+    if task is not None and not task.done():
+        return False
+    task = asyncio.get_running_loop().create_task(fit_user_parameters(user_id))
+    _fit_tasks[user_id] = task
+    task.add_done_callback(lambda t: _fit_tasks.pop(user_id, None) if _fit_tasks.get(user_id) is t else None)
+    return True
+
+
+def fit_reviews_query(user_id: str, cutoff: datetime) -> Select:
+    """拟合读取的复习记录 (card_id, reviewed_at, quality)，按卡片、时间排序"""
+    return (
+        select(FlashCardReview.card_id, FlashCardReview.reviewed_at, FlashCardReview.quality)
+        .join(FlashCard, FlashCard.id == FlashCardReview.card_id)
+        .where(FlashCard.user_id == user_id, FlashCardReview.reviewed_at <= cutoff)
+        .order_by(FlashCardReview.card_id, FlashCardReview.reviewed_at)
+    )
+
+
+async def fit_user_parameters(user_id: str) -> Optional[fsrs.FitResult]:
+    """
+    从用户的全部复习记录拟合 FSRS 参数，并用新参数回放历史，重算每张卡片的记忆状态
+
+    使用独立的数据库会话；拟合和回放在线程中计算，不阻塞事件循环。
+    拟合期间又被复习过的卡片保留复习时写入的记忆状态。已排好的下次复习时间不变。
+    """
+    async with AsyncSessionLocal() as db:
+        settings = await get_or_create_settings(db, user_id)
+        settings.fit_status = "fitting"
+        await db.commit()
+
+        try:
+            cutoff = datetime.utcnow()
+            result = await db.stream(
+                fit_reviews_query(user_id, cutoff).execution_options(yield_per=FIT_BATCH_SIZE)
+            )
+            rows = [tuple(row) async for row in result]
+
+            card_ids, histories = await asyncio.to_thread(fsrs.collect_histories, rows)
+            fit = await asyncio.to_thread(fsrs.fit, histories)
+            stability, difficulty = await asyncio.to_thread(fsrs.replay, fit.parameters, histories)
+
+            table = FlashCard.__table__
+            stmt = update(table).where(
+                table.c.id == bindparam("b_id"),
+                or_(table.c.updated_at.is_(None), table.c.updated_at <= cutoff)
+            ).values(stability=bindparam("b_s"), difficulty=bindparam("b_d"), updated_at=table.c.updated_at)
+            params = [
+                {"b_id": card_id, "b_s": s, "b_d": d}
+                for card_id, s, d in zip(card_ids, stability.tolist(), difficulty.tolist())
+            ]
+            for start in range(0, len(params), FIT_BATCH_SIZE):
+                await db.execute(stmt, params[start:start + FIT_BATCH_SIZE])
+
+            settings.parameters = json.dumps(fit.parameters) if fit.fitted else None
+            settings.fit_status = "ready"
+            settings.fit_loss = fit.loss
+            settings.fit_default_loss = fit.default_loss
+            settings.fit_review_count = fit.reviews
+            settings.fitted_at = datetime.utcnow()
+            await db.commit()
+            return fit
+        except Exception as e:
+            print(f"FSRS fit Error: {e}")
+            await db.rollback()
+            settings = await get_or_create_settings(db, user_id)
+            settings.fit_status = "failed"
+            await db.commit()
+            return None
+        finally:
+            invalidate_config(user_id)
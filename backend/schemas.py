@@ -0,0 +1,69 @@
+"""
+列表接口的响应模型
+只包含列表页需要的字段；FastAPI 声明 response_model 后由 pydantic-core 直接序列化为 JSON，
+不再经过 jsonable_encoder 逐个反射 ORM 对象。
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from models import FlashCard, LearningSession
+
+
+class SessionSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    content_type: Optional[str] = None
+    question: Optional[str] = None
+    score: Optional[float] = None
+    created_at: Optional[datetime] = None
+
+
+class FlashCardSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    session_id: Optional[str] = None
+    front: str
+    back: str
+    ease_factor: Optional[float] = None
+    interval: Optional[int] = None
+    repetitions: Optional[int] = None
+    next_review_date: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+
+class Page(BaseModel):
+    """分页信息；未计算总数时 total / pages 不出现在响应中（配合 response_model_exclude_unset）"""
+    limit: int
+    next_cursor: Optional[str] = None
+    page: Optional[int] = None
+    total: Optional[int] = None
+    pages: Optional[int] = None
+
+
+class SessionPage(Page):
+    sessions: List[SessionSummary]
+
+
+class FlashCardPage(Page):
+    flashcards: List[FlashCardSummary]
+
+
+class DueFlashCards(BaseModel):
+    """count 为全部到期闪卡数；flashcards 只是其中按到期时间排序的一页"""
+    flashcards: List[FlashCardSummary]
+    count: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
+def summary_columns(schema: type, model: type) -> list:
+    """响应模型字段对应的 ORM 列，用于 load_only，其余列（大文本）不查询"""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+SESSION_SUMMARY_COLUMNS = summary_columns(SessionSummary, LearningSession)
+FLASHCARD_SUMMARY_COLUMNS = summary_columns(FlashCardSummary, FlashCard)
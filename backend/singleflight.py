@@ -0,0 +1,47 @@
+"""
+Single-flight：相同 key 的并发调用只执行一次，所有调用方共享结果
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """合并进行中的相同请求"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        timeout: Optional[float] = None
+    ) -> T:
+        """
+        执行 fn()，若已有相同 key 的调用在进行则等待它的结果
+
+        上游调用在独立的 task 中运行：某个调用方取消或等待超时
+        不会影响其他调用方；上游抛出的异常会传给每一个调用方。
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        waiter = asyncio.shield(task)
+        if timeout is None:
+            return await waiter
+        return await asyncio.wait_for(waiter, timeout)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有调用方都已离开时避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,130 @@
+"""
+Server-Sent Events 工具
+把 LLM 的流式输出转成 text/event-stream 响应
+"""
+import json
+import re
+from typing import Any, AsyncIterator, Callable, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    """编码一条 SSE 消息"""
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return message
+
+
+def sse_response(
+    events: AsyncIterator[Tuple[str, Any]],
+    on_done: Optional[Callable[[Any], Any]] = None
+) -> StreamingResponse:
+    """
+    把 (event, payload) 序列转成 SSE 响应
+
+    "delta" 事件以默认 message 事件发送 {"delta": ...}，
+    "done" 事件的 payload 先经过 on_done 转换再发送；
+    流中途出错时发送 error 事件（此时响应头已发出，无法再返回 500）。
+    """
+    async def generate():
+        try:
+            async for event, payload in events:
+                if event == "delta":
+                    yield sse_event({"delta": payload})
+                elif event == "done":
+                    yield sse_event(on_done(payload) if on_done else payload, event="done")
+                else:
+                    yield sse_event(payload, event=event)
+        except Exception as e:
+            print(f"Stream Error: {e}")
+            yield sse_event({"detail": str(e)}, event="error")
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+class JsonFieldStreamer:
+    """从逐块到达的 JSON 文本中增量解码某个字符串字段的值"""
+
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field: str):
+        self._pattern = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._pos: Optional[int] = None
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """到目前为止收到的完整 JSON 文本"""
+        return self._buffer
+
+    def feed(self, chunk: str) -> str:
+        """追加一块文本，返回字段值中新解码出的部分"""
+        self._buffer += chunk
+        if self.done:
+            return ""
+
+        if self._pos is None:
+            match = self._pattern.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        buf = self._buffer
+        i = self._pos
+        out = []
+        while i < len(buf):
+            c = buf[i]
+            if c == '\\':
+                # 转义序列不完整时等待下一块
+                if i + 1 >= len(buf):
+                    break
+                escape = buf[i + 1]
+                if escape == 'u':
+                    if i + 6 > len(buf):
+                        break
+                    try:
+                        code = int(buf[i + 2:i + 6], 16)
+                    except ValueError:
+                        i += 6
+                        continue
+                    if 0xD800 <= code <= 0xDBFF:
+                        # 非 BMP 字符以代理对转义，低位的 \uXXXX 可能还在下一块
+                        low = buf[i + 6:i + 12]
+                        if len(low) < 6 and "\\u".startswith(low[:2]):
+                            break
+                        if low.startswith("\\u"):
+                            try:
+                                low_code = int(low[2:], 16)
+                            except ValueError:
+                                low_code = None
+                            if low_code is not None and 0xDC00 <= low_code <= 0xDFFF:
+                                out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low_code - 0xDC00)))
+                                i += 12
+                                continue
+                    if 0xD800 <= code <= 0xDFFF:
+                        # 孤立的代理项无法编码为 UTF-8
+                        out.append("\ufffd")
+                    else:
+                        out.append(chr(code))
+                    i += 6
+                    continue
+                out.append(self._ESCAPES.get(escape, escape))
+                i += 2
+                continue
+            if c == '"':
+                self.done = True
+                i += 1
+                break
+            out.append(c)
+            i += 1
+
+        self._pos = i
+        return "".join(out)
@@ -0,0 +1,37 @@
+"""
+测试公共配置
+在导入应用模块之前把 DATABASE_URL 指向临时 SQLite 库，整个测试会话共用这一个库（含迁移）。
+
+用法（在 backend 目录下）:
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'tests.db')}"
+os.environ.setdefault("LLM_CACHE_DB_PATH", "")
+
+from database import async_engine, init_db  # noqa: E402
+
+init_db()
+
+
+@pytest.fixture
+def run():
+    """在新事件循环中执行协程；结束时释放异步连接池，连接不跨事件循环复用"""
+    def runner(coro):
+        async def wrapped():
+            try:
+                return await coro
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(wrapped())
+    return runner
@@ -0,0 +1,44 @@
+"""到期队列（due_queue.DueQueue）的到期计数与分页"""
+from datetime import datetime, timedelta
+
+from hypothesis import given, strategies as st
+
+from due_queue import DueQueue
+
+START = datetime(2024, 6, 1)
+
+card_ids = st.sampled_from([f"c{i}" for i in range(12)])
+times = st.integers(0, 48).map(lambda hours: START + timedelta(hours=hours))
+operations = st.lists(st.one_of(
+    st.tuples(st.just("schedule"), card_ids, st.one_of(st.none(), times)),
+    st.tuples(st.just("remove"), card_ids, st.none()),
+    st.tuples(st.just("count"), st.none(), times),
+), max_size=60)
+
+
+@given(st.lists(st.tuples(card_ids, st.one_of(st.none(), times)), max_size=12, unique_by=lambda e: e[0]), operations)
+def test_due_count_matches_a_full_scan(entries, ops):
+    queue = DueQueue(entries)
+    model = {card_id: when for card_id, when in entries}
+    for op, card_id, when in ops:
+        if op == "schedule":
+            queue.schedule(card_id, when)
+            model[card_id] = when
+        elif op == "remove":
+            queue.remove(card_id)
+            model.pop(card_id, None)
+        else:
+            expected = sum(1 for due in model.values() if due is not None and due <= when)
+            assert queue.due_count(when) == expected
+    assert len(queue) == sum(1 for due in model.values() if due is not None)
+
+
+def test_due_pages_stop_at_now():
+    queue = DueQueue([(f"c{i}", START + timedelta(hours=i)) for i in range(10)])
+    now = START + timedelta(hours=4, minutes=30)
+
+    first = queue.due(now, 3)
+    second = queue.due(now, 3, after=first[-1])
+
+    assert [card_id for _, card_id in first + second] == ["c0", "c1", "c2", "c3", "c4"]
+    assert queue.due_count(now) == 5
@@ -0,0 +1,142 @@
+"""
+查询计划回归：确认各接口的热点查询命中预期索引，且新库与迁移后的旧库索引一致
+
+在测试库上写入少量示例数据并 ANALYZE，对接口实际执行的查询（由接口使用的同一组查询构造函数生成）
+执行 EXPLAIN QUERY PLAN。
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+import due_queue
+import rollups
+import scheduling
+from api.v1.flashcards import flashcards_query
+from api.v1.sessions import sessions_query
+from api.v1.statistics import chart_query
+from database import Base, SessionLocal, engine
+from migrations import run_migrations
+from models import FlashCard, FlashCardReview, LearningSession, User
+from pagination import keyset_page
+
+USERS = 20
+ROWS_PER_USER = 200
+
+# 基线 models 上的 index=True 建出的单列索引，迁移后应全部去掉
+LEGACY_INDEXES = {
+    "ix_learning_sessions_user_id": ("learning_sessions", "user_id"),
+    "ix_flashcards_user_id": ("flashcards", "user_id"),
+    "ix_flashcards_next_review_date": ("flashcards", "next_review_date"),
+    "ix_flashcard_reviews_card_id": ("flashcard_reviews", "card_id"),
+    "ix_flashcard_reviews_reviewed_at": ("flashcard_reviews", "reviewed_at"),
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded():
+    db = SessionLocal()
+    now = datetime.utcnow()
+    for u in range(USERS):
+        user_id = f"plans-user-{u}"
+        db.add(User(id=user_id, email=f"{user_id}@example.com", password_hash="x"))
+        for i in range(ROWS_PER_USER):
+            created = now - timedelta(hours=i)
+            db.add(LearningSession(
+                id=f"{user_id}-s{i}", user_id=user_id, question="q", score=i % 100, created_at=created
+            ))
+            card_id = f"{user_id}-c{i}"
+            db.add(FlashCard(
+                id=card_id, user_id=user_id, front="f", back="b", interval=i % 60,
+                next_review_date=now + timedelta(days=i % 30 - 10), created_at=created
+            ))
+            db.add(FlashCardReview(
+                id=f"{card_id}-r", card_id=card_id, quality=i % 6, reviewed_at=created
+            ))
+    db.commit()
+    db.close()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def queries():
+    """各接口实际执行的查询，由接口使用的同一组查询构造函数生成"""
+    user_id = "plans-user-1"
+    now = datetime.utcnow()
+    dialect = engine.dialect.name
+    return [
+        ("sessions list", "ix_learning_sessions_user_created_score", keyset_page(
+            sessions_query(user_id), LearningSession.created_at, LearningSession.id, None, 20
+        )),
+        ("flashcards list", "ix_flashcards_user_created", keyset_page(
+            flashcards_query(user_id), FlashCard.created_at, FlashCard.id, None, 20
+        )),
+        ("due queue index", "COVERING INDEX ix_flashcards_user_next_review_id", due_queue.index_query(user_id)),
+        ("due page", "sqlite_autoindex_flashcards_1", due_queue.page_query(
+            user_id, [f"{user_id}-c{i}" for i in range(20)]
+        )),
+        ("card reviews", "ix_flashcard_reviews_card_reviewed", rollups.card_reviews_query(f"{user_id}-c0")),
+        ("fit reviews", "ix_flashcard_reviews_card_reviewed", scheduling.fit_reviews_query(user_id, now)),
+        ("flashcard stats", "sqlite_autoindex_user_daily_stats", rollups.flashcard_stats_query(user_id, now.date())),
+        ("flashcard stats due", "COVERING INDEX ix_flashcards_user_next_review_id",
+         rollups.flashcard_stats_query(user_id, now.date())),
+        ("chart range", "COVERING INDEX ix_learning_sessions_user_created_score", chart_query(
+            dialect, user_id, now - timedelta(days=365)
+        )),
+        ("chart all time", "COVERING INDEX ix_learning_sessions_user_created_score", chart_query(dialect, user_id)),
+    ]
+
+
+def explain(conn, stmt) -> list:
+    compiled = stmt.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    # 参数值不影响索引选择，全部绑定为 NULL
+    params = (None,) * len(compiled.positiontup or ())
+    return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params)]
+
+
+@pytest.mark.parametrize("name,index,stmt", queries(), ids=[name for name, _, _ in queries()])
+def test_query_uses_expected_index(name, index, stmt):
+    with engine.connect() as conn:
+        plan = explain(conn, stmt)
+    assert any(index in step for step in plan), f"{name} expects {index}, plan: {plan}"
+
+
+def index_names(bind) -> dict:
+    inspector = inspect(bind)
+    return {table: {ix["name"] for ix in inspector.get_indexes(table)} for table in Base.metadata.tables}
+
+
+def declared_index_names() -> dict:
+    return {
+        name: {ix.name for ix in table.indexes}
+        for name, table in Base.metadata.tables.items()
+    }
+
+
+def test_database_has_exactly_the_indexes_the_models_declare():
+    # 迁移删掉的索引若仍在 models 中声明，create_all 会在新库上重建，新库与迁移后的库不一致
+    created = {
+        table: {name for name in names if not name.startswith("sqlite_autoindex")}
+        for table, names in index_names(engine).items()
+    }
+    assert created == declared_index_names()
+
+
+def test_migrated_database_has_the_same_indexes_as_a_fresh_one():
+    fresh = index_names(engine)
+
+    # 模拟基线库：建表后补上基线的单列索引，再执行全部迁移
+    path = os.path.join(tempfile.mkdtemp(), "legacy.db")
+    legacy = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=legacy)
+    with legacy.begin() as conn:
+        for name, (table, column) in LEGACY_INDEXES.items():
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})"))
+    run_migrations(legacy)
+    migrated = index_names(legacy)
+    legacy.dispose()
+
+    assert migrated == fresh
+    assert not set(LEGACY_INDEXES) & set().union(*fresh.values())
@@ -0,0 +1,83 @@
+"""闪卡统计汇总（rollups）"""
+import uuid
+from datetime import date, datetime, timedelta
+
+from database import AsyncSessionLocal
+from models import FlashCard, User, UserStatistics
+import rollups
+
+TODAY = date(2024, 6, 1)
+NOON = datetime(2024, 6, 1, 12, 0, 0)
+
+
+async def _new_user(db) -> str:
+    user_id = str(uuid.uuid4())
+    db.add(User(id=user_id, email=f"{user_id}@example.com", password_hash="x"))
+    db.add(UserStatistics(user_id=user_id))
+    await db.flush()
+    return user_id
+
+
+async def _add_card(db, user_id: str, next_review_date: datetime) -> FlashCard:
+    card = FlashCard(
+        id=FlashCard.generate_id(), user_id=user_id, front="f", back="b", next_review_date=next_review_date
+    )
+    db.add(card)
+    await rollups.on_card_created(db, card)
+    await db.flush()
+    return card
+
+
+def test_due_today_counts_cards_due_by_the_end_of_today(run):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user_id = await _new_user(db)
+            for when in (NOON - timedelta(days=400), NOON - timedelta(days=1), NOON.replace(hour=23, minute=59)):
+                await _add_card(db, user_id, when)
+            for when in (datetime(2024, 6, 2), NOON + timedelta(days=30)):
+                await _add_card(db, user_id, when)
+            await db.commit()
+            return await rollups.read_flashcard_stats(db, user_id, TODAY)
+
+    stats = run(scenario())
+    assert stats["total_cards"] == 5
+    assert stats["due_today"] == 3
+
+
+def test_review_counts_only_read_the_last_week(run):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user_id = await _new_user(db)
+            await rollups.bump_daily(db, user_id, TODAY, review_count=2, quality_sum=8)
+            await rollups.bump_daily(db, user_id, TODAY - timedelta(days=6), review_count=3, quality_sum=9)
+            await rollups.bump_daily(db, user_id, TODAY - timedelta(days=7), review_count=5, quality_sum=10)
+            await rollups.bump_daily(db, user_id, TODAY + timedelta(days=1), review_count=7, quality_sum=7)
+            await db.commit()
+            return await rollups.read_flashcard_stats(db, user_id, TODAY)
+
+    stats = run(scenario())
+    assert stats["reviews_today"] == 2
+    assert stats["reviews_week"] == 5
+
+
+def test_card_created_and_deleted_adjust_total_atomically(run):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user_id = await _new_user(db)
+            await db.commit()
+
+        # 两个会话各自创建闪卡，计数在 SQL 中自增，不会互相覆盖
+        async with AsyncSessionLocal() as first, AsyncSessionLocal() as second:
+            await _add_card(first, user_id, NOON)
+            await first.commit()
+            card = await _add_card(second, user_id, NOON)
+            await second.commit()
+
+        async with AsyncSessionLocal() as db:
+            card = await db.get(FlashCard, card.id)
+            await rollups.on_card_deleted(db, card)
+            await db.delete(card)
+            await db.commit()
+            return (await db.get(UserStatistics, user_id, populate_existing=True)).total_flashcards
+
+    assert run(scenario()) == 1
@@ -0,0 +1,146 @@
+"""批量 SM-2（scheduling.sm2 / reschedule）与 FlashCard.calculate_next_review 的一致性"""
+import uuid
+from datetime import datetime, timedelta
+
+from hypothesis import HealthCheck, given, settings, strategies as st
+from sqlalchemy import insert, select, update
+
+from database import AsyncSessionLocal
+from models import FlashCard, User
+from scheduling import apply_reviews, reschedule, sm2
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+ease_factors = st.one_of(
+    st.sampled_from([1.3, 2.5, 2.6, 1.7000000000000002]),
+    st.floats(min_value=1.3, max_value=4.0, allow_nan=False),
+)
+card_states = st.tuples(ease_factors, st.integers(0, 3650), st.integers(0, 50))
+qualities = st.integers(0, 5)
+# 多轮评分时间隔按 ease_factor 的幂增长，起点较短以免 next_review_date 超出 datetime 范围
+short_card_states = st.tuples(ease_factors, st.integers(0, 365), st.integers(0, 50))
+
+
+def scalar_review(state, quality):
+    card = FlashCard(ease_factor=state[0], interval=state[1], repetitions=state[2])
+    card.calculate_next_review(quality, now=NOW)
+    return card
+
+
+@given(st.lists(st.tuples(short_card_states, st.lists(qualities, min_size=1, max_size=6)), min_size=1, max_size=30))
+def test_sm2_matches_calculate_next_review_over_several_reviews(cards):
+    rounds = max(len(grades) for _, grades in cards)
+    grades = [[g[i % len(g)] for _, g in cards] for i in range(rounds)]
+
+    scalar = [FlashCard(ease_factor=e, interval=i, repetitions=r) for (e, i, r), _ in cards]
+    state = ([e for (e, _, _), _ in cards], [i for (_, i, _), _ in cards], [r for (_, _, r), _ in cards])
+    for round_grades in grades:
+        for card, quality in zip(scalar, round_grades):
+            card.calculate_next_review(quality, now=NOW)
+        result = sm2(*state, round_grades)
+        state = (result.ease_factor, result.interval, result.repetitions)
+
+        assert result.ease_factor.tolist() == [c.ease_factor for c in scalar]
+        assert result.interval.tolist() == [c.interval for c in scalar]
+        assert result.repetitions.tolist() == [c.repetitions for c in scalar]
+
+
+@given(card_states, qualities)
+def test_sm2_keeps_ease_factor_at_or_above_the_floor(state, quality):
+    result = sm2([state[0]], [state[1]], [state[2]], [quality])
+    assert result.ease_factor[0] >= 1.3
+    assert result.repetitions[0] == (0 if quality < 3 else state[2] + 1)
+
+
+async def _store_cards(states):
+    user_id = str(uuid.uuid4())
+    ids = [f"{user_id}-{i}" for i in range(len(states))]
+    async with AsyncSessionLocal() as db:
+        db.add(User(id=user_id, email=f"{user_id}@example.com", password_hash="x"))
+        await db.flush()
+        if states:
+            await db.execute(insert(FlashCard), [
+                {"id": card_id, "user_id": user_id, "front": "f", "back": "b",
+                 "ease_factor": e, "interval": i, "repetitions": r, "next_review_date": NOW}
+                for card_id, (e, i, r) in zip(ids, states)
+            ])
+        await db.commit()
+    return user_id, ids
+
+
+async def _reschedule_and_read(user_id, ids, grades, ease_factor=None):
+    async with AsyncSessionLocal() as db:
+        written = await reschedule(db, user_id, ids, grades, ease_factor=ease_factor, now=NOW)
+        await db.commit()
+        rows = {
+            row.id: (row.ease_factor, row.interval, row.repetitions, row.next_review_date)
+            for row in await db.execute(
+                select(FlashCard.id, FlashCard.ease_factor, FlashCard.interval,
+                       FlashCard.repetitions, FlashCard.next_review_date)
+                .where(FlashCard.user_id == user_id)
+            )
+        }
+    return written, [rows[card_id] for card_id in ids]
+
+
+@settings(max_examples=25, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(st.lists(st.tuples(card_states, qualities), min_size=1, max_size=20))
+def test_reschedule_writes_back_calculate_next_review_results(run, cards):
+    states = [state for state, _ in cards]
+    grades = [quality for _, quality in cards]
+    user_id, ids = run(_store_cards(states))
+
+    written, stored = run(_reschedule_and_read(user_id, ids, grades))
+
+    expected = []
+    for state, quality in cards:
+        card = scalar_review(state, quality)
+        expected.append((card.ease_factor, card.interval, card.repetitions, card.next_review_date))
+    assert stored == expected
+    assert sorted(row["old_interval"] for row in written) == sorted(i for _, i, _ in states)
+
+
+@settings(max_examples=10, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(st.lists(card_states, min_size=1, max_size=10), ease_factors)
+def test_reschedule_ease_factor_override_without_grades_keeps_schedule(run, states, ease):
+    user_id, ids = run(_store_cards(states))
+
+    _, stored = run(_reschedule_and_read(user_id, ids, None, ease_factor=ease))
+
+    assert stored == [(ease, i, r, NOW) for _, i, r in states]
+
+
+def test_reschedule_ignores_other_users_cards(run):
+    owner, ids = run(_store_cards([(2.5, 0, 0)]))
+    other, _ = run(_store_cards([]))
+
+    written, stored = run(_reschedule_and_read(owner, ids, [5]))
+    assert [row["id"] for row in written] == ids
+
+    async def reschedule_as_other():
+        async with AsyncSessionLocal() as db:
+            return await reschedule(db, other, ids, [0], now=NOW)
+    assert run(reschedule_as_other()) == []
+
+
+def test_apply_reviews_returns_the_clamped_review_times_it_scheduled_from(run):
+    # 上次复习在 NOW - 1 天（next_review_date - interval）
+    user_id, ids = run(_store_cards([(2.5, 3, 2)]))
+    card_id = ids[0]
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(FlashCard).where(FlashCard.id == card_id).values(next_review_date=NOW + timedelta(days=2))
+            )
+            stale, fresh = NOW - timedelta(days=5), NOW + timedelta(hours=1)
+            cards, applied = await apply_reviews(
+                db, user_id, [(card_id, 4, stale), ("missing", 4, stale), (card_id, 5, fresh)], now=NOW
+            )
+            await db.rollback()
+            return cards, applied
+
+    cards, applied = run(scenario())
+    last_review = NOW - timedelta(days=1)
+    assert applied == [(0, last_review), (2, NOW + timedelta(hours=1))]
+    assert cards[0]["next_review_date"] == NOW + timedelta(hours=1, days=cards[0]["interval"])
@@ -0,0 +1,195 @@
+"""
+URL 正文抓取
+共享连接池 + 按域名限流，流式读取并限制字节数，
+抽取结果按 ETag / Last-Modified 缓存并重新验证
+"""
+import asyncio
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import HTTPException
+
+from chunking import MAX_DOCUMENT_CHARS
+from html_extractor import StreamingHtmlExtractor
+from metrics import URL_FETCH_BYTES, URL_FETCH_LATENCY
+from ttl_cache import TTLCache
+
+URL_FETCH_TIMEOUT = float(os.getenv("URL_FETCH_TIMEOUT", "10"))
+# 单个页面最多读取的字节数，超出部分直接丢弃
+URL_FETCH_MAX_BYTES = int(os.getenv("URL_FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+URL_FETCH_MAX_CONNECTIONS = int(os.getenv("URL_FETCH_MAX_CONNECTIONS", "50"))
+# 同一域名的最大并发抓取数
+URL_FETCH_PER_HOST_LIMIT = int(os.getenv("URL_FETCH_PER_HOST_LIMIT", "4"))
+URL_CACHE_MAX_ENTRIES = int(os.getenv("URL_CACHE_MAX_ENTRIES", "512"))
+# 在此时间内直接使用缓存；之后带条件请求重新验证
+URL_CACHE_FRESH_TTL = float(os.getenv("URL_CACHE_FRESH_TTL", "600"))
+# 缓存条目保留时间（用于重新验证）
+URL_CACHE_TTL = float(os.getenv("URL_CACHE_TTL", str(60 * 60 * 24)))
+
+# 抽取文本长度上限（整页 / 微信文章正文），超长文本交给分块摘要处理
+MAX_EXTRACT_CHARS = MAX_DOCUMENT_CHARS
+MAX_ARTICLE_CHARS = MAX_DOCUMENT_CHARS
+
+# 微信公众号文章域名，正文一定在 #js_content 中
+WECHAT_HOSTS = ("mp.weixin.qq.com",)
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_-]+)', re.IGNORECASE)
+
+USER_AGENT = (
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
+)
+
+
+class CachedPage:
+    """已抽取的页面正文及其校验信息"""
+
+    __slots__ = ("text", "etag", "last_modified", "fetched_at")
+
+    def __init__(self, text: str, etag: Optional[str], last_modified: Optional[str]):
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() - self.fetched_at < URL_CACHE_FRESH_TTL
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+_client: Optional[httpx.AsyncClient] = None
+# 域名 -> [信号量, 持有和等待的请求数]；没有请求使用时删除，字典大小只取决于同时在抓取的域名数
+_host_limits: Dict[str, list] = {}
+_page_cache = TTLCache(maxsize=URL_CACHE_MAX_ENTRIES, ttl=URL_CACHE_TTL)
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=URL_FETCH_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=URL_FETCH_MAX_CONNECTIONS),
+        )
+    return _client
+
+
+@asynccontextmanager
+async def _host_limit(url: str) -> AsyncIterator[None]:
+    """同一域名最多 URL_FETCH_PER_HOST_LIMIT 个并发抓取"""
+    host = urlsplit(url).hostname or ""
+    entry = _host_limits.get(host)
+    if entry is None:
+        entry = _host_limits[host] = [asyncio.Semaphore(URL_FETCH_PER_HOST_LIMIT), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _host_limits[host]
+
+
+def _sniff_charset(head: bytes) -> Optional[str]:
+    match = _META_CHARSET.search(head)
+    return match.group(1).decode("ascii") if match else None
+
+
+async def _extract_streaming(url: str, response: httpx.Response) -> Tuple[str, int]:
+    """
+    边下载边抽取正文，抽够字数或读满 URL_FETCH_MAX_BYTES 即停止下载
+
+    微信公众号文章只取 #js_content；其他页面整页文本达到预算即停止。
+    """
+    host = urlsplit(url).hostname or ""
+    extractor: Optional[StreamingHtmlExtractor] = None
+    received = 0
+
+    async for chunk in response.aiter_bytes():
+        if extractor is None:
+            extractor = StreamingHtmlExtractor(
+                response.charset_encoding or _sniff_charset(chunk[:4096]),
+                budget=MAX_EXTRACT_CHARS,
+                target_id="js_content",
+                target_budget=MAX_ARTICLE_CHARS,
+                wait_for_target=host.endswith(WECHAT_HOSTS),
+            )
+
+        received += len(chunk)
+        if received > URL_FETCH_MAX_BYTES:
+            chunk = chunk[:len(chunk) - (received - URL_FETCH_MAX_BYTES)]
+
+        # HTML 解析较耗 CPU，放到线程中执行
+        if await asyncio.to_thread(extractor.feed, chunk):
+            break
+        if received >= URL_FETCH_MAX_BYTES:
+            break
+
+    if extractor is None:
+        return "", received
+    return await asyncio.to_thread(extractor.close), received
+
+
+async def fetch_text(url: str) -> str:
+    """抓取 URL 并返回正文文本"""
+    cached: Optional[CachedPage] = _page_cache.get(url)
+    if cached is not None and cached.fresh:
+        URL_FETCH_LATENCY.labels("cache_hit").observe(0)
+        return cached.text
+
+    headers = cached.conditional_headers() if cached is not None else {}
+    start = time.perf_counter()
+    result = "error"
+    try:
+        async with _host_limit(url):
+            async with _get_client().stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and cached is not None:
+                    result = "not_modified"
+                    cached.fetched_at = time.monotonic()
+                    _page_cache.set(url, cached)
+                    return cached.text
+
+                response.raise_for_status()
+                text, received = await _extract_streaming(url, response)
+                URL_FETCH_BYTES.inc(received)
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        result = "ok"
+    finally:
+        URL_FETCH_LATENCY.labels(result).observe(time.perf_counter() - start)
+
+    if text:
+        _page_cache.set(url, CachedPage(text, etag, last_modified))
+    return text
+
+
+async def extract_text_from_url(url: str) -> str:
+    """Extract text content from a URL, with special handling for WeChat articles."""
+    try:
+        return await fetch_text(url)
+    except Exception as e:
+        print(f"Error fetching URL: {e}")
+        raise HTTPException(status_code=400, detail=f"Failed to fetch URL: {str(e)}")
+
+
+async def close_url_fetcher() -> None:
+    """关闭共享连接池（应用关闭时调用）"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -92,8 +92,9 @@ export const getStatistics = async () => {
 };
 
 // Flashcard API
-export const getDueFlashcards = async () => {
-  const response = await api.get('/v1/flashcards/due');
+export const getDueFlashcards = async (limit = 20, cursor = null) => {
+  const params = cursor ? { limit, cursor } : { limit };
+  const response = await api.get('/v1/flashcards/due', { params });
   return response.data;
 };
 